@@ -0,0 +1,29 @@
+-- Store product prices as validity intervals [effective_from, effective_to)
+-- The latest price of a product has effective_to as NULL
+-- The first price of a product starts at 1970-01-02 (queries.PRICE_FLOOR) so every order falls in one interval,
+-- which replaces the COALESCE(MAX(...), MIN(...)) fallback of the old price lookup
+
+ALTER TABLE `orderapp`.`product_prices`
+RENAME COLUMN `effective_timestamp` TO `effective_from`,
+ADD COLUMN `effective_to` TIMESTAMP NULL DEFAULT NULL,
+ADD INDEX `idx_product_prices_current` (`product_id`, `effective_to`);
+
+-- Close each price at the effective_from of the next price of the same product
+UPDATE `orderapp`.`product_prices` pp
+JOIN (
+    SELECT
+        product_id,
+        effective_from,
+        LEAD(effective_from) OVER (PARTITION BY product_id ORDER BY effective_from) AS next_from
+    FROM `orderapp`.`product_prices`
+) iv ON pp.product_id = iv.product_id AND pp.effective_from = iv.effective_from
+SET pp.effective_to = iv.next_from;
+
+-- Extend the first price of each product back to the floor
+UPDATE `orderapp`.`product_prices` pp
+JOIN (
+    SELECT product_id, MIN(effective_from) AS first_from
+    FROM `orderapp`.`product_prices`
+    GROUP BY product_id
+) f ON pp.product_id = f.product_id AND pp.effective_from = f.first_from
+SET pp.effective_from = '1970-01-02 00:00:00';
@@ -0,0 +1,98 @@
+-- Materialize the previous orders overview as one row per order date
+-- Rows are refreshed per date by DaoOrderapp.refresh_order_summary after order writes and cost updates
+-- A NULL summed_finished_cost is shown as 'N/A' (no finished order, or a finished order without product cost)
+
+CREATE TABLE `orderapp`.`daily_order_summary` (
+  `order_date` DATE NOT NULL,
+  `total_id_list` TEXT,
+  `finished_id_list` TEXT,
+  `prepared_id_list` TEXT,
+  `cancelled_id_list` TEXT,
+  `finished_count` INT NOT NULL DEFAULT 0,
+  `prepared_count` INT NOT NULL DEFAULT 0,
+  `cancelled_count` INT NOT NULL DEFAULT 0,
+  `summed_finished_cost` DECIMAL(12, 2),
+  `summed_finished_price` INT NOT NULL DEFAULT 0,
+  `record_timestamp` TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (`order_date`)
+);
+
+-- Backfill every existing order date
+INSERT INTO `orderapp`.`daily_order_summary` (
+    order_date,
+    total_id_list,
+    finished_id_list,
+    prepared_id_list,
+    cancelled_id_list,
+    finished_count,
+    prepared_count,
+    cancelled_count,
+    summed_finished_cost,
+    summed_finished_price
+)
+WITH order_latest_product_costs AS (
+    SELECT
+        od.order_id,
+        od.product_id,
+        pc.cost_per_unit
+    FROM orderapp.order_details od
+    JOIN orderapp.orders o ON od.order_id = o.order_id
+    JOIN LATERAL (
+        SELECT
+            pc.product_id,
+            pc.cost_per_unit,
+            pc.cost_date
+        FROM orderapp.product_costs pc
+        WHERE
+            pc.product_id = od.product_id
+            AND (
+                pc.cost_date <= DATE(o.order_timestamp)
+                OR pc.cost_date = (
+                    SELECT MIN(cost_date)
+                    FROM orderapp.product_costs
+                    WHERE product_id = od.product_id
+                )
+            )
+        ORDER BY
+            CASE
+                WHEN pc.cost_date <= DATE(o.order_timestamp) THEN 0
+                ELSE 1
+            END,
+            pc.cost_date DESC
+        LIMIT 1
+    ) pc ON true
+),
+order_total_cost AS (
+    SELECT
+        od.order_id,
+        CASE
+            WHEN COUNT(olpc.cost_per_unit) != COUNT(od.product_id) THEN NULL
+            ELSE CAST(SUM(od.quantity * olpc.cost_per_unit) AS DECIMAL(10, 2))
+        END AS total_product_cost
+    FROM orderapp.order_details od
+    LEFT JOIN order_latest_product_costs olpc ON od.product_id = olpc.product_id AND od.order_id = olpc.order_id
+    GROUP BY od.order_id
+)
+SELECT
+    DATE(o.order_timestamp) AS order_date,
+    GROUP_CONCAT(o.order_id),
+    GROUP_CONCAT(CASE WHEN o.order_status = "已完成" THEN o.order_id ELSE NULL END),
+    GROUP_CONCAT(CASE WHEN o.order_status = "準備中" THEN o.order_id ELSE NULL END),
+    GROUP_CONCAT(CASE WHEN o.order_status = "已取消" THEN o.order_id ELSE NULL END),
+    COUNT(CASE WHEN o.order_status = "已完成" THEN 1 ELSE NULL END),
+    COUNT(CASE WHEN o.order_status = "準備中" THEN 1 ELSE NULL END),
+    COUNT(CASE WHEN o.order_status = "已取消" THEN 1 ELSE NULL END),
+    CASE
+        WHEN COUNT(CASE WHEN o.order_status = '已完成' THEN 1 ELSE NULL END) = 0 THEN NULL
+        WHEN COUNT(
+            CASE
+                WHEN o.order_status = '已完成' AND otc.total_product_cost IS NULL THEN 1
+                ELSE NULL
+            END
+        ) > 0 THEN NULL
+        ELSE SUM(CASE WHEN o.order_status = '已完成' THEN otc.total_product_cost ELSE 0 END)
+    END,
+    SUM(CASE WHEN o.order_status = "已完成" THEN o.price_total ELSE 0 END)
+FROM orderapp.orders o
+LEFT JOIN order_total_cost otc ON o.order_id = otc.order_id
+GROUP BY DATE(o.order_timestamp);
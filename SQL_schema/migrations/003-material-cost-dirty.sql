@@ -0,0 +1,12 @@
+-- Track which materials need their material_costs recomputed, and from which date
+-- Rows are written by DAO writes on purchases, recipes and orders (queries.mark_cost_dirty)
+-- and consumed by update_cost.update_dirty_costs, which rolls the costs of only those materials forward
+-- A dirty_from after today (orders completed today) waits until that day's cost update
+
+CREATE TABLE `orderapp`.`material_cost_dirty` (
+  `material_id` INT NOT NULL,
+  `dirty_from` DATE NOT NULL,
+  `record_timestamp` TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (`material_id`),
+  INDEX `idx_material_cost_dirty_from` (`dirty_from`)
+);
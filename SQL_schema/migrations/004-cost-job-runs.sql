@@ -0,0 +1,15 @@
+-- One row per cost update run of CostJobRunner (scheduled or triggered with run_now)
+-- A run is inserted as 'running' when it starts and updated with its status, duration and message when it ends
+-- A 'running' row left behind means the app stopped during that run
+
+CREATE TABLE `orderapp`.`cost_job_runs` (
+  `run_id` INT PRIMARY KEY NOT NULL AUTO_INCREMENT,
+  `job` VARCHAR(20) NOT NULL,
+  `run_trigger` VARCHAR(20) NOT NULL,
+  `status` ENUM("running", "succeeded", "failed") NOT NULL DEFAULT "running",
+  `started_at` TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  `finished_at` TIMESTAMP NULL DEFAULT NULL,
+  `duration_ms` INT,
+  `message` TEXT,
+  INDEX `idx_cost_job_runs_started` (`job`, `started_at`)
+);
@@ -0,0 +1,22 @@
+-- Index the access paths filtering orders by date
+-- order_date is a stored generated column of DATE(order_timestamp), so date filters and groupings
+-- (today's orders, material cost usage, daily summary) compare a plain indexed column
+-- It follows order_timestamp on every update, the date is taken in the session time zone like DATE() was
+
+ALTER TABLE `orderapp`.`orders`
+ADD COLUMN `order_date` DATE GENERATED ALWAYS AS (DATE(`order_timestamp`)) STORED AFTER `order_timestamp`,
+-- TODAY_ORDERS: order_date = CURDATE() AND completion_timestamp IS NULL
+ADD INDEX `idx_orders_date_completion` (`order_date`, `completion_timestamp`),
+-- Material cost usage: order_status = "已完成" AND order_date before the cost date
+ADD INDEX `idx_orders_status_date` (`order_status`, `order_date`),
+-- FUTURE_ORDERS: completion_timestamp IS NOT NULL
+ADD INDEX `idx_orders_completion_status` (`completion_timestamp`, `order_status`, `order_date`);
+
+-- Current recipe lookups (end_timestamp IS NULL) and the recipe existing at an order timestamp
+ALTER TABLE `orderapp`.`recipes`
+ADD INDEX `idx_recipes_product_end` (`product_id`, `end_timestamp`, `start_timestamp`, `material_id`, `quantity`);
+
+-- Price interval lookup at an order timestamp, covering the price itself
+-- (effective_timestamp was renamed to effective_from in 001-product-price-intervals.sql)
+ALTER TABLE `orderapp`.`product_prices`
+ADD INDEX `idx_product_prices_interval` (`product_id`, `effective_from`, `effective_to`, `price`);
@@ -14,8 +14,11 @@ UNIQUE INDEX `product_name_UNIQUE` (`product_name` ASC) VISIBLE);
 CREATE TABLE `orderapp`.`product_prices` (
 `product_id` INT NOT NULL,
 `price` INT NOT NULL,
-`effective_timestamp` TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
-PRIMARY KEY (`product_id`, `effective_timestamp`)
+`effective_from` TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+`effective_to` TIMESTAMP NULL DEFAULT NULL,
+PRIMARY KEY (`product_id`, `effective_from`),
+INDEX `idx_product_prices_current` (`product_id`, `effective_to`),
+INDEX `idx_product_prices_interval` (`product_id`, `effective_from`, `effective_to`, `price`)
 );
 
 CREATE TABLE `orderapp`.`uom` (
@@ -61,10 +64,14 @@ CREATE TABLE `orderapp`.`orders` (
 `customer_id` INT NOT NULL DEFAULT 1,
 `price_total` INT NOT NULL,
 `order_timestamp` TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+`order_date` DATE GENERATED ALWAYS AS (DATE(`order_timestamp`)) STORED,
 `completion_timestamp` TIMESTAMP,
 `order_status` ENUM("準備中", "已完成", "已取消") DEFAULT "準備中",
 `is_paid` BOOLEAN DEFAULT TRUE,
-`note` VARCHAR(255));
+`note` VARCHAR(255),
+INDEX `idx_orders_date_completion` (`order_date`, `completion_timestamp`),
+INDEX `idx_orders_status_date` (`order_status`, `order_date`),
+INDEX `idx_orders_completion_status` (`completion_timestamp`, `order_status`, `order_date`));
 
 CREATE TABLE `orderapp`.`customers` (
 `customer_id` INT PRIMARY KEY NOT NULL AUTO_INCREMENT,
@@ -89,7 +96,8 @@ CREATE TABLE `orderapp`.`recipes`(
 `quantity` DECIMAL(10, 2) NOT NULL,
 `start_timestamp` TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
 `end_timestamp` TIMESTAMP,
-PRIMARY KEY (`product_id`, `material_id`, `start_timestamp`));
+PRIMARY KEY (`product_id`, `material_id`, `start_timestamp`),
+INDEX `idx_recipes_product_end` (`product_id`, `end_timestamp`, `start_timestamp`, `material_id`, `quantity`));
 
 CREATE TABLE `orderapp`.`order_details`(
 `order_id` INT NOT NULL,
@@ -203,6 +211,38 @@ CREATE TABLE `orderapp`.`product_costs` (
     ON DELETE NO ACTION
     ON UPDATE RESTRICT
 );
+CREATE TABLE `orderapp`.`daily_order_summary` (
+  `order_date` DATE NOT NULL,
+  `total_id_list` TEXT,
+  `finished_id_list` TEXT,
+  `prepared_id_list` TEXT,
+  `cancelled_id_list` TEXT,
+  `finished_count` INT NOT NULL DEFAULT 0,
+  `prepared_count` INT NOT NULL DEFAULT 0,
+  `cancelled_count` INT NOT NULL DEFAULT 0,
+  `summed_finished_cost` DECIMAL(12, 2),
+  `summed_finished_price` INT NOT NULL DEFAULT 0,
+  `record_timestamp` TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (`order_date`)
+);
+CREATE TABLE `orderapp`.`material_cost_dirty` (
+  `material_id` INT NOT NULL,
+  `dirty_from` DATE NOT NULL,
+  `record_timestamp` TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (`material_id`),
+  INDEX `idx_material_cost_dirty_from` (`dirty_from`)
+);
+CREATE TABLE `orderapp`.`cost_job_runs` (
+  `run_id` INT PRIMARY KEY NOT NULL AUTO_INCREMENT,
+  `job` VARCHAR(20) NOT NULL,
+  `run_trigger` VARCHAR(20) NOT NULL,
+  `status` ENUM("running", "succeeded", "failed") NOT NULL DEFAULT "running",
+  `started_at` TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  `finished_at` TIMESTAMP NULL DEFAULT NULL,
+  `duration_ms` INT,
+  `message` TEXT,
+  INDEX `idx_cost_job_runs_started` (`job`, `started_at`)
+);
 INSERT INTO `orderapp`.`uom` (uom_name) VALUES ("未定義");
 INSERT INTO `orderapp`.`uom` (uom_name) VALUES ("克");
 INSERT INTO `orderapp`.`uom` (uom_name) VALUES ("顆");
@@ -0,0 +1,24 @@
+from fastapi.responses import PlainTextResponse
+from nicegui import Client, app
+
+from database.Metrics import METRICS
+from logging_setup.setup import LOGGER
+
+
+def nicegui_clients() -> list[tuple[str, dict, float]]:
+    return [("orderapp_nicegui_clients", {}, len(Client.instances))]
+
+
+METRICS.register_collector(nicegui_clients)
+
+
+# Prometheus text exposition of database.Metrics.METRICS (whitelisted like /ping)
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics() -> PlainTextResponse:
+    try:
+        return PlainTextResponse(
+            METRICS.render(), media_type="text/plain; version=0.0.4"
+        )
+    except Exception as e:
+        LOGGER.error(f"Metrics failed: {str(e)}")
+        return PlainTextResponse(str(e), status_code=500)
@@ -1,11 +1,114 @@
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import date, datetime
+
+from fastapi.responses import JSONResponse
 from nicegui import app
 
+from database.ConnectionPool import ConnectionPool
+from database.DataAccessObjects import DaoCostJobs
 from logging_setup.setup import LOGGER
 
+# Deep checks give up after DEEP_TIMEOUT seconds, a result is reused for DEEP_CACHE_SECONDS
+DEEP_TIMEOUT = 2.0
+DEEP_CACHE_SECONDS = 5.0
+DB_ROUND_TRIP = "SELECT 1 AS ok"
+
+
+# Deep health check of /ping?deep=true
+## One check runs at a time on a daemon thread, probes arriving meanwhile wait for the same check,
+## so a hung DB costs one stuck thread, never piles up connections and never blocks shutdown
+## A check that does not finish within DEEP_TIMEOUT is reported as an error (it keeps running
+## and its result is cached when it returns), failed checks are cached like successful ones
+class DeepHealthCheck:
+    def __init__(self):
+        self.dao: DaoCostJobs | None = None
+        self.pool: ConnectionPool | None = None
+        self._future: Future | None = None
+        self._cached: tuple[float, dict] | None = None
+        self._lock = threading.Lock()
+
+    def configure(self, pool: ConnectionPool):
+        self.pool = pool
+        self.dao = DaoCostJobs(pool=pool)
+
+    def _run_check(self, future: Future):
+        try:
+            result = self._check()
+        except Exception as e:
+            result = {"status": "error", "message": str(e)}
+        with self._lock:
+            self._cached = (time.monotonic(), result)
+        future.set_result(result)
+
+    def _check(self) -> dict:
+        started = time.perf_counter()
+        self.dao.query_data(DB_ROUND_TRIP)
+        round_trip_ms = (time.perf_counter() - started) * 1000
+        freshness = self.dao.fetch_cost_freshness()
+        last_success = freshness["last_cost_job_success"]
+        newest_cost = freshness["newest_material_cost_date"]
+        stats = self.pool.stats()
+        result = {
+            "status": "ok",
+            "db_round_trip_ms": round(round_trip_ms, 2),
+            "pool": {
+                "size": stats["size"],
+                "in_use": stats["in_use"],
+                "waiting": stats["waiting"],
+                "saturation": round(stats["in_use"] / stats["size"], 2),
+            },
+            "last_cost_job_success": str(last_success) if last_success else None,
+            "cost_job_age_s": (
+                int((datetime.now() - last_success).total_seconds())
+                if last_success
+                else None
+            ),
+            "newest_material_cost_date": str(newest_cost) if newest_cost else None,
+            "material_cost_age_days": (
+                (date.today() - newest_cost).days if newest_cost else None
+            ),
+        }
+        return result
+
+    def run(self) -> dict:
+        if self.dao is None:
+            return {"status": "error", "message": "Deep check is not configured"}
+        with self._lock:
+            if (
+                self._cached is not None
+                and time.monotonic() - self._cached[0] < DEEP_CACHE_SECONDS
+            ):
+                return {**self._cached[1], "cached": True}
+            if self._future is None or self._future.done():
+                self._future = Future()
+                threading.Thread(
+                    target=self._run_check,
+                    args=(self._future,),
+                    name="orderapp-health",
+                    daemon=True,
+                ).start()
+            future = self._future
+        try:
+            return future.result(timeout=DEEP_TIMEOUT)
+        except FutureTimeoutError:
+            return {"status": "error", "message": f"Timed out after {DEEP_TIMEOUT}s"}
+
+
+DEEP_CHECK = DeepHealthCheck()
+
 
 @app.get("/ping")
-def ping() -> dict[str, str]:
+def ping(deep: bool = False) -> dict:
     try:
+        if deep:
+            result = DEEP_CHECK.run()
+            if result["status"] != "ok":
+                LOGGER.error(f"Deep ping failed: {result['message']}")
+                return JSONResponse(result, status_code=503)
+            return result
         LOGGER.debug("Ping received, all systems operational")
         return {"status": "ok", "message": "All systems operational"}
     except Exception as e:
@@ -0,0 +1,14 @@
+from nicegui import app
+
+from database.QueryStats import QUERY_STATS
+from logging_setup.setup import LOGGER
+
+
+# Rolling timing histogram of the statements executed by the DAOs (behind the login)
+@app.get("/query_stats")
+def query_stats() -> dict:
+    try:
+        return {"status": "ok", "queries": QUERY_STATS.snapshot()}
+    except Exception as e:
+        LOGGER.error(f"Query stats failed: {str(e)}")
+        return {"status": "error", "message": str(e)}, 500
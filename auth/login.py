@@ -25,7 +25,7 @@ class AuthMiddleware(BaseHTTPMiddleware):
             or path.startswith("/fonts")
             or path.endswith(".ico")
             or path.endswith(".png")
-            or path in {"/login", "/ping"}
+            or path in {"/login", "/ping", "/metrics"}
         ):
             return True
         return False
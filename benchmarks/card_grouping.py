@@ -0,0 +1,76 @@
+# Benchmark the RowIndex grouping of GridOfCards against the per-card scan it replaced
+## Run from the project root: python -m benchmarks.card_grouping [rows_per_card]
+## Builds the cards' row groups, sorted ids and a select(name=...) once per data load,
+## which is the work of GridOfCards._create and select without the NiceGUI elements
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from pages.components.RowIndex import RowIndex
+
+ROW_COUNTS = (1_000, 10_000)
+REPEAT = 5
+
+
+def synthetic_rows(n_rows: int, rows_per_card: int, seed: int = 0) -> list[dict]:
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    n_cards = max(1, n_rows // rows_per_card)
+    timestamps = {
+        o: start + timedelta(minutes=rng.randint(0, 60 * 24 * 365))
+        for o in range(1, n_cards + 1)
+    }
+    return [
+        {
+            "order_id": o,
+            "order_name": f"order {o}",
+            "order_timestamp": timestamps[o],
+            "product_name": f"product {rng.randint(1, 50)}",
+            "quantity": rng.randint(1, 5),
+        }
+        for o in rng.choices(range(1, n_cards + 1), k=n_rows)
+    ]
+
+
+# Grouping as GridOfCards did it before RowIndex
+def per_card_scan(data: list[dict]):
+    id_ot = {(i["order_id"], i["order_timestamp"]) for i in data}
+    ids = [i[0] for i in sorted(id_ot, key=lambda x: x[1])]
+    cards = {p_id: [i for i in data if i["order_id"] == p_id] for p_id in ids}
+    selected = list({i["order_id"] for i in data if "order 1" in i["order_name"]})
+    return cards, selected
+
+
+def row_index(data: list[dict]):
+    index = RowIndex(data, "order", "order_timestamp")
+    cards = {p_id: index.rows[p_id] for p_id in index.sorted_ids()}
+    selected = index.ids_matching("order 1")
+    return cards, selected
+
+
+def best_of(func, data: list[dict]) -> float:
+    timings = []
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        func(data)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main(rows_per_card: int = 4):
+    for n_rows in ROW_COUNTS:
+        data = synthetic_rows(n_rows, rows_per_card)
+        scan_cards, scan_selected = per_card_scan(data)
+        index_cards, index_selected = row_index(data)
+        assert scan_cards == index_cards and set(scan_selected) == set(index_selected)
+        scan = best_of(per_card_scan, data)
+        index = best_of(row_index, data)
+        print(
+            f"{n_rows} rows, {len(index_cards)} cards: per-card scan {scan * 1000:.1f} ms,"
+            f" RowIndex {index * 1000:.2f} ms ({scan / index:.0f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main(*(int(i) for i in sys.argv[1:]))
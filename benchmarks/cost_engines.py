@@ -0,0 +1,330 @@
+# Benchmark the NumPy cost engine against the SQL path and the CostLedger roll on synthetic data
+## Run from the project root: python -m benchmarks.cost_engines [n_orders] [n_days] [--sql]
+## Without --sql it never connects to MySQL: NumPy and CostLedger read the same in-memory rows
+## (importing database still reads the MySQL settings of .env, they only need to be set)
+## With --sql the rows are also loaded into the MySQL of .env and perform_update (UPDATE_MATERIAL_COST)
+## is run once per day, as update_costs did before the backfill, then every row is deleted again
+## --sql refuses to run unless the tables it fills are empty, use a scratch schema from SQL_schema
+import random
+import sys
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from database.CostLedger import LEDGER_COST_COLS, CostLedger
+from database.DataAccessObjects import DaoOrderapp
+from database.queries import format_insert_query
+from database.update_cost import (
+    NUMPY_INSERT_CHUNK,
+    compute_costs_numpy,
+    perform_update,
+)
+
+N_MATERIALS = 40
+N_PRODUCTS = 30
+MATERIALS_PER_RECIPE = 4
+RECIPE_CHANGES = 20
+
+
+def synthetic_rows(n_orders: int, n_days: int, today: date, seed: int = 0):
+    rng = random.Random(seed)
+    first_day = today - timedelta(days=n_days - 1)
+    first_moment = datetime.combine(first_day, datetime.min.time())
+
+    purchases = [
+        {
+            "material_id": m,
+            "purchase_date": first_day + timedelta(days=d),
+            "quantity": Decimal(rng.randint(20000, 50000)),
+            "price_total": rng.randint(100, 2000),
+        }
+        for m in range(1, N_MATERIALS + 1)
+        for d in sorted(rng.sample(range(n_days), max(1, n_days // 7)))
+    ]
+
+    recipes = []
+    for p in range(1, N_PRODUCTS + 1):
+        for m in rng.sample(range(1, N_MATERIALS + 1), MATERIALS_PER_RECIPE):
+            recipes.append(
+                {
+                    "product_id": p,
+                    "material_id": m,
+                    "quantity": Decimal(rng.randint(1, 50)),
+                    "start_timestamp": datetime(1970, 1, 2),
+                    "end_timestamp": None,
+                }
+            )
+    # Close some recipe rows and start a new version of them
+    for r in rng.sample(recipes, RECIPE_CHANGES):
+        changed = first_moment + timedelta(seconds=rng.randint(0, n_days * 86400))
+        recipes.append({**r, "quantity": r["quantity"] + 1, "start_timestamp": changed})
+        r["end_timestamp"] = changed
+
+    order_details = [
+        {
+            "product_id": rng.randint(1, N_PRODUCTS),
+            "order_timestamp": first_moment
+            + timedelta(seconds=rng.randint(0, (n_days - 1) * 86400 - 1)),
+            "quantity": Decimal(rng.randint(1, 3)),
+        }
+        for _ in range(n_orders)
+    ]
+    return purchases, order_details, recipes
+
+
+# Answer the CostLedger queries from in-memory rows, filtered and grouped like MySQL would
+## Takes the rows compute_costs_numpy reads (completed order details only) and the stored
+## material_costs rows, also used by the cost engine tests
+class InMemoryDao:
+    def __init__(
+        self,
+        purchases: list[dict],
+        order_details: list[dict],
+        recipes: list[dict],
+        material_costs: list[dict] | None = None,
+    ):
+        self.material_costs = sorted(
+            material_costs or [], key=lambda i: (i["material_id"], i["cost_date"])
+        )
+        self.purchases = defaultdict(lambda: [Decimal(0), Decimal(0)])
+        for i in purchases:
+            key = (i["material_id"], i["purchase_date"])
+            self.purchases[key][0] += i["quantity"]
+            self.purchases[key][1] += i["price_total"]
+        self.usages = defaultdict(Decimal)
+        by_product = defaultdict(list)
+        for r in recipes:
+            by_product[r["product_id"]].append(r)
+        for o in order_details:
+            for r in by_product[o["product_id"]]:
+                ts = o["order_timestamp"]
+                if ts >= r["start_timestamp"] and (
+                    r["end_timestamp"] is None or ts < r["end_timestamp"]
+                ):
+                    key = (r["material_id"], ts.date())
+                    self.usages[key] += o["quantity"] * r["quantity"]
+
+    def query_data(self, query: str, params=None):
+        if "FROM orderapp.material_costs" in query:
+            *material_ids, before = params
+            return [
+                i
+                for i in self.material_costs
+                if i["material_id"] in material_ids and i["cost_date"] < before
+            ] or None
+        *material_ids, start, end = params
+        if "FROM orderapp.purchase_details" in query:
+            rows = [
+                {"material_id": m, "ledger_date": d, "quantity": q, "cost": c}
+                for (m, d), (q, c) in self.purchases.items()
+                if m in material_ids and after(d, start) and d <= end
+            ]
+        else:
+            rows = [
+                {"material_id": m, "ledger_date": d, "quantity": q}
+                for (m, d), q in self.usages.items()
+                if m in material_ids and after(d, start) and d < end
+            ]
+        return rows or None
+
+
+# The ledger passes PRICE_FLOOR (a string) as the start to read the whole history
+def after(day: date, start) -> bool:
+    return isinstance(start, str) or day >= start
+
+
+# Tables --sql fills, in the order their rows are deleted again (foreign keys first)
+SQL_TABLES = (
+    "material_costs",
+    "product_costs",
+    "order_details",
+    "orders",
+    "customers",
+    "recipes",
+    "purchase_details",
+    "purchases",
+    "vendors",
+    "products",
+    "materials",
+    "uom",
+)
+SQL_MATERIAL_COSTS = """
+        SELECT material_id, cost_date, stocked_quantity, stocked_cost, cost_per_unit
+        FROM orderapp.material_costs
+        """
+
+
+def insert_rows(dao: DaoOrderapp, table: str, cols: list[str], rows: list[tuple]):
+    operations = []
+    for i in range(0, len(rows), NUMPY_INSERT_CHUNK):
+        chunk = rows[i : i + NUMPY_INSERT_CHUNK]
+        row_placeholders = "), (".join([", ".join(["%s"] * len(cols))] * len(chunk))
+        operations.append(
+            (
+                format_insert_query(table, cols, row_placeholders),
+                tuple(v for row in chunk for v in row),
+            )
+        )
+    result = dao.perform_transaction(operations)
+    if not result.startswith("Transaction successful"):
+        raise RuntimeError(f"Loading {table} failed. {result}")
+
+
+def load_sql(dao: DaoOrderapp, purchases, order_details, recipes):
+    insert_rows(dao, "uom", ["uom_id", "uom_name"], [(1, "g")])
+    insert_rows(
+        dao,
+        "materials",
+        ["material_id", "material_name", "uom_id"],
+        [(m, f"material {m}", 1) for m in range(1, N_MATERIALS + 1)],
+    )
+    insert_rows(
+        dao,
+        "products",
+        ["product_id", "product_name", "uom_id"],
+        [(p, f"product {p}", 1) for p in range(1, N_PRODUCTS + 1)],
+    )
+    insert_rows(dao, "vendors", ["vendor_id", "vendor_name"], [(1, "vendor")])
+    insert_rows(
+        dao,
+        "purchases",
+        ["purchase_id", "vendor_id", "purchase_date"],
+        [(n, 1, i["purchase_date"]) for n, i in enumerate(purchases, 1)],
+    )
+    insert_rows(
+        dao,
+        "purchase_details",
+        ["purchase_id", "material_id", "quantity", "price_total"],
+        [
+            (n, i["material_id"], i["quantity"], i["price_total"])
+            for n, i in enumerate(purchases, 1)
+        ],
+    )
+    insert_rows(
+        dao,
+        "recipes",
+        ["product_id", "material_id", "quantity", "start_timestamp", "end_timestamp"],
+        [
+            (
+                r["product_id"],
+                r["material_id"],
+                r["quantity"],
+                r["start_timestamp"],
+                r["end_timestamp"],
+            )
+            for r in recipes
+        ],
+    )
+    insert_rows(dao, "customers", ["customer_id"], [(1,)])
+    insert_rows(
+        dao,
+        "orders",
+        ["order_id", "customer_id", "price_total", "order_timestamp", "order_status"],
+        [
+            (n, 1, 0, i["order_timestamp"], "已完成")
+            for n, i in enumerate(order_details, 1)
+        ],
+    )
+    insert_rows(
+        dao,
+        "order_details",
+        ["order_id", "product_id", "quantity"],
+        [(n, i["product_id"], i["quantity"]) for n, i in enumerate(order_details, 1)],
+    )
+
+
+# The values in effect on every day (the latest row on or before it) of each material
+## UPDATE_MATERIAL_COST compares unrounded totals with the stored row, so it also writes
+## rows repeating the stored values, which change nothing that is read
+def in_effect(rows, first_day: date, today: date) -> dict[tuple[int, date], tuple]:
+    by_material = defaultdict(dict)
+    for m, d, *values in rows:
+        by_material[m][d] = tuple(Decimal(v) for v in values)
+    effective = {}
+    for m, by_date in by_material.items():
+        current = None
+        day = first_day
+        while day <= today:
+            current = by_date.get(day, current)
+            if current is not None:
+                effective[(m, day)] = current
+            day += timedelta(days=1)
+    return effective
+
+
+def run_sql(purchases, order_details, recipes, numpy_rows, today: date):
+    dao = DaoOrderapp()
+    dao.connect_orderapp()
+    filled = [
+        table
+        for table in SQL_TABLES
+        if dao.query_data(f"SELECT 1 FROM orderapp.{table} LIMIT 1")
+    ]
+    if filled:
+        print(f"Not running the SQL path, tables are not empty: {filled}")
+        return
+    try:
+        load_sql(dao, purchases, order_details, recipes)
+        first_day = min(
+            [i["purchase_date"] for i in purchases]
+            + [i["order_timestamp"].date() for i in order_details]
+        )
+        started = time.perf_counter()
+        target_date = first_day
+        while target_date <= today:
+            result = perform_update(dao, target_date)
+            if "Transaction failed" in result:
+                raise RuntimeError(result)
+            target_date += timedelta(days=1)
+        elapsed = time.perf_counter() - started
+        print(f"SQL path (perform_update per day): {elapsed:.2f}s")
+
+        sql_rows = [
+            tuple(row[col] for col in LEDGER_COST_COLS)
+            for row in dao.query_data(SQL_MATERIAL_COSTS) or []
+        ]
+        sql_effect = in_effect(sql_rows, first_day, today)
+        numpy_effect = in_effect(numpy_rows, first_day, today)
+        differing = [
+            k
+            for k in sql_effect.keys() | numpy_effect.keys()
+            if sql_effect.get(k) != numpy_effect.get(k)
+        ]
+        print(f"SQL rows: {len(sql_rows)}")
+        print(f"Material days differing between SQL and NumPy: {len(differing)}")
+    finally:
+        for table in SQL_TABLES:
+            dao.perform_transaction([(f"DELETE FROM orderapp.{table}", None)])
+
+
+def main(n_orders: int = 100_000, n_days: int = 365, sql: bool = False):
+    today = date.today()
+    purchases, order_details, recipes = synthetic_rows(n_orders, n_days, today)
+    print(f"{n_orders} orders, {len(purchases)} purchases, {n_days} days")
+
+    started = time.perf_counter()
+    numpy_rows = compute_costs_numpy(purchases, order_details, recipes, today)
+    print(f"NumPy engine: {time.perf_counter() - started:.2f}s, {len(numpy_rows)} rows")
+
+    started = time.perf_counter()
+    dao = InMemoryDao(purchases, order_details, recipes)
+    ledger = CostLedger(dao, today)
+    first_day = today - timedelta(days=n_days - 1)
+    operations = ledger.roll_forward({m: first_day for m in range(1, N_MATERIALS + 1)})
+    print(f"CostLedger (incl. grouping): {time.perf_counter() - started:.2f}s")
+
+    ledger_rows = []
+    for query, params in operations:
+        if query.lstrip().startswith("INSERT"):
+            ledger_rows += [params[i : i + 5] for i in range(0, len(params), 5)]
+    differing = set(numpy_rows) ^ set(ledger_rows)
+    print(f"Rows differing between NumPy and CostLedger: {len(differing)}")
+
+    if sql:
+        run_sql(purchases, order_details, recipes, numpy_rows, today)
+
+
+if __name__ == "__main__":
+    args = [i for i in sys.argv[1:] if i != "--sql"]
+    main(*(int(i) for i in args), sql="--sql" in sys.argv[1:])
@@ -0,0 +1,46 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable
+
+from logging_setup.setup import LOGGER
+
+from .config import POOL_SIZE
+from .DataAccessObjects import DaoOrderapp
+
+# Bounded thread pool running blocking mysql.connector calls off the NiceGUI event loop
+## Every running call holds one connection, the pool keeps one more for the event loop (POOL_CONNECTIONS)
+DB_EXECUTOR = ThreadPoolExecutor(
+    max_workers=POOL_SIZE, thread_name_prefix="orderapp-db"
+)
+
+
+async def run_in_db_thread(func: Callable, *args, **kwargs) -> Any:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(DB_EXECUTOR, partial(func, *args, **kwargs))
+
+
+def shutdown_db_threads():
+    DB_EXECUTOR.shutdown(wait=False, cancel_futures=True)
+    LOGGER.info("Shut down database threads")
+
+
+# Async variant of any DAO in the DaoOrderapp hierarchy (DaoOrderPage, DaoPreOrderPage, DaoRecipePage...)
+## Every method of the wrapped DAO becomes awaitable and runs in DB_EXECUTOR, e.g.
+## await AsyncDao(DaoOrderPage(pool=pool)).fetch_today_orders()
+## Requires pool mode because calls from different threads cannot share one connection
+class AsyncDao:
+    def __init__(self, dao: DaoOrderapp):
+        if dao.pool is None:
+            raise ValueError("AsyncDao requires a DAO created with a connection pool")
+        self.dao = dao
+
+    def __getattr__(self, name: str):
+        attr = getattr(self.dao, name)
+        if not callable(attr):
+            return attr
+
+        async def call(*args, **kwargs):
+            return await run_in_db_thread(attr, *args, **kwargs)
+
+        return call
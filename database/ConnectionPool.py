@@ -0,0 +1,186 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Iterator
+
+import mysql.connector
+from mysql.connector import MySQLConnection
+
+from logging_setup.setup import LOGGER
+
+from .config import HEALTH_CHECK_INTERVAL, POOL_CONNECTIONS, POOL_TIMEOUT
+
+
+# Thread-safe pool of MySQL connections shared by every page and DAO
+## Connections are opened lazily up to size, and waiting callers block until one is returned
+## Idle connections are pinged only when they have been idle longer than health_check_interval
+## A connection checked out by a thread is reused by nested checkouts of the same thread,
+## so a page build and the DAO calls inside it share one connection
+class ConnectionPool:
+    def __init__(
+        self,
+        connect_config: dict,
+        size: int = POOL_CONNECTIONS,
+        timeout: float = POOL_TIMEOUT,
+        health_check_interval: float = HEALTH_CHECK_INTERVAL,
+    ):
+        if size < 1:
+            raise ValueError(f"Pool size must be at least 1, got {size}")
+        self.connect_config = connect_config
+        self.size = size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        # Idle connections with the monotonic time they were last returned
+        self._idle: deque[tuple[MySQLConnection, float]] = deque()
+        self._created = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._condition = threading.Condition()
+        self._local = threading.local()
+        self._closed = False
+        # Statistics
+        self._checkouts = 0
+        self._checkout_seconds = 0.0
+        self._max_checkout_seconds = 0.0
+        self._health_checks = 0
+        self._reconnects = 0
+
+    def _open(self) -> MySQLConnection:
+        connection = mysql.connector.connect(**self.connect_config)
+        LOGGER.info(f"Pool connection opened ({self._created}/{self.size})")
+        return connection
+
+    # Ping only stale connections, replace the connection if ping fails
+    def _check_health(self, connection: MySQLConnection, idle_since: float):
+        if time.monotonic() - idle_since < self.health_check_interval:
+            return connection
+        self._health_checks += 1
+        try:
+            connection.ping(reconnect=True, attempts=1, delay=0)
+            return connection
+        except Exception as e:
+            LOGGER.warning(f"Pool connection failed health check: {e}")
+            self._reconnects += 1
+            try:
+                connection.close()
+            except Exception:
+                pass
+            return self._open()
+
+    def get_connection(self) -> MySQLConnection:
+        start = time.monotonic()
+        deadline = start + self.timeout
+        with self._condition:
+            if self._closed:
+                raise ConnectionError("Connection pool is closed")
+            while not self._idle and self._created >= self.size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    LOGGER.error(
+                        f"Timed out waiting for a pool connection. {self.stats()}"
+                    )
+                    raise TimeoutError(
+                        f"No free connection after {self.timeout} seconds"
+                    )
+                self._waiting += 1
+                try:
+                    self._condition.wait(remaining)
+                finally:
+                    self._waiting -= 1
+            if self._idle:
+                connection, idle_since = self._idle.pop()
+            else:
+                connection, idle_since = None, None
+                self._created += 1
+            self._in_use += 1
+
+        # Connect and ping outside of the lock so other threads are not blocked by network I/O
+        try:
+            if connection is None:
+                connection = self._open()
+            else:
+                connection = self._check_health(connection, idle_since)
+        except Exception:
+            with self._condition:
+                self._in_use -= 1
+                self._created -= 1
+                self._condition.notify()
+            raise
+
+        elapsed = time.monotonic() - start
+        with self._condition:
+            self._checkouts += 1
+            self._checkout_seconds += elapsed
+            self._max_checkout_seconds = max(self._max_checkout_seconds, elapsed)
+        return connection
+
+    def release(self, connection: MySQLConnection):
+        with self._condition:
+            self._in_use -= 1
+            if self._closed:
+                self._created -= 1
+                connection.close()
+            else:
+                # Discard uncommitted work so the next user starts from a clean state
+                try:
+                    if connection.in_transaction:
+                        connection.rollback()
+                    self._idle.append((connection, time.monotonic()))
+                except Exception as e:
+                    LOGGER.warning(f"Drop broken pool connection: {e}")
+                    self._created -= 1
+            self._condition.notify()
+
+    @contextmanager
+    def connection(self) -> Iterator[MySQLConnection]:
+        held = getattr(self._local, "connection", None)
+        if held is not None:
+            yield held
+            return
+        connection = self.get_connection()
+        self._local.connection = connection
+        try:
+            yield connection
+        finally:
+            self._local.connection = None
+            self.release(connection)
+
+    def close_all(self):
+        with self._condition:
+            self._closed = True
+            while self._idle:
+                connection, _ = self._idle.pop()
+                self._created -= 1
+                try:
+                    connection.close()
+                except Exception as e:
+                    LOGGER.error(e)
+            self._condition.notify_all()
+        LOGGER.info("Close all SQL pool connections")
+
+    def stats(self) -> dict:
+        average = self._checkout_seconds / self._checkouts if self._checkouts else 0
+        return {
+            "size": self.size,
+            "created": self._created,
+            "idle": len(self._idle),
+            "in_use": self._in_use,
+            "waiting": self._waiting,
+            "checkouts": self._checkouts,
+            "avg_checkout_ms": round(average * 1000, 3),
+            "max_checkout_ms": round(self._max_checkout_seconds * 1000, 3),
+            "health_checks": self._health_checks,
+            "reconnects": self._reconnects,
+        }
+
+    # Gauges of Metrics.METRICS, read at scrape time
+    def metric_samples(self) -> list[tuple[str, dict, float]]:
+        stats = self.stats()
+        return [
+            ("orderapp_pool_connections", {"state": "idle"}, stats["idle"]),
+            ("orderapp_pool_connections", {"state": "in_use"}, stats["in_use"]),
+            ("orderapp_pool_connections", {"state": "waiting"}, stats["waiting"]),
+            ("orderapp_pool_connections", {"state": "size"}, stats["size"]),
+            ("orderapp_pool_reconnects", {}, stats["reconnects"]),
+        ]
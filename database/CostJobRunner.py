@@ -0,0 +1,166 @@
+import queue
+import threading
+import time
+
+import schedule
+
+from logging_setup.setup import LOGGER
+
+from .DataAccessObjects import DaoCostJobs
+from .Metrics import METRICS
+from .update_cost import update_costs, update_dirty_costs
+from .WriteEvents import WRITE_EVENTS
+
+COST_UPDATE_TIME = "08:00:00"
+COST_UPDATE_TIMEZONE = "Asia/Taipei"
+# Writes queue a dirty run once no write came for WRITE_DEBOUNCE seconds,
+# and at the latest WRITE_MAX_DELAY seconds after the first write
+WRITE_DEBOUNCE = 2.0
+WRITE_MAX_DELAY = 30.0
+
+# dirty: roll forward the materials in material_cost_dirty (update_dirty_costs)
+# full: rebuild every material since start_date (update_costs)
+JOBS = {"dirty": update_dirty_costs, "full": update_costs}
+
+
+# Background runner owning the cost updates, so they never run on the NiceGUI event loop
+## One worker thread with its own MySQL connection runs the daily schedule and queued jobs in order
+## run_now skips a job that is already queued, a job requested while it runs is queued once more
+## so writes made during the run are picked up
+## Every run is recorded in orderapp.cost_job_runs with its trigger, status, duration and result
+## Writes published on WRITE_EVENTS are debounced into one dirty run (run_trigger "write")
+## stop() drops the queued jobs and waits for the running one (a transaction is not interrupted)
+class CostJobRunner:
+    def __init__(
+        self,
+        dao: DaoCostJobs | None = None,
+        update_time: str = COST_UPDATE_TIME,
+    ):
+        self.dao = dao if dao is not None else DaoCostJobs()
+        self.scheduler = schedule.Scheduler()
+        self.scheduler.every().day.at(update_time, COST_UPDATE_TIMEZONE).do(
+            self.run_now, "dirty", run_trigger="schedule"
+        )
+        self._queue: queue.Queue = queue.Queue()
+        self._queued: set[str] = set()
+        # Monotonic times of the first and latest write not yet queued
+        self._first_write: float | None = None
+        self._last_write: float | None = None
+        self._running: str | None = None
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._work, name="orderapp-cost-jobs", daemon=True
+        )
+        self._thread.start()
+        WRITE_EVENTS.subscribe(self.on_write)
+        LOGGER.info(f"Cost job runner started. Next run: {self.scheduler.next_run}")
+
+    def run_now(self, job: str = "dirty", run_trigger: str = "manual", **kwargs) -> bool:
+        if job not in JOBS:
+            raise ValueError(f"Unknown cost job {job}, use one of {list(JOBS)}")
+        with self._lock:
+            if self._stopping.is_set() or job in self._queued:
+                LOGGER.debug(f"Cost job {job} ({run_trigger}) skipped, already queued")
+                return False
+            self._queued.add(job)
+        self._queue.put((job, run_trigger, kwargs))
+        return True
+
+    def on_write(self, table: str, ids: list[int], op: str):
+        now = time.monotonic()
+        with self._lock:
+            if self._first_write is None:
+                self._first_write = now
+            self._last_write = now
+
+    def _queue_debounced_write(self):
+        now = time.monotonic()
+        with self._lock:
+            if self._first_write is None:
+                return
+            if (
+                now - self._last_write < WRITE_DEBOUNCE
+                and now - self._first_write < WRITE_MAX_DELAY
+            ):
+                return
+            self._first_write = None
+            self._last_write = None
+        self.run_now("dirty", run_trigger="write")
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "running": self._running,
+                "queued": sorted(self._queued),
+                "next_run": self.scheduler.next_run,
+            }
+
+    def stop(self, timeout: float = 10):
+        WRITE_EVENTS.unsubscribe(self.on_write)
+        self._stopping.set()
+        with self._lock:
+            dropped = sorted(self._queued)
+            self._queued.clear()
+        if dropped:
+            LOGGER.warning(f"Cancel queued cost job(s) {dropped}")
+        # Wake the worker if it is waiting on an empty queue
+        self._queue.put(None)
+        if self._thread is not None:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                LOGGER.warning("Cost job still running at shutdown")
+                return
+        self.dao.close_connection()
+        LOGGER.info("Cost job runner stopped")
+
+    def _work(self):
+        while not self._stopping.is_set():
+            self.scheduler.run_pending()
+            self._queue_debounced_write()
+            try:
+                item = self._queue.get(timeout=WRITE_DEBOUNCE / 4)
+            except queue.Empty:
+                continue
+            if item is None or self._stopping.is_set():
+                continue
+            job, run_trigger, kwargs = item
+            with self._lock:
+                self._queued.discard(job)
+                self._running = job
+            try:
+                self._run(job, run_trigger, kwargs)
+            finally:
+                with self._lock:
+                    self._running = None
+
+    def _run(self, job: str, run_trigger: str, kwargs: dict):
+        started = time.monotonic()
+        rows_before = self.dao.affected_rows
+        self.dao.connect_orderapp()
+        run_id = self.dao.start_cost_job(job, run_trigger)
+        try:
+            message = JOBS[job](self.dao, **kwargs)
+            status = "failed" if "Transaction failed" in message else "succeeded"
+        except Exception as e:
+            LOGGER.error(e)
+            message = str(e)
+            status = "failed"
+        duration_ms = int((time.monotonic() - started) * 1000)
+        LOGGER.info(f"Cost job {job} ({run_trigger}) {status} in {duration_ms} ms")
+        METRICS.observe(
+            "orderapp_cost_job_duration_seconds",
+            duration_ms / 1000,
+            job=job,
+            status=status,
+        )
+        METRICS.inc(
+            "orderapp_cost_job_rows_total", self.dao.affected_rows - rows_before, job=job
+        )
+        if run_id is not None:
+            self.dao.finish_cost_job(run_id, status, duration_ms, message)
@@ -0,0 +1,241 @@
+from bisect import bisect_left
+from datetime import date, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+from operator import itemgetter
+from typing import TYPE_CHECKING
+
+from logging_setup.setup import LOGGER
+
+from .queries import PRICE_FLOOR, format_delete_query, format_insert_query
+
+if TYPE_CHECKING:
+    from .DataAccessObjects import DaoOrderapp
+
+# Materials marked by queries.mark_cost_dirty that are due (dirty_from not after today)
+DIRTY_MATERIALS = """
+        SELECT material_id, dirty_from
+        FROM orderapp.material_cost_dirty
+        WHERE dirty_from <= %s
+        """
+
+# Should be called with the placeholders of the dirty material ids
+## Rows from the latest dirty_from onwards are rewritten, so they are not read
+LEDGER_MATERIAL_COSTS = """
+        SELECT
+            material_id,
+            cost_date,
+            stocked_quantity,
+            stocked_cost,
+            cost_per_unit
+        FROM orderapp.material_costs
+        WHERE material_id IN ({placeholders})
+        AND cost_date < %s
+        ORDER BY material_id, cost_date
+        """
+
+LEDGER_PURCHASES = """
+        SELECT
+            pd.material_id,
+            p.purchase_date AS ledger_date,
+            SUM(pd.quantity) AS quantity,
+            SUM(pd.price_total) AS cost
+        FROM orderapp.purchase_details pd
+        JOIN orderapp.purchases p ON pd.purchase_id = p.purchase_id
+        WHERE pd.material_id IN ({placeholders})
+        AND p.purchase_date >= %s
+        AND p.purchase_date <= %s
+        GROUP BY pd.material_id, p.purchase_date
+        """
+
+# Usage by completed orders, based on the recipe that existed at o.order_timestamp
+## Only quantities are summed, the usage cost depends on the material cost which is rolled forward
+LEDGER_USAGES = """
+        SELECT
+            r.material_id,
+            o.order_date AS ledger_date,
+            SUM(od.quantity * r.quantity) AS quantity
+        FROM orderapp.order_details od
+        JOIN orderapp.orders o ON od.order_id = o.order_id
+        JOIN orderapp.recipes r ON od.product_id = r.product_id
+            AND o.order_timestamp >= r.start_timestamp
+            AND (r.end_timestamp IS NULL OR o.order_timestamp < r.end_timestamp)
+        WHERE o.order_status = "已完成"
+        AND r.material_id IN ({placeholders})
+        AND o.order_date >= %s
+        AND o.order_date < %s
+        GROUP BY r.material_id, o.order_date
+        """
+
+DELETE_LEDGER_COSTS = format_delete_query(
+    "material_costs",
+    ["material_id", "cost_date"],
+    val_args="material_id = %s AND cost_date >= %s",
+)
+LEDGER_COST_COLS = [
+    "material_id",
+    "cost_date",
+    "stocked_quantity",
+    "stocked_cost",
+    "cost_per_unit",
+]
+# A material marked again with an earlier date while rolling stays dirty
+CLEAR_DIRTY = format_delete_query(
+    "material_cost_dirty",
+    ["material_id", "dirty_from"],
+    val_args="material_id = %s AND dirty_from = %s",
+)
+
+CENT = Decimal("0.01")
+COST_UNIT = Decimal("0.00001")
+
+
+# Running stock/cost ledger of the dirty materials, rolled forward one day at a time
+## Follows the rules of update_cost.UPDATE_MATERIAL_COST without re-aggregating the whole history:
+## - The stock of a day includes its purchases and the completed orders before (not on) that day
+## - Usage is costed with the latest cost before the order date, or the earliest cost if there is none
+## - Usage before the material has any cost is held back until the first cost exists
+## - A row is only written when stocked quantity, stocked cost or cost per unit change
+## Rows from dirty_from onwards are deleted and rewritten in the returned operations
+## The stock before dirty_from is summed again from purchases and usages, costed at the stored
+## cost per unit, because the stored stock is rounded and UPDATE_MATERIAL_COST never reads it
+## (seeding from the stored stocked_cost drifts by a cent, see tests/test_cost_ledger.py)
+class CostLedger:
+    def __init__(self, dao: "DaoOrderapp", today: date | None = None):
+        self.dao = dao
+        self.today = today if today is not None else date.today()
+
+    def fetch_dirty(self) -> dict[int, date]:
+        result = self.dao.query_data(DIRTY_MATERIALS, (self.today,))
+        return {i["material_id"]: i["dirty_from"] for i in result} if result else {}
+
+    def _fetch_grouped(
+        self, query: str, material_ids: list[int], start, end
+    ) -> dict[tuple[int, date], dict]:
+        placeholders = ", ".join(["%s"] * len(material_ids))
+        result = self.dao.query_data(
+            query.format(placeholders=placeholders), (*material_ids, start, end)
+        )
+        return (
+            {(i["material_id"], i["ledger_date"]): i for i in result} if result else {}
+        )
+
+    # Return the operations rewriting material_costs of the dirty materials and clearing them
+    def roll_forward(self, dirty: dict[int, date]) -> list[tuple]:
+        if not dirty:
+            return []
+        material_ids = sorted(dirty)
+        placeholders = ", ".join(["%s"] * len(material_ids))
+        cost_rows = (
+            self.dao.query_data(
+                LEDGER_MATERIAL_COSTS.format(placeholders=placeholders),
+                (*material_ids, max(dirty.values())),
+            )
+            or []
+        )
+        purchases = self._fetch_grouped(
+            LEDGER_PURCHASES, material_ids, PRICE_FLOOR, self.today
+        )
+        usages = self._fetch_grouped(
+            LEDGER_USAGES, material_ids, PRICE_FLOOR, self.today
+        )
+
+        operations = []
+        for material_id in material_ids:
+            dirty_from = dirty[material_id]
+            previous_rows = [
+                i
+                for i in cost_rows
+                if i["material_id"] == material_id and i["cost_date"] < dirty_from
+            ]
+            new_rows = self._roll_material(
+                material_id, dirty_from, previous_rows, purchases, usages
+            )
+            operations.append((DELETE_LEDGER_COSTS, (material_id, dirty_from)))
+            # All new rows of a material go in one multi-row INSERT
+            if new_rows:
+                row_placeholders = "), (".join(
+                    [", ".join(["%s"] * len(LEDGER_COST_COLS))] * len(new_rows)
+                )
+                operations.append(
+                    (
+                        format_insert_query(
+                            "material_costs", LEDGER_COST_COLS, row_placeholders
+                        ),
+                        tuple(i for row in new_rows for i in row),
+                    )
+                )
+            operations.append((CLEAR_DIRTY, (material_id, dirty_from)))
+            LOGGER.debug(
+                f"Roll material {material_id} from {dirty_from}, {len(new_rows)} cost rows"
+            )
+        return operations
+
+    def _roll_material(
+        self,
+        material_id: int,
+        dirty_from: date,
+        previous_rows: list[dict],
+        purchases: dict[tuple[int, date], dict],
+        usages: dict[tuple[int, date], dict],
+    ) -> list[tuple]:
+        # (cost_date, cost_per_unit) known so far, in date order
+        known_costs = [(i["cost_date"], i["cost_per_unit"]) for i in previous_rows]
+        last_written = None
+        if previous_rows:
+            last = previous_rows[-1]
+            last_written = (
+                last["stocked_quantity"],
+                last["stocked_cost"],
+                last["cost_per_unit"],
+            )
+        # Stock at the end of the day before dirty_from: its purchases and the orders before it
+        quantity, cost = Decimal(0), Decimal(0)
+        has_stock = False
+        for (m, d), i in purchases.items():
+            if m == material_id and d < dirty_from:
+                quantity += i["quantity"]
+                cost += i["cost"]
+                has_stock = True
+        # Without an earlier cost, these orders are still waiting for one
+        pending_usages = [
+            (d, i["quantity"])
+            for (m, d), i in sorted(usages.items())
+            if m == material_id and d < dirty_from - timedelta(days=1)
+        ]
+
+        new_rows = []
+        cost_date = dirty_from
+        while cost_date <= self.today:
+            usage = usages.get((material_id, cost_date - timedelta(days=1)))
+            if usage:
+                pending_usages.append((usage["ledger_date"], usage["quantity"]))
+            if pending_usages and known_costs:
+                for order_date, used_quantity in pending_usages:
+                    quantity -= used_quantity
+                    cost -= used_quantity * self._cost_before(known_costs, order_date)
+                pending_usages = []
+
+            purchase = purchases.get((material_id, cost_date))
+            if purchase:
+                quantity += purchase["quantity"]
+                cost += purchase["cost"]
+                has_stock = True
+
+            # Same as the SQL update: no row before the first purchase or for an empty stock
+            if has_stock and quantity != 0:
+                row = (
+                    quantity.quantize(CENT, ROUND_HALF_UP),
+                    cost.quantize(CENT, ROUND_HALF_UP),
+                    (cost / quantity).quantize(COST_UNIT, ROUND_HALF_UP),
+                )
+                if row != last_written:
+                    new_rows.append((material_id, cost_date, *row))
+                    known_costs.append((cost_date, row[2]))
+                    last_written = row
+            cost_date += timedelta(days=1)
+        return new_rows
+
+    @staticmethod
+    def _cost_before(known_costs: list[tuple[date, Decimal]], order_date: date):
+        earlier = bisect_left(known_costs, order_date, key=itemgetter(0))
+        return known_costs[earlier - 1][1] if earlier else known_costs[0][1]
@@ -1,62 +1,132 @@
-import os
-from datetime import datetime
-from typing import override
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
+from typing import Iterator, override
 
 import mysql.connector
-from dotenv import load_dotenv
 from mysql.connector import MySQLConnection
 
 from logging_setup.setup import LOGGER
 from pages.components.constants import DAYS_OPTIONS
 
 from . import queries
+from .config import GRID_BLOCK_MAX_ROWS, SLOW_QUERY_MS, connect_config
+from .ConnectionPool import ConnectionPool
 from .FieldSchema import FieldSchema
-
-load_dotenv()
-connect_config = {
-    "host": os.getenv("MYSQL_HOST"),
-    "user": os.getenv("MYSQL_USER"),
-    "password": os.getenv("MYSQL_PASSWORD"),
-    "database": os.getenv("MYSQL_DATABASE"),
+from .Metrics import METRICS
+from .NameCache import NAME_CACHE
+from .QueryStats import QUERY_STATS
+from .ReadCache import READ_CACHE
+from .WriteEvents import ORDER_CHANGES, WRITE_EVENTS
+
+# Tables looked up by NAME_CACHE and their name column, deletes from them invalidate the cache
+CACHED_TABLES = {
+    "products": "product_name",
+    "materials": "material_name",
+    "vendors": "vendor_name",
+    "uom": "uom_name",
 }
 
-if not all(connect_config.values()):
-    LOGGER.error(ValueError(f"Failed to load .env mysql config. {connect_config}"))
-    raise ValueError(f"Failed to load .env mysql config. {connect_config}")
-
 
 # Base data access object for interfacing with MySQL database
+## Pool mode (pool is provided): every call checks out a connection from the pool and returns it afterwards
+## Single connection mode (default): every call uses self.connection
 class DaoOrderapp:
-    def __init__(self, connection: MySQLConnection | None = None):
+    def __init__(
+        self,
+        connection: MySQLConnection | None = None,
+        pool: ConnectionPool | None = None,
+    ):
         self.connection = connection if connection != None else None
+        self.pool = pool
+        # Rows affected by the committed transactions of this DAO (read by CostJobRunner)
+        self.affected_rows = 0
 
+    # Pool handles its own health checks, no need to ping on every page hit
     def connect_orderapp(self) -> str:
         try:
-            if self.connection is None:
+            if self.pool is not None:
+                LOGGER.debug(f"Connection pool in use. {self.pool.stats()}")
+                METRICS.inc("orderapp_dao_connect_total", result="pool")
+            elif self.connection is None:
                 self.connection = mysql.connector.connect(**connect_config)
                 LOGGER.info("Connection success")
+                METRICS.inc("orderapp_dao_connect_total", result="connect")
             else:
                 self.connection.ping(reconnect=True, attempts=3, delay=5)
                 LOGGER.info("Connection existed")
+                METRICS.inc("orderapp_dao_connect_total", result="ping")
         except Exception as e:
             LOGGER.error(ConnectionError(f"Fail to connect: {e}"))
+            METRICS.inc("orderapp_dao_connect_total", result="error")
 
     def close_connection(self):
         try:
-            self.connection.close()
-            LOGGER.info("Close SQL connection")
+            if self.pool is not None:
+                self.pool.close_all()
+            else:
+                self.connection.close()
+                LOGGER.info("Close SQL connection")
         except Exception as e:
             LOGGER.error(e)
 
+    # Yield the connection to use for one call (or one page build when nested calls are wrapped)
+    @contextmanager
+    def checkout(self) -> Iterator[MySQLConnection]:
+        if self.pool is None:
+            yield self.connection
+        else:
+            with self.pool.connection() as connection:
+                yield connection
+
+    # Time the statement executed in the block and record it in QUERY_STATS under its query name
+    ## The block sets timing["rows"] (rows fetched by a SELECT, cursor.rowcount of a write)
+    ## A statement slower than SLOW_QUERY_MS is logged with its EXPLAIN (not for executemany)
+    @contextmanager
+    def timed_query(
+        self,
+        connection: MySQLConnection,
+        query: str,
+        params: dict | tuple | None = None,
+        explain: bool = True,
+    ) -> Iterator[dict]:
+        timing = {"rows": -1}
+        started = time.perf_counter()
+        yield timing
+        duration_ms = (time.perf_counter() - started) * 1000
+        caller = type(self).__name__
+        name = QUERY_STATS.record(query, duration_ms, timing["rows"], caller)
+        if duration_ms >= SLOW_QUERY_MS:
+            plan = self.explain(connection, query, params) if explain else None
+            LOGGER.warning(
+                f"Slow query {name} ({caller}) {duration_ms:.0f} ms, {timing['rows']} rows. EXPLAIN: {plan}"
+            )
+
+    def explain(
+        self, connection: MySQLConnection, query: str, params: dict | tuple | None
+    ) -> list[dict] | None:
+        try:
+            cursor = connection.cursor(dictionary=True)
+            cursor.execute(f"EXPLAIN {query}", params)
+            plan = cursor.fetchall()
+            cursor.close()
+            return plan
+        except Exception as e:
+            LOGGER.warning(f"EXPLAIN failed: {e}")
+
     def check_existence(self, table: str, col: str, val: str) -> bool:
         try:
-            cursor = self.connection.cursor()
-            params = {"val": val}
-            query = f"""
-                SELECT EXISTS(SELECT * FROM orderapp.{table} WHERE {col} = %(val)s)
-                """
-            cursor.execute(query, params)
-            existence = True if cursor.fetchone()[0] else False
+            with self.checkout() as connection:
+                cursor = connection.cursor()
+                params = {"val": val}
+                query = f"""
+                    SELECT EXISTS(SELECT * FROM orderapp.{table} WHERE {col} = %(val)s)
+                    """
+                with self.timed_query(connection, query, params) as timing:
+                    cursor.execute(query, params)
+                    existence = True if cursor.fetchone()[0] else False
+                    timing["rows"] = 1
+                cursor.close()
             return existence
         except Exception as e:
             LOGGER.error(e)
@@ -64,9 +134,13 @@ class DaoOrderapp:
     def query_data(
         self, query: str, params: dict | tuple | None = None
     ) -> list[dict] | None:
-        cursor = self.connection.cursor(dictionary=True)
-        cursor.execute(query, params)
-        results = cursor.fetchall()
+        with self.checkout() as connection:
+            cursor = connection.cursor(dictionary=True)
+            with self.timed_query(connection, query, params) as timing:
+                cursor.execute(query, params)
+                results = cursor.fetchall()
+                timing["rows"] = len(results)
+            cursor.close()
         try:
             if len(results) == 0:
                 return None
@@ -75,46 +149,150 @@ class DaoOrderapp:
         except Exception as e:
             LOGGER.error(e)
 
-    def perform_transaction(self, operations: list[tuple]) -> str:
+    # Rows [start_row, end_row) of base_query under a grid's sort and filter models
+    ## (see queries.format_grid_block_query), default_sort applies when the grid sorts nothing
+    ## A request outside the whitelisted fields or filters is logged and gets no rows
+    def fetch_grid_block(
+        self,
+        base_query: str,
+        fields: list[str],
+        key: str,
+        start_row: int,
+        end_row: int,
+        sort_model: list[dict] | None = None,
+        filter_model: dict | None = None,
+        default_sort: list[dict] | None = None,
+    ) -> list[dict]:
         try:
-            for query, params in operations:
-                cursor = self.connection.cursor()
-                cursor.execute(query, params)
-                row_count = cursor.rowcount
-            self.connection.commit()
-            return f"Transaction successful. Affected: {row_count}."
-        except Exception as e:
-            self.connection.rollback()
-            return f"Transaction failed (Rollback...): {e}\nOperations: {operations}"
+            query, params = queries.format_grid_block_query(
+                base_query,
+                fields,
+                key,
+                sort_model or default_sort or [],
+                filter_model or {},
+            )
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            LOGGER.warning(f"Rejected grid block request: {e}")
+            return []
+        params["limit"] = max(0, min(end_row - start_row, GRID_BLOCK_MAX_ROWS))
+        params["offset"] = max(0, start_row)
+        return self.query_data(query, params) or []
+
+    # query, or query_by_ids (a {placeholders} template) restricted to ids
+    ## ids None reads every row, an empty ids list reads nothing
+    def query_by_ids(
+        self, query: str, query_by_ids: str, ids: list[int] | None
+    ) -> list[dict] | None:
+        if ids is None:
+            return self.query_data(query)
+        if not ids:
+            return None
+        placeholders = ", ".join(["%s"] * len(ids))
+        return self.query_data(
+            query_by_ids.format(placeholders=placeholders), tuple(ids)
+        )
+
+    def perform_transaction(self, operations: list[tuple]) -> str:
+        with self.checkout() as connection:
+            try:
+                affected_rows = 0
+                for query, params in operations:
+                    cursor = connection.cursor()
+                    with self.timed_query(connection, query, params) as timing:
+                        cursor.execute(query, params)
+                        row_count = timing["rows"] = cursor.rowcount
+                    affected_rows += max(row_count, 0)
+                connection.commit()
+                self.affected_rows += affected_rows
+                return f"Transaction successful. Affected: {row_count}."
+            except Exception as e:
+                connection.rollback()
+                # Query names instead of the full operations, params may be whole row sets
+                names = [QUERY_STATS.query_name(query) for query, _ in operations]
+                return f"Transaction failed (Rollback...): {e}\nOperations: {names}"
+
+    # Insert a basic row and its detail rows in one transaction
+    ## The basic id is taken from cursor.lastrowid and prepended to every detail row,
+    ## detail rows are sent together through executemany (rewritten as a multi-row INSERT)
+    def insert_with_details(
+        self,
+        basic: tuple[str, tuple],
+        detail_query: str,
+        detail_rows: list[tuple],
+    ) -> tuple[int | None, str]:
+        with self.checkout() as connection:
+            cursor = connection.cursor()
+            try:
+                with self.timed_query(connection, *basic) as timing:
+                    cursor.execute(*basic)
+                    basic_id = cursor.lastrowid
+                    timing["rows"] = cursor.rowcount
+                with self.timed_query(connection, detail_query, explain=False) as timing:
+                    cursor.executemany(
+                        detail_query, [(basic_id, *row) for row in detail_rows]
+                    )
+                    row_count = timing["rows"] = cursor.rowcount
+                connection.commit()
+                return basic_id, f"Transaction successful. Affected: {row_count}."
+            except Exception as e:
+                connection.rollback()
+                names = [QUERY_STATS.query_name(i) for i in (basic[0], detail_query)]
+                return None, (
+                    f"Transaction failed (Rollback...): {e}\nOperations: {names}, {len(detail_rows)} detail rows"
+                )
+            finally:
+                cursor.close()
+
+    # Resolve names to ids through NAME_CACHE, missing names are left out of the result
+    def get_ids_by_names(self, name_col: str, names: list[str]) -> dict[str, int]:
+        return NAME_CACHE.get_ids(self, name_col, names)
+
+    def get_id_by_name(self, name_col: str, name: str) -> int | None:
+        return NAME_CACHE.get_id(self, name_col, name)
+
+    def get_existed_names(self, name_col: str) -> list[str]:
+        return NAME_CACHE.get_names(self, name_col)
+
+    # Reference data read through READ_CACHE, tables are the ones the query reads
+    ## Writes to those tables must call READ_CACHE.invalidate(table)
+    def cached_query(
+        self, query: str, params: tuple | None = None, tables: tuple[str, ...] = ()
+    ) -> list[dict] | None:
+        return READ_CACHE.query(self, query, params, tables)
+
+    def fetch_product_price_pairs(self) -> list[dict] | None:
+        return self.cached_query(
+            queries.PRODUCT_PRICE, tables=("products", "product_prices")
+        )
+
+    # Users are only written outside the app, so they are kept for READ_CACHE_TTL
+    def fetch_users(self) -> list[dict] | None:
+        return self.cached_query(queries.USERS, tables=("users",))
 
     def get_value_options(self, schemas: list[FieldSchema], fields: list[str]):
         for s in schemas:
             if s.field in fields:
-                if not queries.existed[s.field]:
+                if s.field not in NAME_CACHE.name_cols:
                     LOGGER.error(f"No query for checking existence of {s.field}")
                 else:
-                    existed_vals = self.query_data(queries.existed[s.field])
-                    value_options = (
-                        [i[s.field] for i in existed_vals] if existed_vals else []
-                    )
-                    s.value_options = value_options
+                    s.value_options = self.get_existed_names(s.field)
         return schemas
 
     def insert_new_names(self, insert_col: str, insert_vals: list[str]):
         try:
             queries_to_commit = []
-            if insert_col not in queries.existed:
+            if insert_col not in NAME_CACHE.name_cols:
                 LOGGER.error(f"No query for checking existence of {insert_col}")
             if insert_col not in queries.insert:
                 LOGGER.error(f"No query for inserting {insert_col}")
-            existed = self.query_data(queries.existed[insert_col])
-            exisited_names = [i[insert_col] for i in existed] if existed else []
+            exisited_names = self.get_existed_names(insert_col)
             for val in insert_vals:
                 if val not in exisited_names:
                     queries_to_commit.append((queries.insert[insert_col], (val,)))
 
             if queries_to_commit:
                 transaction_result = self.perform_transaction(queries_to_commit)
+                NAME_CACHE.invalidate(insert_col)
                 LOGGER.info(f"Insert new {insert_col}. {transaction_result}")
             else:
                 LOGGER.info(f"No new {insert_col} need inserting")
@@ -123,19 +301,26 @@ class DaoOrderapp:
 
     # Commit delete is design to be called on one table of a time to identify foreign key violation if happened
     # Note: Beaware of the sequence of delete operations
-    def commit_delete(self, delete_id: int, table: str):
+    # Returns whether the delete was committed, like change_order_status
+    def commit_delete(self, delete_id: int, table: str) -> bool:
         try:
             queries_to_commit = []
             if table not in queries.delete:
                 LOGGER.error(f"No delete query for deleting from {table}")
-            else:
-                queries_to_commit.append((queries.delete[table], (delete_id,)))
-                transaction_result = self.perform_transaction(queries_to_commit)
-                LOGGER.info(
-                    f"Delete id: {delete_id} from {table}. {transaction_result}"
-                )
+                return False
+            queries_to_commit.append((queries.delete[table], (delete_id,)))
+            transaction_result = self.perform_transaction(queries_to_commit)
+            if "Transaction failed" in transaction_result:
+                LOGGER.error(f"Delete id: {delete_id} from {table}. {transaction_result}")
+                return False
+            if table in CACHED_TABLES:
+                NAME_CACHE.invalidate(CACHED_TABLES[table])
+            READ_CACHE.invalidate(table)
+            LOGGER.info(f"Delete id: {delete_id} from {table}. {transaction_result}")
+            return True
         except Exception as e:
             LOGGER.error(e)
+            return False
 
     def clean_up_uom(self, uom_id: int):
         uom_exist = self.check_existence("products", "uom_id", uom_id)
@@ -150,6 +335,38 @@ class DaoOrderapp:
             if not in_purchase and not in_recipe and not in_cost:
                 self.commit_delete(m_id, "materials")
 
+    # Recompute daily_order_summary for the given order dates, one delete and insert per date
+    def refresh_order_summary(self, order_dates: list[date]):
+        queries_to_commit = []
+        for order_date in sorted(set(order_dates)):
+            params = {"order_date": order_date}
+            queries_to_commit.append((queries.DELETE_DAILY_ORDER_SUMMARY, params))
+            queries_to_commit.append((queries.REFRESH_DAILY_ORDER_SUMMARY, params))
+        if queries_to_commit:
+            transaction_result = self.perform_transaction(queries_to_commit)
+            LOGGER.info(
+                f"Refresh daily order summary for {sorted(set(order_dates))}. {transaction_result}"
+            )
+
+    def fetch_uncosted_summary_dates(self) -> list[date]:
+        result = self.query_data(queries.UNCOSTED_SUMMARY_DATES)
+        return [i["order_date"] for i in result] if result else []
+
+    # Mark the materials of one order, purchase or product dirty for update_dirty_costs
+    # and publish the write on WRITE_EVENTS
+    ## Marks read the rows being written, so call before deleting and after inserting them
+    def mark_cost_dirty(self, table: str, mark_id: int):
+        try:
+            transaction_result = self.perform_transaction(
+                [(queries.mark_cost_dirty[table], (mark_id,))]
+            )
+            LOGGER.debug(
+                f"Mark material costs dirty from {table} id: {mark_id}. {transaction_result}"
+            )
+            WRITE_EVENTS.publish(table, [mark_id])
+        except Exception as e:
+            LOGGER.error(e)
+
 
 # Data access object for purchase page
 class DaoPurchasePage(DaoOrderapp):
@@ -159,11 +376,16 @@ class DaoPurchasePage(DaoOrderapp):
         )
         super().__init__(connection)
 
-    def fetch_purchase_data(self) -> tuple[list[dict], list[dict]]:
+    # Details only, the overview is read in blocks by the server-side grid
+    # An empty list means no such purchases, None means the query failed
+    def fetch_purchase_details(
+        self, purchase_ids: list[int] | None = None
+    ) -> list[dict] | None:
         try:
-            overview_data = self.query_data(queries.PURCHASES_OVERVIEW)
-            details_data = self.query_data(queries.PURCHASE_DETAILS)
-            return overview_data, details_data
+            details = self.query_by_ids(
+                queries.PURCHASE_DETAILS, queries.PURCHASE_DETAILS_BY_IDS, purchase_ids
+            )
+            return details or []
         except Exception as e:
             LOGGER.error(e)
 
@@ -177,33 +399,49 @@ class DaoPurchasePage(DaoOrderapp):
 
     def insert_purchase_records(
         self, purchase_basic: tuple[str, str], detail_data: list[dict]
-    ):
-        # Insert purchase basic
-
-        self.query_data(queries.insert["purchase_basics"], purchase_basic)
-        # Getting id is necessary to associate the same purchase details with its purchase basics
-        purchase_id = self.query_data("SELECT LAST_INSERT_ID() AS purchase_id")[0][
-            "purchase_id"
-        ]
+    ) -> int | None:
+        if not detail_data:
+            LOGGER.warning("No insertion was executed")
+            return
+        purchase_date, vendor_name = purchase_basic
+        vendor_id = self.get_id_by_name("vendor_name", vendor_name)
+        if vendor_id is None:
+            LOGGER.error(f"Unknown vendor {vendor_name}, no insertion was executed")
+            return
+        material_names = [vals["material_name"] for vals in detail_data]
+        material_ids = self.get_ids_by_names("material_name", material_names)
+        missing = [i for i in material_names if i not in material_ids]
+        if missing:
+            LOGGER.error(f"Unknown material(s) {missing}, no insertion was executed")
+            return
 
-        # Insert purchase details
-        queries_to_commit = []
-        for vals in detail_data:
-            params = (
-                purchase_id,
-                vals["material_name"],
+        # Insert purchase basic and details in one transaction
+        detail_rows = [
+            (
+                material_ids[vals["material_name"]],
                 vals["quantity"],
                 vals["price_total"],
             )
-            insertion = (queries.insert["purchase_details"], params)
-            queries_to_commit.append(insertion)
+            for vals in detail_data
+        ]
+        purchase_id, transaction_result = self.insert_with_details(
+            (queries.insert["purchase_basics"], (purchase_date, vendor_id)),
+            queries.insert["purchase_details"],
+            detail_rows,
+        )
+        LOGGER.info(
+            f"Insert purchase records for id: {purchase_id}. {transaction_result}"
+        )
+        if purchase_id is not None:
+            self.mark_cost_dirty("purchases", purchase_id)
+        return purchase_id
 
-        # Commit
-        if queries_to_commit:
-            transaction_result = self.perform_transaction(queries_to_commit)
-            LOGGER.info(f"Insert purchase details. {transaction_result}")
-        else:
-            LOGGER.warning("No insertion was executed")
+    # Purchase details have to be marked dirty before they are deleted
+    @override
+    def commit_delete(self, delete_id: int, table: str) -> bool:
+        if table == "purchase_details":
+            self.mark_cost_dirty("purchases", delete_id)
+        return super().commit_delete(delete_id, table)
 
     # Product update disable basic info (vendor and purchase_date); thus no need to update those
     def update_purchase_records(
@@ -220,10 +458,21 @@ class DaoPurchasePage(DaoOrderapp):
         new_materials = [vals["material_name"] for vals in update_rows]
         # Materials existed in old but not new records should be deleted
         need_delete = [i for i in og_materials if i not in new_materials]
+        material_ids = self.get_ids_by_names(
+            "material_name", og_materials + new_materials
+        )
+        missing = [i for i in new_materials if i not in material_ids]
+        if missing:
+            LOGGER.error(
+                f"Unknown material(s) {missing}, no purchase update was executed"
+            )
+            return
+        # Mark before deleting so materials taken out of the purchase are included
+        self.mark_cost_dirty("purchases", update_id)
         queries_to_commit = []
         for vals in original_rows:
             if vals["material_name"] in need_delete:
-                update_delete = (update_id, vals["material_name"])
+                update_delete = (update_id, material_ids[vals["material_name"]])
                 queries_to_commit.append(
                     (queries.update_delete["purchases"], update_delete)
                 )
@@ -240,7 +489,7 @@ class DaoPurchasePage(DaoOrderapp):
         for vals in update_rows:
             update = (
                 update_id,
-                vals["material_name"],
+                material_ids[vals["material_name"]],
                 vals["quantity"],
                 vals["price_total"],
             )
@@ -252,44 +501,68 @@ class DaoPurchasePage(DaoOrderapp):
             LOGGER.info(
                 f"Update purchase records for id: {update_id}. {transaction_result}"
             )
+            self.mark_cost_dirty("purchases", update_id)
 
 
 # Data access object for recipe page
 class DaoRecipePage(DaoOrderapp):
-    def __init__(self, connection: MySQLConnection | None = None):
-        self.connection = (
-            connection if connection is not None else super().connect_orderapp()
-        )
-        super().__init__(connection)
+    def __init__(
+        self,
+        connection: MySQLConnection | None = None,
+        pool: ConnectionPool | None = None,
+    ):
+        super().__init__(connection, pool)
 
-    def fetch_recipe_data(self) -> tuple[list[dict], list[dict]]:
+    def fetch_recipe_data(
+        self, product_ids: list[int] | None = None
+    ) -> tuple[list[dict], list[dict]]:
         try:
-            overview_data = self.query_data(queries.PRODUCT_OVERVIEW)
-            details_data = self.query_data(queries.RECIPES)
+            overview_data = self.query_by_ids(
+                queries.PRODUCT_OVERVIEW, queries.PRODUCT_OVERVIEW_BY_IDS, product_ids
+            )
+            details_data = self.query_by_ids(
+                queries.RECIPES, queries.RECIPES_BY_IDS, product_ids
+            )
             return overview_data, details_data
         except Exception as e:
             LOGGER.error(e)
 
-    def insert_product_records(self, product_data: dict):
-        # Insert product record
-        product = (product_data["product_name"], product_data["uom_name"])
-        product_price = product_data["price"]
+    def insert_product_records(self, product_data: dict) -> int | None:
+        # Insert product record and its first price in one transaction
         product_name = product_data["product_name"]
+        uom_id = self.get_id_by_name("uom_name", product_data["uom_name"])
+        if uom_id is None:
+            LOGGER.error(
+                f"Unknown uom {product_data['uom_name']}, no insertion was executed"
+            )
+            return
+        product = (product_name, uom_id)
+        product_price = product_data["price"]
 
-        self.perform_transaction([(queries.insert["product_basics"], product)])
-        product_id = self.query_data("SELECT LAST_INSERT_ID() AS product_id")[0][
-            "product_id"
-        ]
-        transaction_result = self.perform_transaction(
-            [(queries.insert["product_prices"], (product_id, product_price))]
+        product_id, transaction_result = self.insert_with_details(
+            (queries.insert["product_basics"], product),
+            queries.insert["first_product_prices"],
+            [(product_price,)],
         )
+        NAME_CACHE.invalidate("product_name")
+        READ_CACHE.invalidate("products", "product_prices")
         LOGGER.info(f"Insert product records for {product_name}. {transaction_result}")
+        return product_id
 
     def insert_recipe_records(self, product_name: str, recipe_data: list[dict]):
         # Insert recipe records for the specific product
+        product_id = self.get_id_by_name("product_name", product_name)
+        material_names = [vals["material_name"] for vals in recipe_data]
+        material_ids = self.get_ids_by_names("material_name", material_names)
+        missing = [i for i in material_names if i not in material_ids]
+        if product_id is None or missing:
+            LOGGER.error(
+                f"Unknown product {product_name} or material(s) {missing}, no insertion was executed"
+            )
+            return
         queries_to_commit = []
         for vals in recipe_data:
-            recipe = (product_name, vals["material_name"], vals["quantity"])
+            recipe = (product_id, material_ids[vals["material_name"]], vals["quantity"])
             queries_to_commit.append((queries.insert["recipes"], recipe))
         # Commit
         if queries_to_commit:
@@ -297,6 +570,7 @@ class DaoRecipePage(DaoOrderapp):
             LOGGER.info(
                 f"Insert recipe records for {product_name}. {transaction_result}"
             )
+            self.mark_cost_dirty("recipes", product_id)
         else:
             LOGGER.warning("No insertion was executed")
 
@@ -311,17 +585,29 @@ class DaoRecipePage(DaoOrderapp):
         queries_to_commit = []
         og_price = original_rows["price"]
         new_price = update_rows["price"]
-        # Insert new price (will automatically default a new effective_timestamp) if price change
+        # Insert new price (will automatically default a new effective_from) if price change
+        # and close the previous price interval at that effective_from
         if og_price != new_price:
             update_price = (update_id, new_price)
             queries_to_commit.append((queries.insert["product_prices"], update_price))
+            queries_to_commit.append(
+                (queries.update["close_product_prices"], (update_id,))
+            )
             LOGGER.warning(f"Price changed for id: {update_id}")
 
-        update_basic = (update_id, update_rows["product_name"], update_rows["uom_name"])
+        uom_id = self.get_id_by_name("uom_name", update_rows["uom_name"])
+        if uom_id is None:
+            LOGGER.error(
+                f"Unknown uom {update_rows['uom_name']}, no product update was executed"
+            )
+            return
+        update_basic = (update_id, update_rows["product_name"], uom_id)
         queries_to_commit.append((queries.update["product_basics"], update_basic))
         # Commit
         if queries_to_commit:
             transaction_result = self.perform_transaction(queries_to_commit)
+            NAME_CACHE.invalidate("product_name")
+            READ_CACHE.invalidate("products", "product_prices")
             LOGGER.info(
                 f"Update product basic for id: {update_id}. {transaction_result}"
             )
@@ -342,6 +628,15 @@ class DaoRecipePage(DaoOrderapp):
         stop_using = [i for i in og_materials if i not in new_materials]
         check_quantity = [i for i in og_materials if i in new_materials]
         add_into = [i for i in new_materials if i not in og_materials]
+        material_ids = self.get_ids_by_names(
+            "material_name", og_materials + new_materials
+        )
+        missing = [i for i in new_materials if i not in material_ids]
+        if missing:
+            LOGGER.error(
+                f"Unknown material(s) {missing}, no recipe update was executed"
+            )
+            return
 
         queries_to_commit = []
         for row in original_rows:
@@ -351,7 +646,7 @@ class DaoRecipePage(DaoOrderapp):
                 queries_to_commit.append(
                     (
                         queries.update_delete["set_recipes_end"],
-                        (update_id, material_name),
+                        (update_id, material_ids[material_name]),
                     )
                 )
             elif material_name in check_quantity:
@@ -362,12 +657,12 @@ class DaoRecipePage(DaoOrderapp):
                     queries_to_commit.append(
                         (
                             queries.update_delete["set_recipes_end"],
-                            (update_id, material_name),
+                            (update_id, material_ids[material_name]),
                         )
                     )
                     recipe = (
                         update_id,
-                        update_match_row["material_name"],
+                        material_ids[material_name],
                         update_match_row["quantity"],
                     )
                     queries_to_commit.append((queries.update["recipes"], recipe))
@@ -375,7 +670,7 @@ class DaoRecipePage(DaoOrderapp):
             material_name = row["material_name"]
             quantity = row["quantity"]
             if material_name in add_into:
-                recipe = (update_id, material_name, quantity)
+                recipe = (update_id, material_ids[material_name], quantity)
                 queries_to_commit.append((queries.update["recipes"], recipe))
 
         if queries_to_commit:
@@ -383,6 +678,36 @@ class DaoRecipePage(DaoOrderapp):
             LOGGER.info(
                 f"Update product recipe for id: {update_id}. {transaction_result}"
             )
+            self.mark_cost_dirty("recipes", update_id)
+
+    # Recipes have to be marked dirty before they are deleted
+    @override
+    def commit_delete(self, delete_id: int, table: str) -> bool:
+        if table == "recipes":
+            self.mark_cost_dirty("recipes", delete_id)
+        return super().commit_delete(delete_id, table)
+
+    # Recipes are to be deleted first, because the foreign key product_id in
+    # products table is referencing the recipes table
+    ### Product_id is also refercne by order_details! Be careful of this delete
+    def delete_product(self, product_id: int) -> bool:
+        product = self.query_data(queries.PRODUCT_UOM, (product_id,))
+        if not product:
+            LOGGER.warning(f"No product deletion was executed for id: {product_id}")
+            return False
+        uom_id = product[0]["uom_id"]
+        recipes = self.query_data(queries.PRODUCT_MATERIALS, (product_id,)) or []
+        material_ids = [i["material_id"] for i in recipes]
+
+        self.commit_delete(product_id, "recipes")
+        self.commit_delete(product_id, "product_prices")
+        self.commit_delete(product_id, "product_costs")
+        if not self.commit_delete(product_id, "products"):
+            return False
+        # Will check for existence and clean up none-referecing uom_id AFTER product deletions
+        self.clean_up_uom(uom_id)
+        self.clean_up_materials(material_ids)
+        return True
 
 
 # Data access object for order page
@@ -393,41 +718,85 @@ class DaoOrderPage(DaoOrderapp):
         )
         super().__init__(connection)
 
-    def fetch_today_orders(self) -> list[dict]:
+    # An empty list means no such orders, None means the query failed
+    def fetch_today_orders(
+        self, order_ids: list[int] | None = None
+    ) -> list[dict] | None:
         try:
-            orders_data = self.query_data(queries.TODAY_ORDERS)
-            return orders_data
+            orders_data = self.query_by_ids(
+                queries.TODAY_ORDERS, queries.TODAY_ORDERS_BY_IDS, order_ids
+            )
+            return orders_data or []
         except Exception as e:
             LOGGER.error(e)
 
+    # Let every open order page apply the write (see pages.components.ChangeFeed)
+    def publish_order_change(self, order_id: int, op: str):
+        ORDER_CHANGES.publish("orders", [order_id], op)
+
     def fetch_order_date(self, order_id) -> str:
         result = self.query_data(
-            "SELECT DATE(o.order_timestamp) AS order_date from orderapp.orders o WHERE o.order_id = %s",
+            "SELECT o.order_date from orderapp.orders o WHERE o.order_id = %s",
             (order_id,),
         )
         order_date = result[0]["order_date"]
         return order_date
 
+    # Keep daily_order_summary in step with writes on a single order
+    def refresh_summary_of_order(self, order_id: int, *other_dates: date):
+        try:
+            order_date = self.fetch_order_date(order_id)
+            self.refresh_order_summary([order_date, *other_dates])
+        except Exception as e:
+            LOGGER.error(e)
+
+    # Deleting an order needs its date fetched before the delete to refresh the summary
+    ## and its details marked dirty before they are deleted
+    @override
+    def commit_delete(self, delete_id: int, table: str) -> bool:
+        if table == "order_details":
+            self.mark_cost_dirty("orders", delete_id)
+        if table != "orders":
+            return super().commit_delete(delete_id, table)
+        try:
+            order_date = self.fetch_order_date(delete_id)
+        except Exception as e:
+            LOGGER.error(e)
+            order_date = None
+        if not super().commit_delete(delete_id, table):
+            return False
+        self.publish_order_change(delete_id, "delete")
+        if order_date:
+            self.refresh_order_summary([order_date])
+        return True
+
     def insert_order_records(
         self, order_basic: tuple[int, str], detail_data: list[dict]
     ):
-        # Insert order record and get its id
-        self.query_data(queries.insert["order_basics"], order_basic)
-        order_id = self.query_data("SELECT LAST_INSERT_ID() AS order_id")[0]["order_id"]
-
-        # Insert order details
-        queries_to_commit = []
-        for vals in detail_data:
-            o_detail = (order_id, vals["product_name"], vals["quantity"])
-            insert_o_detail = (queries.insert["order_details"], o_detail)
-            queries_to_commit.append(insert_o_detail)
-
-        # Commit
-        if queries_to_commit:
-            transaction_result = self.perform_transaction(queries_to_commit)
-            LOGGER.info(f"Insert order details. {transaction_result}")
-        else:
+        if not detail_data:
             LOGGER.warning("No insertion was executed")
+            return
+        product_names = [vals["product_name"] for vals in detail_data]
+        product_ids = self.get_ids_by_names("product_name", product_names)
+        missing = [i for i in product_names if i not in product_ids]
+        if missing:
+            LOGGER.error(f"Unknown product(s) {missing}, no insertion was executed")
+            return
+
+        # Insert order record and details in one transaction
+        detail_rows = [
+            (product_ids[vals["product_name"]], vals["quantity"])
+            for vals in detail_data
+        ]
+        order_id, transaction_result = self.insert_with_details(
+            (queries.insert["order_basics"], order_basic),
+            queries.insert["order_details"],
+            detail_rows,
+        )
+        LOGGER.info(f"Insert order records for id: {order_id}. {transaction_result}")
+        if order_id is not None:
+            self.publish_order_change(order_id, "insert")
+            self.refresh_summary_of_order(order_id)
 
     def update_order_basic(
         self, update_id, original_basic: tuple[int, str], update_basic: tuple[int, str]
@@ -442,7 +811,14 @@ class DaoOrderPage(DaoOrderapp):
         # Commit
         if queries_to_commit:
             transaction_result = self.perform_transaction(queries_to_commit)
+            if "Transaction failed" in transaction_result:
+                LOGGER.error(
+                    f"Update order basic for id: {update_id}. {transaction_result}"
+                )
+                return
             LOGGER.info(f"Update order basic for id: {update_id}. {transaction_result}")
+            self.publish_order_change(update_id, "update")
+            self.refresh_summary_of_order(update_id)
 
     def update_order_detail(
         self, update_id, original_rows: list[dict], update_rows: list[dict]
@@ -459,15 +835,25 @@ class DaoOrderPage(DaoOrderapp):
         new_products = [vals["product_name"] for vals in update_rows]
         # Products existed in old but not updated order should be deleted
         need_delete = [i for i in og_products if i not in new_products]
+        product_ids = self.get_ids_by_names("product_name", og_products + new_products)
+        missing = [i for i in new_products if i not in product_ids]
+        if missing:
+            LOGGER.error(f"Unknown product(s) {missing}, no order update was executed")
+            return
+        # Mark before deleting so products taken out of the order are included
+        self.mark_cost_dirty("orders", update_id)
+        # Subscribers and the summary are only told about an order that was written
+        saved = False
         queries_to_commit = []
         for vals in original_rows:
             if vals["product_name"] in need_delete:
-                update_delete = (update_id, vals["product_name"])
+                update_delete = (update_id, product_ids[vals["product_name"]])
                 queries_to_commit.append(
                     (queries.update_delete["order_details"], update_delete)
                 )
         if queries_to_commit:
             transaction_result = self.perform_transaction(queries_to_commit)
+            saved = "Transaction failed" not in transaction_result
             LOGGER.info(
                 f"product(s) deleted in product recipe for id: {update_id}. {transaction_result}"
             )
@@ -477,56 +863,163 @@ class DaoOrderPage(DaoOrderapp):
             )
         queries_to_commit = []
         for vals in update_rows:
-            update = (update_id, vals["product_name"], vals["quantity"])
+            update = (update_id, product_ids[vals["product_name"]], vals["quantity"])
             insert_products = (queries.update["order_details"], update)
             queries_to_commit.append(insert_products)
         # Commit
         if queries_to_commit:
             transaction_result = self.perform_transaction(queries_to_commit)
+            saved = saved or "Transaction failed" not in transaction_result
             LOGGER.info(
                 f"Update product order detail for id: {update_id}. {transaction_result}"
             )
-
-    def change_order_status(self, order_id: int, new_status: str):
+            self.mark_cost_dirty("orders", update_id)
+        if saved:
+            self.publish_order_change(update_id, "update")
+            self.refresh_summary_of_order(update_id)
+
+    # Status and paid changes return whether the write was committed,
+    ## so a page patching its cards locally only shows what was saved
+    def change_order_status(self, order_id: int, new_status: str) -> bool:
         try:
             queries_to_commit = [
                 (queries.update["order_status"], (new_status, order_id))
             ]
             transaction_result = self.perform_transaction(queries_to_commit)
+            if "Transaction failed" in transaction_result:
+                LOGGER.error(f"Update status on order {order_id}. {transaction_result}")
+                return False
             LOGGER.info(f"Update status on order {order_id}. {transaction_result}")
+            self.mark_cost_dirty("orders", order_id)
+            self.publish_order_change(order_id, "update")
+            self.refresh_summary_of_order(order_id)
+            return True
         except Exception as e:
             LOGGER.error(e)
+            return False
 
-    def change_paid_status(self, order_id: int, is_paid: bool):
+    def change_paid_status(self, order_id: int, is_paid: bool) -> bool:
         try:
             queries_to_commit = [(queries.update["order_paid"], (is_paid, order_id))]
             transaction_result = self.perform_transaction(queries_to_commit)
+            if "Transaction failed" in transaction_result:
+                LOGGER.error(
+                    f"Update is_paid on order {order_id}. {transaction_result}"
+                )
+                return False
             LOGGER.info(f"Update is_paid on order {order_id}. {transaction_result}")
+            self.publish_order_change(order_id, "update")
+            return True
         except Exception as e:
             LOGGER.error(e)
+            return False
+
+    def fetch_order_dates(self, order_ids: list[int]) -> list[date]:
+        result = self.query_by_ids(None, queries.ORDER_DATES_BY_IDS, order_ids)
+        return [i["order_date"] for i in result] if result else []
+
+    # Bulk status change of the checked order cards in one transaction: one UPDATE over all ids
+    ## and one mark of their materials (cost update start dates of every order in one statement),
+    ## then one summary refresh of their dates and one ORDER_CHANGES event for all ids
+    def change_order_status_bulk(self, order_ids: list[int], new_status: str) -> bool:
+        if not order_ids:
+            return False
+        placeholders = ", ".join(["%s"] * len(order_ids))
+        try:
+            queries_to_commit = [
+                (
+                    queries.update["order_status_by_ids"].format(
+                        placeholders=placeholders
+                    ),
+                    (new_status, *order_ids),
+                ),
+                (
+                    queries.mark_cost_dirty_by_ids["orders"].format(
+                        placeholders=placeholders
+                    ),
+                    tuple(order_ids),
+                ),
+            ]
+            transaction_result = self.perform_transaction(queries_to_commit)
+            if "Transaction failed" in transaction_result:
+                LOGGER.error(
+                    f"Update status on orders {order_ids}. {transaction_result}"
+                )
+                return False
+            LOGGER.info(f"Update status on orders {order_ids}. {transaction_result}")
+            WRITE_EVENTS.publish("orders", list(order_ids))
+            ORDER_CHANGES.publish("orders", list(order_ids), "update")
+            self.refresh_order_summary(self.fetch_order_dates(order_ids))
+            return True
+        except Exception as e:
+            LOGGER.error(e)
+            return False
+
+    def change_paid_status_bulk(self, order_ids: list[int], is_paid: bool) -> bool:
+        if not order_ids:
+            return False
+        placeholders = ", ".join(["%s"] * len(order_ids))
+        try:
+            queries_to_commit = [
+                (
+                    queries.update["order_paid_by_ids"].format(
+                        placeholders=placeholders
+                    ),
+                    (is_paid, *order_ids),
+                )
+            ]
+            transaction_result = self.perform_transaction(queries_to_commit)
+            if "Transaction failed" in transaction_result:
+                LOGGER.error(
+                    f"Update is_paid on orders {order_ids}. {transaction_result}"
+                )
+                return False
+            LOGGER.info(f"Update is_paid on orders {order_ids}. {transaction_result}")
+            ORDER_CHANGES.publish("orders", list(order_ids), "update")
+            return True
+        except Exception as e:
+            LOGGER.error(e)
+            return False
 
 
 class DaoPreOrderPage(DaoOrderPage):
-    def __init__(self, connection: MySQLConnection | None = None):
-        super().__init__(connection)
+    def __init__(
+        self,
+        connection: MySQLConnection | None = None,
+        pool: ConnectionPool | None = None,
+    ):
+        super().__init__(connection, pool)
 
     @override
-    def fetch_today_orders(self) -> list[dict]:
+    def fetch_today_orders(self, order_ids: list[int] | None = None) -> list[dict]:
         raise NotImplementedError("Use DaoOrderPage for current day orders")
 
-    def fetch_previous_orders(self) -> list[dict]:
-        def count_ids_num(s: str | None) -> int:
-            if isinstance(s, str):
-                return len(s.split(","))
-            return 0
-
+    # Read from daily_order_summary, counts are maintained with the summary
+    ## Dates are newest first within [start_date, end_date] (both optional)
+    ## Older pages are fetched by keyset: dates before before_date, at most limit rows
+    def fetch_previous_orders(
+        self,
+        start_date: date | None = None,
+        end_date: date | None = None,
+        before_date: date | None = None,
+        limit: int | None = None,
+    ) -> list[dict]:
         try:
-            previos_orders = self.query_data(queries.PREVIOUS_ORDERS_OVERVIEW)
+            params = {
+                "start_date": start_date,
+                "end_date": end_date,
+                "before_date": before_date,
+                "limit": limit,
+            }
+            query = queries.PREVIOUS_ORDERS_OVERVIEW.format(
+                limit="LIMIT %(limit)s" if limit else ""
+            )
+            previos_orders = self.query_data(query, params=params)
             if previos_orders:
                 for row in previos_orders:
-                    finish_count = count_ids_num(row["finished_id_list"])
-                    prep_count = count_ids_num(row["prepared_id_list"])
-                    cancel_count = count_ids_num(row["cancelled_id_list"])
+                    finish_count = row["finished_count"]
+                    prep_count = row["prepared_count"]
+                    cancel_count = row["cancelled_count"]
                     row["order_counts"] = (
                         f"完成{finish_count}/準備{prep_count}/取消{cancel_count}"
                     )
@@ -543,17 +1036,26 @@ class DaoPreOrderPage(DaoOrderPage):
 
 
 class DaoFutureOrderPage(DaoOrderPage):
-    def __init__(self, connection: MySQLConnection | None = None):
-        super().__init__(connection)
+    def __init__(
+        self,
+        connection: MySQLConnection | None = None,
+        pool: ConnectionPool | None = None,
+    ):
+        super().__init__(connection, pool)
 
     @override
-    def fetch_today_orders(self) -> list[dict]:
+    def fetch_today_orders(self, order_ids: list[int] | None = None) -> list[dict]:
         raise NotImplementedError("Use DaoOrderPage for current day orders")
 
-    def fetch_future_orders(self) -> list[dict]:
+    # An empty list means no such orders, None means the query failed
+    def fetch_future_orders(
+        self, order_ids: list[int] | None = None
+    ) -> list[dict] | None:
         try:
-            orders_data = self.query_data(queries.FUTURE_ORDERS)
-            return orders_data
+            orders_data = self.query_by_ids(
+                queries.FUTURE_ORDERS, queries.FUTURE_ORDERS_BY_IDS, order_ids
+            )
+            return orders_data or []
         except Exception as e:
             LOGGER.error(e)
 
@@ -563,23 +1065,30 @@ class DaoFutureOrderPage(DaoOrderPage):
         future_order_basic: tuple[int, str, datetime, bool],
         detail_data: list[dict],
     ):
-        # Insert order record and get its id
-        self.query_data(queries.insert["future_order_basics"], future_order_basic)
-        order_id = self.query_data("SELECT LAST_INSERT_ID() AS order_id")[0]["order_id"]
-
-        # Insert order details
-        queries_to_commit = []
-        for vals in detail_data:
-            o_detail = (order_id, vals["product_name"], vals["quantity"])
-            insert_o_detail = (queries.insert["order_details"], o_detail)
-            queries_to_commit.append(insert_o_detail)
-
-        # Commit
-        if queries_to_commit:
-            transaction_result = self.perform_transaction(queries_to_commit)
-            LOGGER.info(f"Insert order details. {transaction_result}")
-        else:
+        if not detail_data:
             LOGGER.warning("No insertion was executed")
+            return
+        product_names = [vals["product_name"] for vals in detail_data]
+        product_ids = self.get_ids_by_names("product_name", product_names)
+        missing = [i for i in product_names if i not in product_ids]
+        if missing:
+            LOGGER.error(f"Unknown product(s) {missing}, no insertion was executed")
+            return
+
+        # Insert order record and details in one transaction
+        detail_rows = [
+            (product_ids[vals["product_name"]], vals["quantity"])
+            for vals in detail_data
+        ]
+        order_id, transaction_result = self.insert_with_details(
+            (queries.insert["future_order_basics"], future_order_basic),
+            queries.insert["order_details"],
+            detail_rows,
+        )
+        LOGGER.info(f"Insert order records for id: {order_id}. {transaction_result}")
+        if order_id is not None:
+            self.publish_order_change(order_id, "insert")
+            self.refresh_summary_of_order(order_id)
 
     @override
     def update_order_basic(
@@ -598,10 +1107,20 @@ class DaoFutureOrderPage(DaoOrderPage):
         # Commit
         if queries_to_commit:
             transaction_result = self.perform_transaction(queries_to_commit)
+            if "Transaction failed" in transaction_result:
+                LOGGER.error(
+                    f"Update order basic for id: {update_id}. {transaction_result}"
+                )
+                return
             LOGGER.info(f"Update order basic for id: {update_id}. {transaction_result}")
+            self.publish_order_change(update_id, "update")
+            self.refresh_summary_of_order(update_id)
 
+    # Matching completion moves the order to another date, so both dates are refreshed
     def match_order_completion(self, order_id: int):
         try:
+            previous_date = self.fetch_order_date(order_id)
+            self.mark_cost_dirty("orders", order_id)
             queries_to_commit = [
                 (queries.update["order_completion_timestamp"], (order_id,))
             ]
@@ -609,19 +1128,76 @@ class DaoFutureOrderPage(DaoOrderPage):
             LOGGER.info(
                 f"Update order_timestamp on order {order_id}. {transaction_result}"
             )
+            self.mark_cost_dirty("orders", order_id)
+            self.publish_order_change(order_id, "update")
+            self.refresh_summary_of_order(order_id, previous_date)
+        except Exception as e:
+            LOGGER.error(e)
+
+    # Status and completion matching of all ids in one transaction, materials are marked
+    ## at the dates before and after the orders move, both sets of dates are refreshed
+    @override
+    def change_order_status_bulk(self, order_ids: list[int], new_status: str) -> bool:
+        if not order_ids:
+            return False
+        placeholders = ", ".join(["%s"] * len(order_ids))
+        mark_dirty = (
+            queries.mark_cost_dirty_by_ids["orders"].format(placeholders=placeholders),
+            tuple(order_ids),
+        )
+        try:
+            previous_dates = self.fetch_order_dates(order_ids)
+            queries_to_commit = [
+                mark_dirty,
+                (
+                    queries.update["order_status_by_ids"].format(
+                        placeholders=placeholders
+                    ),
+                    (new_status, *order_ids),
+                ),
+                (
+                    queries.update["order_completion_timestamp_by_ids"].format(
+                        placeholders=placeholders
+                    ),
+                    tuple(order_ids),
+                ),
+                mark_dirty,
+            ]
+            transaction_result = self.perform_transaction(queries_to_commit)
+            if "Transaction failed" in transaction_result:
+                LOGGER.error(
+                    f"Update status and order_timestamp on orders {order_ids}. {transaction_result}"
+                )
+                return False
+            LOGGER.info(
+                f"Update status and order_timestamp on orders {order_ids}. {transaction_result}"
+            )
+            WRITE_EVENTS.publish("orders", list(order_ids))
+            ORDER_CHANGES.publish("orders", list(order_ids), "update")
+            self.refresh_order_summary(
+                previous_dates + self.fetch_order_dates(order_ids)
+            )
+            return True
         except Exception as e:
             LOGGER.error(e)
+            return False
 
 
 class DaoVendorPage(DaoOrderapp):
-    def __init__(self, connection: MySQLConnection | None = None):
-        super().__init__(connection)
+    def __init__(
+        self,
+        connection: MySQLConnection | None = None,
+        pool: ConnectionPool | None = None,
+    ):
+        super().__init__(connection, pool)
 
     # Handle empty string here because it is more concise than COALESCE every col
     # Convert set to list because niceGUI jasonify data
-    def fetch_vendor_data(self) -> list[dict]:
-        vendor_data = self.query_data("SELECT * FROM orderapp.vendors")
-        vendor_data = [i for i in vendor_data if i["vendor_name"] != "無資料"]
+    def fetch_vendor_data(self, vendor_ids: list[int] | None = None) -> list[dict]:
+        vendor_data = self.query_by_ids(
+            queries.VENDORS, queries.VENDORS_BY_IDS, vendor_ids
+        )
+        vendor_data = [i for i in vendor_data or [] if i["vendor_name"] != "無資料"]
         for row in vendor_data:
             if isinstance(row["open_days"], set):
                 open_days = list(row["open_days"])
@@ -630,10 +1206,7 @@ class DaoVendorPage(DaoOrderapp):
         return vendor_data
 
     def fetch_existed_vendor(self) -> list[str]:
-        existed = [
-            i["vendor_name"] for i in self.query_data(queries.existed["vendor_name"])
-        ]
-        return existed if existed else []
+        return self.get_existed_names("vendor_name")
 
     # JOIN open_days value to be inserted as set
     def insert_vendor_records(self, detail_data: dict):
@@ -643,6 +1216,7 @@ class DaoVendorPage(DaoOrderapp):
         transaction_result = self.perform_transaction(
             [(queries.insert["vendors"], vendor)]
         )
+        NAME_CACHE.invalidate("vendor_name")
         LOGGER.info(f"Insert product records for {vendor_name}. {transaction_result}")
 
     def update_vendor_records(self, update_id, original_dict: dict, update_dict: dict):
@@ -655,4 +1229,50 @@ class DaoVendorPage(DaoOrderapp):
         transaction_result = self.perform_transaction(
             [(queries.update["vendors"], update)]
         )
+        NAME_CACHE.invalidate("vendor_name")
         LOGGER.info(f"Update vendor records for id: {update_id}. {transaction_result}")
+
+
+# Data access object for CostJobRunner, recording every cost update run in cost_job_runs
+class DaoCostJobs(DaoOrderapp):
+    def __init__(
+        self,
+        connection: MySQLConnection | None = None,
+        pool: ConnectionPool | None = None,
+    ):
+        super().__init__(connection, pool)
+
+    def start_cost_job(self, job: str, run_trigger: str) -> int | None:
+        try:
+            with self.checkout() as connection:
+                cursor = connection.cursor()
+                params = (job, run_trigger)
+                with self.timed_query(
+                    connection, queries.COST_JOB_START, params
+                ) as timing:
+                    cursor.execute(queries.COST_JOB_START, params)
+                    run_id = cursor.lastrowid
+                    timing["rows"] = cursor.rowcount
+                connection.commit()
+                cursor.close()
+            return run_id
+        except Exception as e:
+            LOGGER.error(e)
+
+    def finish_cost_job(
+        self, run_id: int, status: str, duration_ms: int, message: str
+    ):
+        transaction_result = self.perform_transaction(
+            [(queries.COST_JOB_FINISH, (status, duration_ms, message, run_id))]
+        )
+        LOGGER.debug(f"Finish cost job run {run_id}. {transaction_result}")
+
+    def fetch_cost_job_runs(self, limit: int = 10) -> list[dict]:
+        try:
+            return self.query_data(queries.COST_JOB_RUNS, (limit,))
+        except Exception as e:
+            LOGGER.error(e)
+
+    # Raises on a failed query, the health check reports the error itself
+    def fetch_cost_freshness(self) -> dict:
+        return self.query_data(queries.COST_FRESHNESS)[0]
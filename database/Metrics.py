@@ -0,0 +1,177 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+from logging_setup.setup import LOGGER
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# Cost updates roll whole material histories, so their buckets go higher
+COST_JOB_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# A collector returns (metric name, labels, value) samples of gauges read at scrape time
+Sample = tuple[str, dict, float]
+
+
+# Process-wide counters and histograms served at /metrics in the Prometheus text format
+## Metrics are declared once below, recording is a dict lookup and an add under one lock
+## Histograms keep per-bucket counts, made cumulative only when rendered
+## Gauges are not stored, they come from collectors called at scrape time
+class Metrics:
+    def __init__(self):
+        self._declared: dict[str, tuple[str, str, tuple]] = {}
+        self._counters: dict[tuple[str, tuple], float] = {}
+        self._histograms: dict[tuple[str, tuple], list] = {}
+        self._collectors: list[Callable[[], list[Sample]]] = []
+        self._lock = threading.Lock()
+
+    def declare(self, name: str, kind: str, help: str, buckets: tuple = ()):
+        if kind not in ("counter", "histogram", "gauge"):
+            raise ValueError(f"Unknown metric type {kind}")
+        self._declared[name] = (kind, help, buckets)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        buckets = self._declared[name][2]
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                # Bucket counts (the last one is +Inf), sum, count
+                histogram = [[0] * (len(buckets) + 1), 0.0, 0]
+                self._histograms[key] = histogram
+            histogram[0][bisect_left(buckets, value)] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    @contextmanager
+    def timer(self, name: str, **labels) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def register_collector(self, collector: Callable[[], list[Sample]]):
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {
+                k: [list(v[0]), v[1], v[2]] for k, v in self._histograms.items()
+            }
+        gauges: dict[str, list[tuple[tuple, float]]] = {}
+        for collector in self._collectors:
+            try:
+                for name, labels, value in collector():
+                    gauges.setdefault(name, []).append(
+                        (tuple(sorted(labels.items())), value)
+                    )
+            except Exception as e:
+                LOGGER.error(f"Metrics collector failed: {e}")
+
+        lines = []
+        for name, (kind, help, buckets) in self._declared.items():
+            if kind == "counter":
+                samples = [(k[1], v) for k, v in counters.items() if k[0] == name]
+            elif kind == "gauge":
+                samples = gauges.get(name, [])
+            else:
+                samples = [(k[1], v) for k, v in histograms.items() if k[0] == name]
+            if not samples:
+                continue
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in sorted(samples, key=lambda i: i[0]):
+                if kind != "histogram":
+                    lines.append(f"{name}{format_labels(labels)} {value}")
+                    continue
+                counts, total, count = value
+                cumulative = 0
+                for bound, bucket_count in zip((*buckets, "+Inf"), counts):
+                    cumulative += bucket_count
+                    bucket_labels = format_labels((*labels, ("le", str(bound))))
+                    lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+                lines.append(f"{name}_sum{format_labels(labels)} {total}")
+                lines.append(f"{name}_count{format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+def format_labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in labels
+    )
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+# Resident set size of this process (Linux /proc only)
+def process_rss() -> list[Sample]:
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        rss = pages * os.sysconf("SC_PAGE_SIZE")
+        return [("orderapp_process_resident_memory_bytes", {}, rss)]
+    except (OSError, ValueError, AttributeError):
+        return []
+
+
+METRICS = Metrics()
+METRICS.declare(
+    "orderapp_page_build_seconds",
+    "histogram",
+    "Time to build a @ui.page by route",
+    LATENCY_BUCKETS,
+)
+METRICS.declare(
+    "orderapp_query_duration_seconds",
+    "histogram",
+    "DAO statement duration by query name",
+    LATENCY_BUCKETS,
+)
+METRICS.declare(
+    "orderapp_dao_connect_total",
+    "counter",
+    "DaoOrderapp.connect_orderapp calls by outcome (connect, ping, pool, error)",
+)
+METRICS.declare(
+    "orderapp_cost_job_duration_seconds",
+    "histogram",
+    "Cost update run duration by job and status",
+    COST_JOB_BUCKETS,
+)
+METRICS.declare(
+    "orderapp_cost_job_rows_total",
+    "counter",
+    "Rows written by cost update runs by job",
+)
+METRICS.declare(
+    "orderapp_grid_payload_bytes_total",
+    "counter",
+    "Row payload of grid delta refreshes, sent and saved against a full rowData resend",
+)
+METRICS.declare(
+    "orderapp_read_cache_total",
+    "counter",
+    "Reads of the shared reference data caches by cache and result (hit, miss)",
+)
+METRICS.declare("orderapp_read_cache_entries", "gauge", "Entries held by ReadCache")
+METRICS.declare("orderapp_pool_connections", "gauge", "Pool connections by state")
+METRICS.declare(
+    "orderapp_pool_reconnects", "gauge", "Pool connections replaced after a failed ping"
+)
+METRICS.declare("orderapp_nicegui_clients", "gauge", "Connected NiceGUI clients")
+METRICS.declare(
+    "orderapp_process_resident_memory_bytes", "gauge", "Resident memory of the process"
+)
+METRICS.register_collector(process_rss)
@@ -0,0 +1,86 @@
+import threading
+import time
+from typing import TYPE_CHECKING
+
+from logging_setup.setup import LOGGER
+
+from . import queries
+from .config import READ_CACHE_TTL
+from .Metrics import METRICS
+
+if TYPE_CHECKING:
+    from .DataAccessObjects import DaoOrderapp
+
+
+# Process-wide name <-> id lookup for products, materials, vendors and uom
+## Each name column is loaded lazily with one queries.existed query and kept for ttl seconds or until invalidated
+## DAO writes that add, rename or delete rows of those tables must call invalidate(name_col)
+## A generation counter keeps a load that raced with an invalidation from being stored
+class NameCache:
+    name_cols = ("product_name", "material_name", "vendor_name", "uom_name")
+
+    def __init__(self, ttl: float = READ_CACHE_TTL):
+        self.ttl = ttl
+        self._loaded_at: dict[str, float] = {}
+        self._name_to_id: dict[str, dict[str, int]] = {}
+        self._id_to_name: dict[str, dict[int, str]] = {}
+        self._generation: dict[str, int] = {col: 0 for col in self.name_cols}
+        self._lock = threading.Lock()
+
+    def _load(self, dao: "DaoOrderapp", name_col: str) -> dict[str, int]:
+        if name_col not in self.name_cols:
+            raise ValueError(f"No cached lookup for {name_col}")
+        id_col = name_col.replace("_name", "_id")
+        with self._lock:
+            generation = self._generation[name_col]
+        rows = dao.query_data(queries.existed[name_col])
+        name_to_id = {row[name_col]: row[id_col] for row in rows} if rows else {}
+        with self._lock:
+            if generation == self._generation[name_col]:
+                self._name_to_id[name_col] = name_to_id
+                self._loaded_at[name_col] = time.monotonic()
+                self._id_to_name[name_col] = {v: k for k, v in name_to_id.items()}
+        LOGGER.debug(f"Load {len(name_to_id)} {name_col} into name cache")
+        return name_to_id
+
+    def _mapping(self, dao: "DaoOrderapp", name_col: str) -> dict[str, int]:
+        mapping = self._name_to_id.get(name_col)
+        loaded_at = self._loaded_at.get(name_col, 0)
+        if mapping is not None and time.monotonic() - loaded_at < self.ttl:
+            METRICS.inc("orderapp_read_cache_total", cache=name_col, result="hit")
+            return mapping
+        METRICS.inc("orderapp_read_cache_total", cache=name_col, result="miss")
+        return self._load(dao, name_col)
+
+    # Reload once on a miss in case the name was written by another process
+    def get_ids(
+        self, dao: "DaoOrderapp", name_col: str, names: list[str]
+    ) -> dict[str, int]:
+        mapping = self._mapping(dao, name_col)
+        if any(name not in mapping for name in names):
+            mapping = self._load(dao, name_col)
+        return {name: mapping[name] for name in names if name in mapping}
+
+    def get_id(self, dao: "DaoOrderapp", name_col: str, name: str) -> int | None:
+        return self.get_ids(dao, name_col, [name]).get(name)
+
+    def get_name(self, dao: "DaoOrderapp", name_col: str, id: int) -> str | None:
+        self._mapping(dao, name_col)
+        name = self._id_to_name.get(name_col, {}).get(id)
+        if name is None:
+            self._load(dao, name_col)
+            name = self._id_to_name.get(name_col, {}).get(id)
+        return name
+
+    def get_names(self, dao: "DaoOrderapp", name_col: str) -> list[str]:
+        return list(self._mapping(dao, name_col).keys())
+
+    def invalidate(self, name_col: str):
+        with self._lock:
+            self._generation[name_col] += 1
+            self._name_to_id.pop(name_col, None)
+            self._id_to_name.pop(name_col, None)
+        LOGGER.debug(f"Invalidate {name_col} in name cache")
+
+
+NAME_CACHE = NameCache()
@@ -0,0 +1,117 @@
+import re
+import sys
+import threading
+from collections import deque
+
+from logging_setup.setup import LOGGER
+
+from .config import QUERY_STATS_WINDOW
+from .Metrics import METRICS
+
+# Modules whose module-level SQL strings (and dicts of them) name the recorded statements
+QUERY_MODULES = ("database.queries", "database.update_cost", "database.CostLedger")
+# Upper bounds (ms) of the histogram buckets, the last bucket takes everything slower
+HISTOGRAM_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+# Fallback key of statements built at runtime: verb and first orderapp table
+FALLBACK_KEY = re.compile(r"^\s*(WITH|\w+).*?\borderapp\.(\w+)", re.DOTALL)
+
+
+# Process-wide timing of the statements executed by DaoOrderapp
+## Statements are keyed by the name of their constant (e.g. "TODAY_ORDERS", "existed.material_name"),
+## templates formatted at runtime match on the text before their first placeholder
+## Each key keeps its last QUERY_STATS_WINDOW runs (duration, rows, calling DAO) for the histogram
+class QueryStats:
+    def __init__(self, window: int = QUERY_STATS_WINDOW):
+        self.window = window
+        self._runs: dict[str, deque] = {}
+        self._totals: dict[str, int] = {}
+        self._names: dict[str, str] | None = None
+        self._templates: list[tuple[str, str]] = []
+        self._lock = threading.Lock()
+
+    def _load_names(self):
+        names, templates = {}, []
+        for module_name in QUERY_MODULES:
+            module = sys.modules.get(module_name)
+            if module is None:
+                continue
+            for attr, val in vars(module).items():
+                if attr.startswith("_"):
+                    continue
+                candidates = (
+                    {f"{attr}.{k}": v for k, v in val.items()}
+                    if isinstance(val, dict)
+                    else {attr: val}
+                )
+                for name, query in candidates.items():
+                    if not isinstance(query, str) or "orderapp." not in query:
+                        continue
+                    names.setdefault(query, name)
+                    if "{" in query:
+                        templates.append((query.split("{", 1)[0], name))
+        # Longest prefix first so a template is not taken for a shorter one
+        templates.sort(key=lambda i: len(i[0]), reverse=True)
+        self._names, self._templates = names, templates
+        LOGGER.debug(f"Load {len(names)} query names for query stats")
+
+    def query_name(self, query: str) -> str:
+        if self._names is None:
+            self._load_names()
+        name = self._names.get(query)
+        if name is not None:
+            return name
+        for prefix, name in self._templates:
+            if query.startswith(prefix):
+                return name
+        match = FALLBACK_KEY.match(query)
+        return f"{match[1].upper()} {match[2]}" if match else "unknown"
+
+    def record(self, query: str, duration_ms: float, rows: int, caller: str) -> str:
+        name = self.query_name(query)
+        with self._lock:
+            if name not in self._runs:
+                self._runs[name] = deque(maxlen=self.window)
+                self._totals[name] = 0
+            self._runs[name].append((duration_ms, rows, caller))
+            self._totals[name] += 1
+        METRICS.observe(
+            "orderapp_query_duration_seconds", duration_ms / 1000, query=name
+        )
+        LOGGER.debug(f"Query {name} ({caller}) {duration_ms:.1f} ms, {rows} rows")
+        return name
+
+    # Histogram and percentiles of the runs kept for each statement, slowest p95 first
+    def snapshot(self) -> list[dict]:
+        with self._lock:
+            runs = {name: list(i) for name, i in self._runs.items()}
+            totals = dict(self._totals)
+        stats = []
+        for name, name_runs in runs.items():
+            durations = sorted(i[0] for i in name_runs)
+            buckets = {f"le_{b}": 0 for b in HISTOGRAM_BUCKETS_MS}
+            buckets["inf"] = 0
+            for duration in durations:
+                bound = next((b for b in HISTOGRAM_BUCKETS_MS if duration <= b), None)
+                buckets[f"le_{bound}" if bound is not None else "inf"] += 1
+            stats.append(
+                {
+                    "query": name,
+                    "total_count": totals[name],
+                    "window_count": len(durations),
+                    "p50_ms": round(durations[len(durations) // 2], 2),
+                    "p95_ms": round(durations[int(len(durations) * 0.95)], 2),
+                    "max_ms": round(durations[-1], 2),
+                    "avg_rows": round(sum(i[1] for i in name_runs) / len(name_runs), 1),
+                    "callers": sorted({i[2] for i in name_runs}),
+                    "histogram_ms": buckets,
+                }
+            )
+        return sorted(stats, key=lambda i: i["p95_ms"], reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self._runs.clear()
+            self._totals.clear()
+
+
+QUERY_STATS = QueryStats()
@@ -0,0 +1,82 @@
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import TYPE_CHECKING
+
+from logging_setup.setup import LOGGER
+
+from .config import READ_CACHE_MAX_ENTRIES, READ_CACHE_TTL
+from .Metrics import METRICS
+from .QueryStats import QUERY_STATS
+
+if TYPE_CHECKING:
+    from .DataAccessObjects import DaoOrderapp
+
+
+# Process-wide read-through cache of reference data shared by every page and session
+## Entries are keyed by query and params, they are served for ttl seconds
+## and dropped earlier by invalidate(table) from the DAO writes on the tables they read
+## At most max_entries are kept, the least recently used is dropped first
+## Hits and misses are counted per query name (QUERY_STATS.query_name)
+## Rows are copied out so callers may change them, a generation counter per table keeps a load
+## that raced with an invalidation from being stored
+class ReadCache:
+    def __init__(
+        self, ttl: float = READ_CACHE_TTL, max_entries: int = READ_CACHE_MAX_ENTRIES
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # key -> (loaded at, rows, tables read)
+        self._entries: OrderedDict[tuple, tuple[float, list | None, tuple]] = (
+            OrderedDict()
+        )
+        self._generation: defaultdict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _copy(rows: list[dict] | None) -> list[dict] | None:
+        return [dict(row) for row in rows] if rows is not None else None
+
+    def query(
+        self,
+        dao: "DaoOrderapp",
+        query: str,
+        params: tuple | None = None,
+        tables: tuple[str, ...] = (),
+    ) -> list[dict] | None:
+        name = QUERY_STATS.query_name(query)
+        key = (query, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                METRICS.inc("orderapp_read_cache_total", cache=name, result="hit")
+                return self._copy(entry[1])
+            generations = [self._generation[t] for t in tables]
+        METRICS.inc("orderapp_read_cache_total", cache=name, result="miss")
+        rows = dao.query_data(query, params)
+        with self._lock:
+            if generations == [self._generation[t] for t in tables]:
+                self._entries[key] = (time.monotonic(), rows, tables)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        LOGGER.debug(f"Load {name} into read cache")
+        return self._copy(rows)
+
+    def invalidate(self, *tables: str):
+        with self._lock:
+            for table in tables:
+                self._generation[table] += 1
+            stale = [k for k, v in self._entries.items() if set(v[2]) & set(tables)]
+            for key in stale:
+                del self._entries[key]
+        if stale:
+            LOGGER.debug(f"Invalidate {len(stale)} read cache entries of {tables}")
+
+    def metric_samples(self) -> list[tuple[str, dict, float]]:
+        return [("orderapp_read_cache_entries", {}, len(self._entries))]
+
+
+READ_CACHE = ReadCache()
+METRICS.register_collector(READ_CACHE.metric_samples)
@@ -0,0 +1,38 @@
+import threading
+from typing import Callable
+
+from logging_setup.setup import LOGGER
+
+
+# Process-wide publish/subscribe of DAO writes
+## Events are (table, ids, op), op is "insert", "update", "delete" or "write" (unspecified)
+## Subscribers are called on the writing thread, so they should only record the event and return
+class WriteEventBus:
+    def __init__(self):
+        self._subscribers: list[Callable[[str, list[int], str], None]] = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback: Callable[[str, list[int], str], None]):
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[str, list[int], str], None]):
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def publish(self, table: str, ids: list[int], op: str = "write"):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        LOGGER.debug(f"Write ({op}) on {table} id(s): {ids}")
+        for callback in subscribers:
+            try:
+                callback(table, ids, op)
+            except Exception as e:
+                LOGGER.error(e)
+
+
+# Writes on purchases, recipes and orders, published once their materials are marked in material_cost_dirty
+WRITE_EVENTS = WriteEventBus()
+# Every committed write on an order (insert, update, status, paid, delete), for pages showing orders
+ORDER_CHANGES = WriteEventBus()
@@ -0,0 +1,53 @@
+import os
+
+from dotenv import load_dotenv
+
+from logging_setup.setup import LOGGER
+
+load_dotenv()
+connect_config = {
+    "host": os.getenv("MYSQL_HOST"),
+    "user": os.getenv("MYSQL_USER"),
+    "password": os.getenv("MYSQL_PASSWORD"),
+    "database": os.getenv("MYSQL_DATABASE"),
+}
+
+if not all(connect_config.values()):
+    LOGGER.error(ValueError(f"Failed to load .env mysql config. {connect_config}"))
+    raise ValueError(f"Failed to load .env mysql config. {connect_config}")
+
+# Connection pool settings (optional in .env)
+## POOL_SIZE: maximum number of database threads (AsyncDao calls) querying at the same time
+## POOL_TIMEOUT: seconds to wait for a free connection before giving up
+## HEALTH_CHECK_INTERVAL: only ping a connection that has been idle longer than this (seconds)
+POOL_SIZE = int(os.getenv("MYSQL_POOL_SIZE", 5))
+# Page builds and health checks check out synchronously on the event loop thread, so the pool keeps
+## one connection more than the database threads can hold and the loop never waits for them
+## (CostJobRunner has its own connection outside the pool)
+POOL_CONNECTIONS = POOL_SIZE + 1
+POOL_TIMEOUT = float(os.getenv("MYSQL_POOL_TIMEOUT", 10))
+HEALTH_CHECK_INTERVAL = float(os.getenv("MYSQL_HEALTH_CHECK_INTERVAL", 60))
+
+# Cost engine used by update_cost.update_costs (optional in .env)
+## sql: UPDATE_MATERIAL_COST for today, CostLedger backfill for a past start date
+## numpy: in-memory rebuild from all purchases and completed orders with NumPy arrays
+COST_ENGINES = ("sql", "numpy")
+COST_ENGINE = os.getenv("COST_ENGINE", "sql")
+if COST_ENGINE not in COST_ENGINES:
+    LOGGER.error(ValueError(f"Unknown COST_ENGINE {COST_ENGINE}: {COST_ENGINES}"))
+    raise ValueError(f"Unknown COST_ENGINE {COST_ENGINE}: {COST_ENGINES}")
+
+# Query instrumentation of DaoOrderapp (optional in .env)
+## SLOW_QUERY_MS: statements slower than this (ms) are logged with their EXPLAIN
+## QUERY_STATS_WINDOW: runs kept per statement for the /query_stats histogram
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", 500))
+QUERY_STATS_WINDOW = int(os.getenv("QUERY_STATS_WINDOW", 1000))
+
+# Largest block (rows) a server-side grid may request at once (optional in .env)
+GRID_BLOCK_MAX_ROWS = int(os.getenv("GRID_BLOCK_MAX_ROWS", 500))
+
+# Shared read cache of reference data (ReadCache and NameCache, optional in .env)
+## READ_CACHE_TTL: seconds an entry is served before it is read again (writes of this process invalidate sooner)
+## READ_CACHE_MAX_ENTRIES: entries kept by ReadCache, the least recently used is dropped first
+READ_CACHE_TTL = float(os.getenv("READ_CACHE_TTL", 300))
+READ_CACHE_MAX_ENTRIES = int(os.getenv("READ_CACHE_MAX_ENTRIES", 256))
@@ -36,8 +36,70 @@ def format_delete_query(
     return query
 
 
+# Server-side block of a grid (RefreshableAggrid datasource mode) over a base query
+## Only the given fields are sorted or filtered, filter values are passed as parameters
+## Filters: agTextColumnFilter "contains" and agDateColumnFilter "inRange" (inclusive)
+## key is the last sort column so LIMIT/OFFSET blocks never overlap or skip rows
+## The base query must not hold a literal % since the block uses named parameters
+GRID_BLOCK = """
+        SELECT * FROM ({base}) AS grid_rows
+        {where}
+        ORDER BY {order_by}
+        LIMIT %(limit)s OFFSET %(offset)s
+        """
+
+
+def format_grid_block_query(
+    base: str,
+    fields: list[str],
+    key: str,
+    sort_model: list[dict],
+    filter_model: dict,
+) -> tuple[str, dict]:
+    conditions, params = [], {}
+    for idx, (field, grid_filter) in enumerate(filter_model.items()):
+        if field not in fields:
+            raise ValueError(f"Cannot filter on {field}")
+        col = f"grid_rows.`{field}`"
+        kind = (grid_filter.get("filterType"), grid_filter.get("type"))
+        if kind == ("text", "contains"):
+            escaped = grid_filter["filter"]
+            for char in ("\\", "%", "_"):
+                escaped = escaped.replace(char, "\\" + char)
+            conditions.append(f"{col} LIKE %(filter_{idx})s")
+            params[f"filter_{idx}"] = f"%{escaped}%"
+        elif kind == ("date", "inRange"):
+            # Dates come as "YYYY-MM-DD hh:mm:ss", either end may be missing
+            if grid_filter.get("dateFrom"):
+                conditions.append(f"{col} >= %(date_from_{idx})s")
+                params[f"date_from_{idx}"] = grid_filter["dateFrom"][:10]
+            if grid_filter.get("dateTo"):
+                conditions.append(f"{col} <= %(date_to_{idx})s")
+                params[f"date_to_{idx}"] = grid_filter["dateTo"][:10]
+        else:
+            raise ValueError(f"Unsupported filter {kind} on {field}")
+    order_by = []
+    for sort in sort_model:
+        if sort["colId"] not in fields or sort["sort"] not in ("asc", "desc"):
+            raise ValueError(f"Cannot sort on {sort}")
+        order_by.append(f"grid_rows.`{sort['colId']}` {sort['sort'].upper()}")
+    order_by.append(f"grid_rows.`{key}`")
+    query = GRID_BLOCK.format(
+        base=base,
+        where=f"WHERE {' AND '.join(conditions)}" if conditions else "",
+        order_by=", ".join(order_by),
+    )
+    return query, params
+
+
+# Query for login_page
+USERS = "SELECT user_name, hashed_password FROM orderapp.users"
+
 # Queries for order_page
-## Product price is the latest price for a given product
+## Product prices are stored as intervals [effective_from, effective_to)
+## The latest price has its effective_to as null
+## The first price of a product starts at PRICE_FLOOR so orders are always covered by one interval
+PRICE_FLOOR = "1970-01-02 00:00:00"
 PRODUCT_PRICE = """
         SELECT
             p.product_name,
@@ -45,10 +107,7 @@ PRODUCT_PRICE = """
         FROM orderapp.products p
         JOIN orderapp.product_prices pp
             ON p.product_id = pp.product_id
-            AND pp.effective_timestamp = (
-                SELECT MAX(effective_timestamp)
-                FROM orderapp.product_prices
-                WHERE product_id = p.product_id)
+            AND pp.effective_to IS NULL
         """
 
 TODAY_ORDERS = """
@@ -70,20 +129,19 @@ TODAY_ORDERS = """
             JOIN orderapp.uom ON p.uom_id = uom.uom_id
             JOIN orderapp.product_prices pp
                 ON od.product_id = pp.product_id
-                AND pp.effective_timestamp = (
-                COALESCE(
-                    (SELECT MAX(effective_timestamp)
-                    FROM orderapp.product_prices
-                    WHERE product_id = od.product_id
-                    AND effective_timestamp <= o.order_timestamp),
-                    (SELECT MIN(effective_timestamp)
-                    FROM orderapp.product_prices
-                    WHERE product_id = od.product_id))
-            )
+                AND o.order_timestamp >= pp.effective_from
+                AND (pp.effective_to IS NULL OR o.order_timestamp < pp.effective_to)
         WHERE
-            DATE(o.order_timestamp) = CURDATE()
+            o.order_date = CURDATE()
             AND o.completion_timestamp IS NULL
         """
+# *_BY_IDS: the same rows restricted to the changed ids, so a write refetches only its entity
+ORDER_DATES_BY_IDS = """
+        SELECT DISTINCT o.order_date
+        FROM orderapp.orders o
+        WHERE o.order_id IN ({placeholders})
+        """
+TODAY_ORDERS_BY_IDS = TODAY_ORDERS + "AND o.order_id IN ({placeholders})\n"
 FUTURE_ORDERS = """
         SELECT 
             o.order_id,
@@ -104,37 +162,83 @@ FUTURE_ORDERS = """
             JOIN orderapp.uom ON p.uom_id = uom.uom_id
             JOIN orderapp.product_prices pp
                 ON od.product_id = pp.product_id
-                AND pp.effective_timestamp = (
-                COALESCE(
-                    (SELECT MAX(effective_timestamp)
-                    FROM orderapp.product_prices
-                    WHERE product_id = od.product_id
-                    AND effective_timestamp <= o.order_timestamp),
-                    (SELECT MIN(effective_timestamp)
-                    FROM orderapp.product_prices
-                    WHERE product_id = od.product_id))
-            )
+                AND o.order_timestamp >= pp.effective_from
+                AND (pp.effective_to IS NULL OR o.order_timestamp < pp.effective_to)
         WHERE
             o.completion_timestamp IS NOT NULL
             AND (
                 o.order_status != "已完成"
-                OR DATE(o.order_timestamp) >= CURDATE()
+                OR o.order_date >= CURDATE()
                 )
         """
-# CTE1: SELECT the latest product cost closest to a specific order
-# CTE2: Calculate the order total cost based on quantity and latest cost
-## For overview, only the status="已完成" are selected (excluding "準備中", "已取消")
-## so that unfinished orders' cost and income are properly
+FUTURE_ORDERS_BY_IDS = FUTURE_ORDERS + "AND o.order_id IN ({placeholders})\n"
+# Previous orders overview is read from orderapp.daily_order_summary (one row per order date)
+## Rows are kept up to date by refreshing only the dates touched by order writes and cost updates
+## A null summed_finished_cost means no finished order or a finished order without product cost
+## Should be called via helper function, the date window and keyset (before_date) are optional (null)
 PREVIOUS_ORDERS_OVERVIEW = """
-        WITH order_latest_product_costs AS (
+        SELECT
+            order_date,
+            total_id_list,
+            finished_id_list,
+            prepared_id_list,
+            cancelled_id_list,
+            finished_count,
+            prepared_count,
+            cancelled_count,
+            COALESCE(summed_finished_cost, 'N/A') AS summed_finished_cost,
+            summed_finished_price
+        FROM orderapp.daily_order_summary
+        WHERE
+            order_date <= CURDATE()
+            AND (%(start_date)s IS NULL OR order_date >= %(start_date)s)
+            AND (%(end_date)s IS NULL OR order_date <= %(end_date)s)
+            AND (%(before_date)s IS NULL OR order_date < %(before_date)s)
+        ORDER BY order_date DESC
+        {limit}
+        """
+
+# Should be called via helper function (refresh_order_summary), one date at a time
+# CTE1: SELECT the orders of the date to refresh (on the indexed order_date column)
+# CTE2: SELECT the latest product cost closest to a specific order
+# CTE3: Calculate the order total cost based on quantity and latest cost
+## For cost and income, only the status="已完成" are selected (excluding "準備中", "已取消")
+## so that unfinished orders' cost and income are properly
+## The date row is deleted first so that a date without orders left is removed
+DELETE_DAILY_ORDER_SUMMARY = """
+        DELETE FROM orderapp.daily_order_summary WHERE order_date = %(order_date)s
+        """
+REFRESH_DAILY_ORDER_SUMMARY = """
+        INSERT INTO orderapp.daily_order_summary (
+            order_date,
+            total_id_list,
+            finished_id_list,
+            prepared_id_list,
+            cancelled_id_list,
+            finished_count,
+            prepared_count,
+            cancelled_count,
+            summed_finished_cost,
+            summed_finished_price
+        )
+        WITH day_orders AS (
+            SELECT
+                o.order_id,
+                o.order_date,
+                o.order_status,
+                o.price_total
+            FROM orderapp.orders o
+            WHERE
+                o.order_date = %(order_date)s
+        ),
+        order_latest_product_costs AS (
             SELECT 
                 od.order_id,
                 od.product_id,
                 pc.cost_per_unit
             FROM 
-                orderapp.order_details od
-                
-            JOIN orderapp.orders o ON od.order_id = o.order_id
+                day_orders o
+            JOIN orderapp.order_details od ON od.order_id = o.order_id
             JOIN LATERAL (
                 SELECT 
                     pc.product_id,
@@ -145,7 +249,7 @@ PREVIOUS_ORDERS_OVERVIEW = """
                 WHERE
                     pc.product_id = od.product_id
                     AND (
-                        pc.cost_date <= DATE(o.order_timestamp)
+                        pc.cost_date <= o.order_date
                         OR pc.cost_date = (
                             SELECT MIN(cost_date)
                             FROM orderapp.product_costs
@@ -154,7 +258,7 @@ PREVIOUS_ORDERS_OVERVIEW = """
                     )
                 ORDER BY 
                     CASE 
-                        WHEN pc.cost_date <= DATE(o.order_timestamp) THEN 0
+                        WHEN pc.cost_date <= o.order_date THEN 0
                         ELSE 1
                     END,
                     pc.cost_date DESC
@@ -169,14 +273,15 @@ PREVIOUS_ORDERS_OVERVIEW = """
                     ELSE CAST(SUM(od.quantity * olpc.cost_per_unit) AS DECIMAL(10, 2))
                 END AS total_product_cost
             FROM 
-                orderapp.order_details od
+                day_orders o
+            JOIN orderapp.order_details od ON od.order_id = o.order_id
             LEFT JOIN 
                 order_latest_product_costs olpc ON od.product_id = olpc.product_id AND od.order_id = olpc.order_id
             GROUP BY 
                 od.order_id
         )
         SELECT
-            DATE(o.order_timestamp) AS order_date,
+            o.order_date,
             GROUP_CONCAT(o.order_id) AS total_id_list,
             GROUP_CONCAT(
                 CASE
@@ -193,14 +298,17 @@ PREVIOUS_ORDERS_OVERVIEW = """
                     WHEN o.order_status = "已取消" THEN o.order_id
                     ELSE NULL
                 END) AS cancelled_id_list,
+            COUNT(CASE WHEN o.order_status = "已完成" THEN 1 ELSE NULL END) AS finished_count,
+            COUNT(CASE WHEN o.order_status = "準備中" THEN 1 ELSE NULL END) AS prepared_count,
+            COUNT(CASE WHEN o.order_status = "已取消" THEN 1 ELSE NULL END) AS cancelled_count,
             CASE 
-                WHEN COUNT(CASE WHEN o.order_status = '已完成' THEN 1 ELSE NULL END) = 0 THEN 'N/A'
+                WHEN COUNT(CASE WHEN o.order_status = '已完成' THEN 1 ELSE NULL END) = 0 THEN NULL
                 WHEN COUNT(
                     CASE 
                         WHEN o.order_status = '已完成' AND otc.total_product_cost IS NULL THEN 1
                         ELSE NULL
                     END
-                ) > 0 THEN 'N/A'
+                ) > 0 THEN NULL
                 ELSE SUM(
                         CASE
                             WHEN o.order_status = '已完成' THEN otc.total_product_cost
@@ -212,14 +320,17 @@ PREVIOUS_ORDERS_OVERVIEW = """
                     WHEN o.order_status = "已完成" THEN o.price_total
                     ELSE 0
                 END) AS summed_finished_price
-
-        FROM orderapp.orders o
+        FROM day_orders o
         LEFT JOIN 
             order_total_cost otc ON o.order_id = otc.order_id
-        WHERE
-            DATE(o.order_timestamp) <= CURDATE()
-        GROUP BY DATE(o.order_timestamp)
-        ORDER BY DATE(o.order_timestamp) DESC
+        GROUP BY o.order_date
+        """
+
+## Dates whose finished cost could not be calculated, they may change when a product gets its first cost
+UNCOSTED_SUMMARY_DATES = """
+        SELECT order_date
+        FROM orderapp.daily_order_summary
+        WHERE finished_count > 0 AND summed_finished_cost IS NULL
         """
 
 # Should be called via helper function
@@ -249,23 +360,15 @@ PREVIOUS_ORDER_DETAILS = """
                     (SELECT MAX(cost_date)
                     FROM orderapp.product_costs
                     WHERE product_id = od.product_id
-                    AND cost_date <= DATE(o.order_timestamp)),
+                    AND cost_date <= o.order_date),
                     (SELECT MIN(cost_date)
                     FROM orderapp.product_costs
                     WHERE product_id = od.product_id))
             )
         LEFT JOIN orderapp.product_prices pp 
             ON od.product_id = pp.product_id
-            AND pp.effective_timestamp = (
-                COALESCE(
-                    (SELECT MAX(effective_timestamp)
-                    FROM orderapp.product_prices
-                    WHERE product_id = od.product_id
-                    AND effective_timestamp <= o.order_timestamp),
-                    (SELECT MIN(effective_timestamp)
-                    FROM orderapp.product_prices
-                    WHERE product_id = od.product_id))
-            )
+            AND o.order_timestamp >= pp.effective_from
+            AND (pp.effective_to IS NULL OR o.order_timestamp < pp.effective_to)
         WHERE
             o.order_id IN ({placeholders})
         ORDER BY o.order_timestamp
@@ -284,10 +387,7 @@ PRODUCT_OVERVIEW = """
         JOIN orderapp.uom ON p.uom_id = uom.uom_id
         JOIN orderapp.product_prices pp
             ON p.product_id = pp.product_id
-            AND pp.effective_timestamp = (
-                SELECT MAX(effective_timestamp)
-                FROM orderapp.product_prices
-                WHERE product_id = p.product_id)
+            AND pp.effective_to IS NULL
         LEFT JOIN orderapp.product_costs pc 
             ON p.product_id = pc.product_id
             AND pc.cost_date = (
@@ -297,6 +397,7 @@ PRODUCT_OVERVIEW = """
                 AND cost_date <= CURDATE()
             )
         """
+PRODUCT_OVERVIEW_BY_IDS = PRODUCT_OVERVIEW + "WHERE p.product_id IN ({placeholders})\n"
 
 ## The latest (combination of) recipe content will have their end_timestamp as null
 RECIPES = """
@@ -315,10 +416,7 @@ RECIPES = """
         JOIN orderapp.materials m ON r.material_id = m.material_id
         JOIN orderapp.product_prices pp
             ON r.product_id = pp.product_id
-            AND pp.effective_timestamp = (
-                SELECT MAX(effective_timestamp)
-                FROM orderapp.product_prices
-                WHERE product_id = r.product_id)
+            AND pp.effective_to IS NULL
         LEFT JOIN orderapp.material_costs mc 
             ON r.material_id = mc.material_id
             AND mc.cost_date = (
@@ -329,6 +427,10 @@ RECIPES = """
             )
         WHERE r.end_timestamp IS NULL
         """
+RECIPES_BY_IDS = RECIPES + "AND r.product_id IN ({placeholders})\n"
+# The uom and materials a product references, cleaned up after the product is deleted
+PRODUCT_UOM = "SELECT uom_id FROM orderapp.products WHERE product_id = %s"
+PRODUCT_MATERIALS = "SELECT material_id FROM orderapp.recipes WHERE product_id = %s"
 
 # Queries for material_page
 # o.order_timestamp >= r.start_timestamp ensure recipe existence before order
@@ -380,6 +482,9 @@ MATERIALS = """
         """
 
 # Queries for purchase_page
+# Whether any purchase exists (the purchase page reads no full table to tell)
+PURCHASE_EXISTS = "SELECT purchase_id FROM orderapp.purchases LIMIT 1"
+
 PURCHASES_OVERVIEW = """
         SELECT
             p.purchase_id,
@@ -416,51 +521,49 @@ PURCHASE_DETAILS = """
         JOIN orderapp.materials m ON pd.material_id = m.material_id
         JOIN orderapp.vendors v ON p.vendor_id = v.vendor_id
         """
+PURCHASE_DETAILS_BY_IDS = PURCHASE_DETAILS + "WHERE p.purchase_id IN ({placeholders})\n"
+
+# Queries for vendor_page
+VENDORS = "SELECT * FROM orderapp.vendors"
+VENDORS_BY_IDS = VENDORS + " WHERE vendor_id IN ({placeholders})"
 
 # Queries for existing data
+## Ids are included so they can be loaded into NameCache
 existed = {
-    "product_name": "SELECT product_name FROM orderapp.products",
-    "vendor_name": "SELECT vendor_name FROM orderapp.vendors",
-    "uom_name": "SELECT uom_name FROM orderapp.uom",
-    "material_name": "SELECT material_name FROM orderapp.materials",
-    "vendor_name": "SELECT vendor_name FROM orderapp.vendors",
+    "product_name": "SELECT product_name, product_id FROM orderapp.products",
+    "vendor_name": "SELECT vendor_name, vendor_id FROM orderapp.vendors",
+    "uom_name": "SELECT uom_name, uom_id FROM orderapp.uom",
+    "material_name": "SELECT material_name, material_id FROM orderapp.materials",
 }
 
 # Queries for inserting transaction
+## Names of products, materials, vendors and uom are resolved to ids by NameCache before writing
 insert = {
     "product_name": format_insert_query("products", ["product_name"]),
     "vendor_name": format_insert_query("vendors", ["vendor_name"]),
     "uom_name": format_insert_query("uom", ["uom_name"]),
     "material_name": format_insert_query("materials", ["material_name"]),
     "order_basics": format_insert_query("orders", ["price_total", "note"]),
+    # Plain VALUES so executemany sends details as one multi-row INSERT
     "order_details": format_insert_query(
-        "order_details",
-        ["order_id", "product_id", "quantity"],
-        val_args="%s, (SELECT product_id FROM orderapp.products WHERE product_name = %s), %s",
+        "order_details", ["order_id", "product_id", "quantity"]
     ),
     "future_order_basics": format_insert_query(
         "orders", ["price_total", "note", "completion_timestamp", "is_paid"]
     ),
-    "product_basics": format_insert_query(
-        "products",
-        ["product_name", "uom_id"],
-        val_args="%s, (SELECT uom_id FROM orderapp.uom WHERE uom_name = %s)",
-    ),
+    "product_basics": format_insert_query("products", ["product_name", "uom_id"]),
     "product_prices": format_insert_query("product_prices", ["product_id", "price"]),
-    "recipes": format_insert_query(
-        "recipes",
-        ["product_id", "material_id", "quantity"],
-        val_args="(SELECT product_id FROM orderapp.products WHERE product_name = %s), (SELECT material_id FROM orderapp.materials WHERE material_name = %s), %s",
+    "first_product_prices": format_insert_query(
+        "product_prices",
+        ["product_id", "price", "effective_from"],
+        val_args=f"%s, %s, '{PRICE_FLOOR}'",
     ),
-    "purchase_basics": format_insert_query(
-        "purchases",
-        ["purchase_date", "vendor_id"],
-        val_args="%s, (SELECT vendor_id FROM orderapp.vendors WHERE vendor_name = %s)",
+    "recipes": format_insert_query(
+        "recipes", ["product_id", "material_id", "quantity"]
     ),
+    "purchase_basics": format_insert_query("purchases", ["purchase_date", "vendor_id"]),
     "purchase_details": format_insert_query(
-        "purchase_details",
-        ["purchase_id", "material_id", "quantity", "price_total"],
-        val_args="%s,(SELECT material_id FROM orderapp.materials WHERE material_name = %s),%s,%s",
+        "purchase_details", ["purchase_id", "material_id", "quantity", "price_total"]
     ),
     "vendors": format_insert_query(
         "vendors",
@@ -477,6 +580,7 @@ insert = {
         ],
     ),
 }
+
 # Queries for updating data
 update = {
     "order_status": "UPDATE orderapp.orders SET order_status= %s WHERE order_id = %s",
@@ -489,25 +593,47 @@ update = {
             END
             WHERE order_id = %s;
         """,
+    # Bulk variants over many orders in one statement (order_id IN ({placeholders}))
+    "order_status_by_ids": """
+        UPDATE orderapp.orders SET order_status = %s WHERE order_id IN ({placeholders})
+        """,
+    "order_paid_by_ids": """
+        UPDATE orderapp.orders SET is_paid = %s WHERE order_id IN ({placeholders})
+        """,
+    "order_completion_timestamp_by_ids": """
+        UPDATE orderapp.orders 
+            SET order_timestamp = CASE 
+                WHEN order_status = '已完成' THEN completion_timestamp
+                ELSE CURRENT_TIMESTAMP 
+            END
+            WHERE order_id IN ({placeholders})
+        """,
     "purchases": format_insert_query(
         "purchase_details",
         ["purchase_id", "material_id", "quantity", "price_total"],
-        val_args="%s,(SELECT material_id FROM orderapp.materials WHERE material_name = %s),%s,%s",
         duplicate_args="AS new_vals ON DUPLICATE KEY UPDATE material_id = new_vals.material_id, quantity = new_vals.quantity, price_total = new_vals.price_total;",
     ),
     # Update need to include product name because it does not have a default value in table
-    # Product prices update was an simple insert with a new default effective timestamp (if price change)
+    # Product prices update was an simple insert with a new default effective_from (if price change)
     "product_basics": format_insert_query(
         "products",
         ["product_id", "product_name", "uom_id"],
-        val_args="%s, %s, (SELECT uom_id FROM orderapp.uom WHERE uom_name = %s)",
         duplicate_args="AS new_vals ON DUPLICATE KEY UPDATE uom_id = new_vals.uom_id;",
     ),
+    # Close the previous open price interval at the effective_from of the newly inserted price
+    "close_product_prices": """
+        UPDATE orderapp.product_prices prev
+        JOIN orderapp.product_prices cur
+            ON prev.product_id = cur.product_id
+            AND cur.effective_to IS NULL
+            AND cur.effective_from > prev.effective_from
+        SET prev.effective_to = cur.effective_from
+        WHERE prev.product_id = %s
+        AND prev.effective_to IS NULL;
+        """,
     # Noted that table recipe has composite primary key of product and material_id
     "recipes": format_insert_query(
-        "recipes",
-        ["product_id", "material_id", "quantity"],
-        val_args="%s, (SELECT material_id FROM orderapp.materials WHERE material_name = %s), %s",
+        "recipes", ["product_id", "material_id", "quantity"]
     ),
     "order_basics": format_insert_query(
         "orders",
@@ -523,7 +649,6 @@ update = {
     "order_details": format_insert_query(
         "order_details",
         ["order_id", "product_id", "quantity"],
-        val_args="%s, (SELECT product_id FROM orderapp.products WHERE product_name = %s), %s",
         duplicate_args="AS new_vals ON DUPLICATE KEY UPDATE quantity = new_vals.quantity;",
     ),
     "vendors": format_insert_query(
@@ -559,20 +684,20 @@ update_delete = {
     "purchases": format_delete_query(
         "purchase_details",
         ["purchase_id", "material_id"],
-        val_args="purchase_id = %s AND material_id = (SELECT material_id FROM orderapp.materials WHERE material_name = %s)",
+        val_args="purchase_id = %s AND material_id = %s",
     ),
     # No recipe is deleted on update, instead a end_timestamp is assigned to it (for associating with product ordered in such timeframe)
     "set_recipes_end": """
         UPDATE orderapp.recipes
             SET end_timestamp = CURRENT_TIMESTAMP
             WHERE product_id = %s
-            AND material_id = (SELECT material_id FROM orderapp.materials WHERE material_name = %s)
+            AND material_id = %s
             AND end_timestamp IS NULL;
         """,
     "order_details": format_delete_query(
         "order_details",
         ["order_id", "product_id"],
-        val_args="order_id = %s AND product_id = (SELECT product_id FROM orderapp.products WHERE product_name = %s)",
+        val_args="order_id = %s AND product_id = %s",
     ),
 }
 
@@ -590,3 +715,95 @@ delete = {
     "uom": format_delete_query("uom", ["uom_id"]),
     "materials": format_delete_query("materials", ["material_id"]),
 }
+
+# Queries for marking material costs dirty (consumed by update_cost.update_dirty_costs)
+## A material is dirty from the earliest date whose material_costs row may change, a later mark keeps the earlier date
+## Completed orders only count in material costs from the day after the order
+def format_mark_dirty_query(select: str) -> str:
+    query = f"""
+        INSERT INTO orderapp.material_cost_dirty (material_id, dirty_from)
+        SELECT * FROM ({select}) AS new_vals
+        ON DUPLICATE KEY UPDATE
+            dirty_from = LEAST(dirty_from, new_vals.dirty_from)
+        """
+    return query
+
+
+mark_cost_dirty = {
+    "orders": format_mark_dirty_query("""
+        SELECT
+            r.material_id,
+            o.order_date + INTERVAL 1 DAY AS dirty_from
+        FROM orderapp.orders o
+        JOIN orderapp.order_details od ON o.order_id = od.order_id
+        JOIN orderapp.recipes r ON od.product_id = r.product_id
+            AND o.order_timestamp >= r.start_timestamp
+            AND (r.end_timestamp IS NULL OR o.order_timestamp < r.end_timestamp)
+        WHERE o.order_id = %s
+        """),
+    "purchases": format_mark_dirty_query("""
+        SELECT
+            pd.material_id,
+            p.purchase_date AS dirty_from
+        FROM orderapp.purchases p
+        JOIN orderapp.purchase_details pd ON p.purchase_id = pd.purchase_id
+        WHERE p.purchase_id = %s
+        """),
+    # Every recipe version of the product, so materials taken out of the recipe are included
+    "recipes": format_mark_dirty_query("""
+        SELECT
+            r.material_id,
+            CURDATE() AS dirty_from
+        FROM orderapp.recipes r
+        WHERE r.product_id = %s
+        """),
+}
+
+# The orders mark for many orders in one statement (order_id IN ({placeholders})),
+## every material gets the earliest start date among the orders through ON DUPLICATE KEY
+mark_cost_dirty_by_ids = {
+    "orders": format_mark_dirty_query("""
+        SELECT
+            r.material_id,
+            o.order_date + INTERVAL 1 DAY AS dirty_from
+        FROM orderapp.orders o
+        JOIN orderapp.order_details od ON o.order_id = od.order_id
+        JOIN orderapp.recipes r ON od.product_id = r.product_id
+            AND o.order_timestamp >= r.start_timestamp
+            AND (r.end_timestamp IS NULL OR o.order_timestamp < r.end_timestamp)
+        WHERE o.order_id IN ({placeholders})
+        """),
+}
+
+# Queries for cost update runs of CostJobRunner
+COST_JOB_START = format_insert_query("cost_job_runs", ["job", "run_trigger"])
+COST_JOB_FINISH = """
+        UPDATE orderapp.cost_job_runs
+            SET status = %s,
+                finished_at = CURRENT_TIMESTAMP,
+                duration_ms = %s,
+                message = %s
+            WHERE run_id = %s
+        """
+COST_JOB_RUNS = """
+        SELECT
+            run_id,
+            job,
+            run_trigger,
+            status,
+            started_at,
+            finished_at,
+            duration_ms,
+            message
+        FROM orderapp.cost_job_runs
+        ORDER BY run_id DESC
+        LIMIT %s
+        """
+# Freshness of the cost data for the deep health check (/ping?deep=true)
+COST_FRESHNESS = """
+        SELECT
+            (SELECT MAX(finished_at)
+            FROM orderapp.cost_job_runs
+            WHERE status = "succeeded") AS last_cost_job_success,
+            (SELECT MAX(cost_date) FROM orderapp.material_costs) AS newest_material_cost_date
+        """
@@ -1,10 +1,14 @@
-from datetime import date, datetime, timedelta
+from datetime import date
+from decimal import Decimal
 
-from nicegui import app
+import numpy as np
 
 from logging_setup.setup import LOGGER
 
+from .config import COST_ENGINE
+from .CostLedger import LEDGER_COST_COLS, CostLedger
 from .DataAccessObjects import DaoOrderapp
+from .queries import format_delete_query, format_insert_query
 
 # CTE (Common Table Expression)
 
@@ -74,13 +78,13 @@ UPDATE_MATERIAL_COST = """
                         (SELECT MAX(cost_date)
                         FROM orderapp.material_costs
                         WHERE material_id = r.material_id
-                        AND cost_date < DATE(o.order_timestamp)),
+                        AND cost_date < o.order_date),
                         (SELECT MIN(cost_date)
                         FROM orderapp.material_costs
                         WHERE material_id = r.material_id))
                 )
             WHERE o.order_status = "已完成"
-            AND DATE(o.order_timestamp) < %(target_date)s -- smaller but not equal to avoid cyclical update
+            AND o.order_date < %(target_date)s -- smaller but not equal to avoid cyclical update
             AND o.order_timestamp >= r.start_timestamp
             AND (r.end_timestamp IS NULL OR o.order_timestamp < r.end_timestamp)
             GROUP BY 
@@ -134,6 +138,7 @@ UPDATE_MATERIAL_COST = """
 #       in CASE when one of more of material_cost record do not exist, return null
 ## Return the summed cost as the product cost
 ## Ignore updates when total_material_cost can not be calculated OR latest cost != new cost
+## Should be called with a product_filter, empty to update every product
 UPDATE_PRODUCT_COST = """
         INSERT INTO orderapp.product_costs (product_id, cost_date, cost_per_unit)
         WITH latest_product_costs AS (
@@ -180,6 +185,7 @@ UPDATE_PRODUCT_COST = """
             LEFT JOIN 
                 latest_material_costs lmc ON r.material_id = lmc.material_id
             WHERE r.end_timestamp IS NULL
+            {product_filter}
             GROUP BY 
                 r.product_id
         )
@@ -205,20 +211,53 @@ UPDATE_PRODUCT_COST = """
 """
 
 
-# Only store start date before(<) today since future date will be handle in the future, and today is default
-# Get only the date of any time representation for comparison
-def store_update_startdate(start_date: str | datetime | date):
-    if isinstance(start_date, str):
-        start_date = datetime.strptime(start_date, "%Y-%m-%d")
-    if isinstance(start_date, datetime):
-        start_date = start_date.date()
+# Only products whose current recipe uses one of the materials
+DIRTY_PRODUCT_FILTER = """
+            AND r.product_id IN (
+                SELECT product_id
+                FROM orderapp.recipes
+                WHERE end_timestamp IS NULL
+                AND material_id IN ({placeholders})
+            )
+"""
 
-    if start_date < date.today():
-        stored_start_date = {"update_start_date": start_date}
-        app.storage.general.update(stored_start_date)
-        LOGGER.debug(
-            f"Cost update set as: {app.storage.general.get('update_start_date')}"
-        )
+
+# Raw rows loaded once by the NumPy cost engine (numpy_rebuild_costs)
+## Same scope as UPDATE_MATERIAL_COST: purchases up to today, completed orders before today
+NUMPY_PURCHASES = """
+        SELECT
+            pd.material_id,
+            p.purchase_date,
+            pd.quantity,
+            pd.price_total
+        FROM orderapp.purchase_details pd
+        JOIN orderapp.purchases p ON pd.purchase_id = p.purchase_id
+        WHERE p.purchase_date <= %(target_date)s
+        """
+NUMPY_ORDER_DETAILS = """
+        SELECT
+            od.product_id,
+            o.order_timestamp,
+            od.quantity
+        FROM orderapp.order_details od
+        JOIN orderapp.orders o ON od.order_id = o.order_id
+        WHERE o.order_status = "已完成"
+        AND o.order_date < %(target_date)s
+        """
+NUMPY_RECIPES = """
+        SELECT
+            product_id,
+            material_id,
+            quantity,
+            start_timestamp,
+            end_timestamp
+        FROM orderapp.recipes
+        """
+DELETE_COSTS_FROM = format_delete_query(
+    "material_costs", ["cost_date"], val_args="cost_date >= %s"
+)
+# Rows per multi-row INSERT when writing the NumPy results
+NUMPY_INSERT_CHUNK = 1000
 
 
 # Update material and product cost when there are no new material and product cost for today
@@ -226,27 +265,272 @@ def perform_update(dao: DaoOrderapp, target_date):
 
     queries_to_commit = []
     queries_to_commit.append((UPDATE_MATERIAL_COST, {"target_date": target_date}))
-    queries_to_commit.append((UPDATE_PRODUCT_COST, {"target_date": target_date}))
+    queries_to_commit.append(
+        (UPDATE_PRODUCT_COST.format(product_filter=""), {"target_date": target_date})
+    )
     transaction_result = dao.perform_transaction(queries_to_commit)
 
     return f"Update material and product cost for {target_date}. {transaction_result}"
 
 
-def update_costs(dao: DaoOrderapp, start_date: date = date.today()):
+# Backfill every material from start_date in one pass of CostLedger instead of one perform_update per day
+## Product costs are only written for today, so one product update at the end gives the same result
+def backfill_costs(dao: DaoOrderapp, start_date: date) -> str:
+    material_ids = dao.get_ids_by_names(
+        "material_name", dao.get_existed_names("material_name")
+    ).values()
+    queries_to_commit = CostLedger(dao).roll_forward(
+        {material_id: start_date for material_id in material_ids}
+    )
+    queries_to_commit.append(
+        (UPDATE_PRODUCT_COST.format(product_filter=""), {"target_date": date.today()})
+    )
+    transaction_result = dao.perform_transaction(queries_to_commit)
+
+    return f"Backfill material and product cost from {start_date}. {transaction_result}"
+
+
+# Fixed-point scales of the NumPy engine, so it rounds exactly like the DECIMAL columns:
+## quantities are DECIMAL(10, 2) and a usage multiplies two of them, cost_per_unit is DECIMAL(10, 5)
+## and the usage cost multiplies it with a usage quantity
+## DECIMAL(10, 2) stocks and costs stay far below the int64 limit at these scales
+QUANTITY_SCALE = 10**4
+COST_SCALE = 10**9
+CPU_SCALE = COST_SCALE // QUANTITY_SCALE
+
+
+def to_scaled(values: list, scale: int) -> np.ndarray:
+    return np.array(
+        [int((Decimal(str(v)) * scale).to_integral_value()) for v in values],
+        dtype=np.int64,
+    )
+
+
+# Integer division rounded like MySQL DECIMAL (half away from zero)
+def divide_half_up(numerator: np.ndarray, denominator) -> np.ndarray:
+    sign = np.sign(numerator) * np.sign(denominator)
+    numerator, denominator = np.abs(numerator), np.abs(denominator)
+    return sign * ((2 * numerator + denominator) // (2 * denominator))
+
+
+# Compute material_costs rows of every material from the first purchase or order until today
+## Follows the rules of CostLedger with NumPy arrays over all materials: purchases and usages are
+## summed into (material, day) matrices, usages through the recipe that existed at
+## o.order_timestamp, stock quantities are cumulative sums over the days, and only the cost is
+## rolled forward day by day
+## All amounts are int64 at the scales above, so the rows equal the Decimal ones of CostLedger
+## Returns (material_id, cost_date, stocked_quantity, stocked_cost, cost_per_unit) rows
+def compute_costs_numpy(
+    purchases: list[dict],
+    order_details: list[dict],
+    recipes: list[dict],
+    today: date,
+) -> list[tuple]:
+    if not purchases:
+        return []
+    recipes = recipes or []
+    order_details = order_details or []
+    material_ids = np.unique(
+        [i["material_id"] for i in purchases] + [i["material_id"] for i in recipes]
+    )
+    p_material = np.searchsorted(material_ids, [i["material_id"] for i in purchases])
+    p_day = np.array([i["purchase_date"] for i in purchases], dtype="datetime64[D]")
+    o_product = np.array([i["product_id"] for i in order_details], dtype=np.int64)
+    o_timestamp = np.array(
+        [i["order_timestamp"] for i in order_details], dtype="datetime64[s]"
+    )
+    o_day = o_timestamp.astype("datetime64[D]")
+    first_day = min(p_day.min(), o_day.min()) if len(o_day) else p_day.min()
+    n_days = int((np.datetime64(today, "D") - first_day).astype(int)) + 1
+    n_materials = len(material_ids)
+
+    purchased_quantity = np.zeros((n_materials, n_days), dtype=np.int64)
+    purchased_cost = np.zeros((n_materials, n_days), dtype=np.int64)
+    purchased_any = np.zeros((n_materials, n_days), dtype=bool)
+    p_index = (p_day - first_day).astype(int)
+    np.add.at(
+        purchased_quantity,
+        (p_material, p_index),
+        to_scaled([i["quantity"] for i in purchases], QUANTITY_SCALE),
+    )
+    np.add.at(
+        purchased_cost,
+        (p_material, p_index),
+        to_scaled([i["price_total"] for i in purchases], COST_SCALE),
+    )
+    purchased_any[p_material, p_index] = True
+
+    # Orders sorted by product then timestamp, so each recipe row matches one slice
+    used_quantity = np.zeros((n_materials, n_days), dtype=np.int64)
+    order = np.lexsort((o_timestamp, o_product))
+    o_product, o_timestamp = o_product[order], o_timestamp[order]
+    o_index = (o_day[order] - first_day).astype(int)
+    o_quantity = to_scaled([i["quantity"] for i in order_details], 100)[order]
+    for r in recipes:
+        lo, hi = np.searchsorted(o_product, [r["product_id"], r["product_id"] + 1])
+        stamps = o_timestamp[lo:hi]
+        start = lo + np.searchsorted(
+            stamps, np.datetime64(r["start_timestamp"], "s"), side="left"
+        )
+        end = hi
+        if r["end_timestamp"] is not None:
+            end = lo + np.searchsorted(
+                stamps, np.datetime64(r["end_timestamp"], "s"), side="left"
+            )
+        material = np.searchsorted(material_ids, r["material_id"])
+        np.add.at(
+            used_quantity[material],
+            o_index[start:end],
+            o_quantity[start:end] * int(to_scaled([r["quantity"]], 100)[0]),
+        )
+
+    # Stock quantity of every day at once: usage waits until the first row is written, which is
+    ## the first day with a purchased stock (nothing is taken out before it), then from the next
+    ## day on all usage before each day is taken out
+    day_axis = np.arange(n_days)
+    stocked = np.cumsum(purchased_quantity, axis=1)
+    has_stock = np.logical_or.accumulate(purchased_any, axis=1)
+    can_write = has_stock & (stocked != 0)
+    first_day_written = np.where(
+        can_write.any(axis=1), np.argmax(can_write, axis=1), n_days
+    )
+    used_before = np.cumsum(used_quantity, axis=1) - used_quantity
+    taken_out = np.where(day_axis > first_day_written[:, None], used_before, 0)
+    quantity = stocked - taken_out
+    can_write = has_stock & (quantity != 0)
+    # Quantity taken out on each day (on the day after the first row, all usage so far)
+    taken_out = np.diff(taken_out, axis=1, prepend=0)
+    purchased_cost = np.cumsum(purchased_cost, axis=1)
+    first_index = np.minimum(first_day_written, n_days - 1)[:, None]
+    first_cpu = divide_half_up(
+        np.take_along_axis(purchased_cost, first_index, axis=1)[:, 0],
+        np.maximum(np.take_along_axis(stocked, first_index, axis=1)[:, 0], 1),
+    )
+
+    # Quantity and cost in cents, cost_per_unit at CPU_SCALE
+    rows = np.zeros((3, n_materials, n_days), dtype=np.int64)
+    rows[0] = divide_half_up(quantity, QUANTITY_SCALE // 100)
+    written = np.zeros((n_materials, n_days), dtype=bool)
+    # The cost is the one sequential step: a usage is costed with the latest written
+    ## cost_per_unit before its order date, and whether a day is written depends on its cost
+    usage_cost = np.zeros(n_materials, dtype=np.int64)
+    cpu_before = first_cpu.copy()
+    cpu_latest = first_cpu.copy()
+    last_written = np.zeros((3, n_materials), dtype=np.int64)
+    for day in range(n_days):
+        usage_cost += taken_out[:, day] * cpu_before
+        cost = purchased_cost[:, day] - usage_cost
+        day_quantity = quantity[:, day]
+        row = np.stack(
+            (
+                rows[0, :, day],
+                divide_half_up(cost, COST_SCALE // 100),
+                divide_half_up(cost, np.where(day_quantity == 0, 1, day_quantity)),
+            )
+        )
+        write = can_write[:, day] & (
+            (first_day_written == day) | np.any(row != last_written, axis=0)
+        )
+        rows[:, write, day] = row[:, write]
+        written[:, day] = write
+        last_written[:, write] = row[:, write]
+        cpu_before = cpu_latest
+        cpu_latest = np.where(write, row[2], cpu_latest)
+
+    material_index, day_index = np.nonzero(written)
+    cost_dates = (first_day + day_index).astype(date)
+    return [
+        (
+            int(material_ids[m]),
+            cost_date,
+            Decimal(int(rows[0, m, d])).scaleb(-2),
+            Decimal(int(rows[1, m, d])).scaleb(-2),
+            Decimal(int(rows[2, m, d])).scaleb(-5),
+        )
+        for m, d, cost_date in zip(material_index, day_index, cost_dates)
+    ]
+
+
+# Rebuild material costs from start_date with compute_costs_numpy and update every product cost
+## Rows before start_date are kept as they are
+def numpy_rebuild_costs(dao: DaoOrderapp, start_date: date) -> str:
+    today = date.today()
+    params = {"target_date": today}
+    purchases = dao.query_data(NUMPY_PURCHASES, params)
+    order_details = dao.query_data(NUMPY_ORDER_DETAILS, params)
+    recipes = dao.query_data(NUMPY_RECIPES)
+    new_rows = [
+        row
+        for row in compute_costs_numpy(purchases, order_details, recipes, today)
+        if row[1] >= start_date
+    ]
+
+    queries_to_commit = [(DELETE_COSTS_FROM, (start_date,))]
+    for i in range(0, len(new_rows), NUMPY_INSERT_CHUNK):
+        chunk = new_rows[i : i + NUMPY_INSERT_CHUNK]
+        row_placeholders = "), (".join(
+            [", ".join(["%s"] * len(LEDGER_COST_COLS))] * len(chunk)
+        )
+        queries_to_commit.append(
+            (
+                format_insert_query("material_costs", LEDGER_COST_COLS, row_placeholders),
+                tuple(v for row in chunk for v in row),
+            )
+        )
+    queries_to_commit.append((UPDATE_PRODUCT_COST.format(product_filter=""), params))
+    transaction_result = dao.perform_transaction(queries_to_commit)
+
+    return f"Rebuild material and product cost from {start_date} with NumPy. {transaction_result}"
+
+
+# Full rebuild of the material and product cost of every date since start_date
+## The engine is chosen by COST_ENGINE in .env, the update result is returned for CostJobRunner
+## start_date defaults to the day of the call (CostJobRunner runs it in a long-lived process)
+def update_costs(dao: DaoOrderapp, start_date: date | None = None) -> str:
+    if start_date is None:
+        start_date = date.today()
     dao.connect_orderapp()
-    # Generate a list of dates based on the start_date
-    if start_date == date.today():
-        # If start_date is today, the list contains only one date
-        dates_to_update = [start_date]
-    elif start_date < date.today():
-        # If start_date is before today, generate a list of dates from start_date to today
-        dates_to_update = [
-            (start_date + timedelta(days=i))
-            for i in range((date.today() - start_date).days + 1)
-        ]
-    else:
+    if start_date > date.today():
         LOGGER.error("Start date cannot be in the future.")
-        return
+        return "Start date cannot be in the future."
+    if COST_ENGINE == "numpy":
+        update_result = numpy_rebuild_costs(dao, start_date)
+    elif start_date == date.today():
+        update_result = perform_update(dao, start_date)
+    else:
+        update_result = backfill_costs(dao, start_date)
+    LOGGER.info(update_result)
+    refresh_summary_costs(dao)
+    return update_result
+
+
+# Incremental update: roll forward only the materials marked in material_cost_dirty,
+# then update the products whose current recipe uses them, all in one transaction
+def update_dirty_costs(dao: DaoOrderapp) -> str:
+    dao.connect_orderapp()
+    ledger = CostLedger(dao)
+    dirty = ledger.fetch_dirty()
+    if not dirty:
+        LOGGER.info("No dirty material cost to update")
+        return "No dirty material cost to update"
+
+    queries_to_commit = ledger.roll_forward(dirty)
+    material_ids = sorted(dirty)
+    product_filter = DIRTY_PRODUCT_FILTER.format(
+        placeholders=", ".join(["%s"] * len(material_ids))
+    )
+    queries_to_commit.append(
+        (UPDATE_PRODUCT_COST.format(product_filter=product_filter), tuple(material_ids))
+    )
+    transaction_result = dao.perform_transaction(queries_to_commit)
+    update_result = f"Update cost of material(s) {material_ids} from {min(dirty.values())}. {transaction_result}"
+    LOGGER.info(update_result)
+    refresh_summary_costs(dao)
+    return update_result
+
 
-    for d in dates_to_update:
-        LOGGER.info(perform_update(dao, d))
+# Product costs are only written for today, so daily_order_summary only changes for today
+# and for dates whose cost was not calculable (they fall back to the earliest product cost)
+def refresh_summary_costs(dao: DaoOrderapp):
+    summary_dates = [date.today(), *dao.fetch_uncosted_summary_dates()]
+    dao.refresh_order_summary(summary_dates)
@@ -1,13 +1,16 @@
-from datetime import date
+import functools
 from pathlib import Path
 
-import schedule
 from nicegui import app, ui
 
-from api import ping
+from api import metrics, ping, query_stats
 from auth.login import AuthMiddleware
+from database.AsyncDataAccessObjects import shutdown_db_threads
+from database.config import connect_config
+from database.ConnectionPool import ConnectionPool
+from database.CostJobRunner import CostJobRunner
 from database.DataAccessObjects import DaoOrderapp
-from database.update_cost import update_costs
+from database.Metrics import METRICS
 from pages.dashboard_page import dashboard_page
 from pages.future_order_page import future_order_page
 from pages.login_page import login_page
@@ -18,26 +21,24 @@ from pages.purchase_page import purchase_page
 from pages.recipe_page import recipe_page
 from pages.vendor_page import vendor_page
 
-DAO = DaoOrderapp()
-DAO.connect_orderapp()
+# Pages check out connections from the pool (MYSQL_POOL_SIZE database threads and the event loop)
+POOL = ConnectionPool(connect_config)
+DAO = DaoOrderapp(pool=POOL)
+METRICS.register_collector(POOL.metric_samples)
+ping.DEEP_CHECK.configure(POOL)
+# Cost updates run on their own worker thread and connection, scheduled every day at 8:00 AM
+## Rolls forward the materials marked dirty by writes, including orders completed the day before
+COST_JOBS = CostJobRunner()
 
-COST_UPDATE_TIME = "08:00:00"
 ICON = Path("pages", "static", "images", "logo_removeb.ico")
 
 app.add_static_files("/fonts", "pages/static/fonts")
+app.on_startup(COST_JOBS.start)
+app.on_shutdown(COST_JOBS.stop)
+app.on_shutdown(shutdown_db_threads)
 app.on_shutdown(DAO.close_connection)
 app.add_middleware(AuthMiddleware)
 
-# Schedule cost update at every day 8:00 AM
-# Check every second but according to https://github.com/zauberzeug/nicegui/discussions/3197 shouldn't impact performance
-schedule.every().day.at(COST_UPDATE_TIME, "Asia/Taipei").do(
-    lambda: update_costs(
-        DAO, app.storage.general.get("update_start_date", date.today())
-    )
-)
-
-ui.timer(1, schedule.run_pending)
-
 # Responsive design for general elements (specific ones would require customzation)
 ui.button.default_classes("md:text-base")
 ui.card.default_classes("md:text-base")
@@ -48,59 +49,71 @@ ui.select.default_classes("md:text-lg")
 ui.number.default_classes("md:text-lg")
 
 
+# ui.page that records its build time per route in METRICS (orderapp_page_build_seconds)
+def timed_page(route: str):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with METRICS.timer("orderapp_page_build_seconds", route=route):
+                return func(*args, **kwargs)
+
+        return ui.page(route)(wrapper)
+
+    return decorator
+
+
 # Page functions
-@ui.page("/dashboard")
+@timed_page("/dashboard")
 def dashboard():
-    DAO.connect_orderapp()
     dashboard_page()
 
 
-@ui.page("/login")
+@timed_page("/login")
 def login():
-    DAO.connect_orderapp()
-    login_page(DAO.connection)
+    with DAO.checkout():
+        login_page(POOL)
 
 
-@ui.page("/future_orders")
+@timed_page("/future_orders")
 def future_orders():
-    DAO.connect_orderapp()
-    future_order_page(DAO.connection)
+    with DAO.checkout():
+        future_order_page(POOL)
 
 
-@ui.page("/orders")
+@timed_page("/orders")
 def orders():
-    DAO.connect_orderapp()
-    order_page(DAO.connection)
+    with DAO.checkout():
+        order_page(POOL)
 
 
-@ui.page("/previous_orders")
+@timed_page("/previous_orders")
 def previous_order():
-    DAO.connect_orderapp()
-    previous_order_page(DAO.connection)
+    with DAO.checkout():
+        previous_order_page(POOL)
 
 
-@ui.page("/recipes")
+@timed_page("/recipes")
 def recipes():
-    DAO.connect_orderapp()
-    recipe_page(DAO.connection)
+    with DAO.checkout():
+        recipe_page(POOL)
 
 
-@ui.page("/materials")
+@timed_page("/materials")
 def materials():
-    DAO.connect_orderapp()
-    material_page(DAO.connection)
+    with DAO.checkout():
+        material_page(POOL)
 
 
-@ui.page("/purchases")
+@timed_page("/purchases")
 def purchases():
-    DAO.connect_orderapp()
-    purchase_page(DAO.connection)
+    with DAO.checkout():
+        purchase_page(POOL)
 
 
-@ui.page("/vendors")
+@timed_page("/vendors")
 def vendors():
-    DAO.connect_orderapp()
-    vendor_page(DAO.connection)
+    with DAO.checkout():
+        vendor_page(POOL)
 
 
 dashboard()
@@ -1,4 +1,4 @@
-from typing import Callable
+from typing import Awaitable, Callable
 
 from nicegui import ui
 
@@ -49,3 +49,26 @@ class VisibilityMenu(ui.menu):
     def manual_switch(self, name: str, value: bool):
         switch = self.switch_reference.get(name)
         switch.set_value(value)
+
+
+# Actions on the checked order cards (OrderCards.checked_ids), shown in their bulk mode
+## on_status gets the new status, on_paid (optional) the new is_paid
+class BulkActions(ui.row):
+    def __init__(
+        self,
+        statuses: list[str],
+        on_status: Callable[[str], Awaitable[None]],
+        on_paid: Callable[[bool], Awaitable[None]] | None = None,
+    ) -> None:
+        super().__init__()
+        self.classes("w-full gap-1 items-center")
+        with self:
+            ui.label("勾選訂單：")
+            for status in statuses:
+                button = ui.button(status, on_click=lambda s=status: on_status(s))
+                button.props("outline padding='none 4px'")
+            if on_paid:
+                paid = ui.button("已付款", on_click=lambda: on_paid(True))
+                paid.classes("!text-green-600").props("outline padding='none 4px'")
+                unpaid = ui.button("未付款", on_click=lambda: on_paid(False))
+                unpaid.classes("!text-red-600").props("outline padding='none 4px'")
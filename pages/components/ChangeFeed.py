@@ -0,0 +1,61 @@
+import asyncio
+import itertools
+from typing import Awaitable, Callable
+
+from nicegui import Client, background_tasks, ui
+
+from database.WriteEvents import ORDER_CHANGES
+from logging_setup.setup import LOGGER
+
+from .GridOfCards import GridOfCards
+
+
+# Keep a page's order cards in sync with the writes of every client (ORDER_CHANGES)
+## Events arrive on DB threads and are handed to the event loop of the page's client,
+## only the changed orders are fetched (fetch_orders with order_ids, one query per event)
+## and applied together with cards.apply_deltas
+## A failed fetch (None) leaves the cards as they are, only an empty result removes an order
+## An order whose fetch is overtaken by a newer event on it is left out, so deltas never go back in time
+## The subscription ends with the first event after the client is gone
+def follow_order_changes(
+    cards: GridOfCards,
+    fetch_orders: Callable[[list[int]], Awaitable[list[dict] | None]],
+):
+    client = ui.context.client
+    loop = asyncio.get_running_loop()
+    latest: dict[int, int] = {}
+    sequence = itertools.count()
+
+    async def apply(order_ids: list[int], op: str, seq: int):
+        rows = [] if op == "delete" else await fetch_orders(order_ids)
+        if client.id not in Client.instances:
+            return
+        if rows is None:
+            LOGGER.warning(
+                f"Fetch of orders {order_ids} failed, {op} is not applied on client {client.id}"
+            )
+            return
+        changes = {i: [] for i in order_ids if latest.get(i) == seq}
+        for row in rows:
+            if row["order_id"] in changes:
+                changes[row["order_id"]].append(row)
+        if not changes:
+            return
+        with client:
+            cards.apply_deltas(changes)
+        LOGGER.debug(f"Apply {op} of orders {list(changes)} on client {client.id}")
+
+    # Runs on the event loop, so latest is only touched there
+    def schedule(order_ids: list[int], op: str):
+        seq = next(sequence)
+        for order_id in order_ids:
+            latest[order_id] = seq
+        background_tasks.create(apply(order_ids, op, seq))
+
+    def on_change(table: str, ids: list[int], op: str):
+        if client.id not in Client.instances:
+            ORDER_CHANGES.unsubscribe(on_change)
+            return
+        loop.call_soon_threadsafe(schedule, list(ids), op)
+
+    ORDER_CHANGES.subscribe(on_change)
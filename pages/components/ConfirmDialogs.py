@@ -1,4 +1,4 @@
-from typing import Callable, override
+from typing import Awaitable, Callable, override
 
 from nicegui import ui
 
@@ -11,7 +11,7 @@ class ConfirmDialog(ui.dialog):
         self,
         confirm_msg: str,
         target_id: int | None = None,
-        on_confirm: Callable[[int], None] = None,
+        on_confirm: Callable[[int], Awaitable[None]] = None,
     ) -> None:
         super().__init__()
         self._confirm_msg_display: ui.label | None = None
@@ -33,8 +33,11 @@ class ConfirmDialog(ui.dialog):
     def _create_confirm_button(self):
         confirm_button = ui.button("確定")
         confirm_button.props("outline").classes("!text-red-500 font-semibold")
-        confirm_button.on_click(lambda: self.on_confirm(self.target_id))
-        confirm_button.on_click(self.close)
+        confirm_button.on_click(self._confirm)
+
+    async def _confirm(self):
+        self.close()
+        await self.on_confirm(self.target_id)
 
     def start(self, target_id):
         self.target_id = target_id
@@ -48,7 +51,7 @@ class ConfirmDeleteRecipe(ConfirmDialog):
         confirm_msg: str,
         dao: DaoOrderapp,
         target_id: int | None = None,
-        on_confirm: Callable[[int], None] = None,
+        on_confirm: Callable[[int], Awaitable[None]] = None,
     ) -> None:
         super().__init__(confirm_msg, target_id, on_confirm)
         self.dao = dao
@@ -69,7 +72,7 @@ class ConfirmDeleteVendor(ConfirmDialog):
         confirm_msg: str,
         dao: DaoOrderapp,
         target_id: int | None = None,
-        on_confirm: Callable[[int], None] = None,
+        on_confirm: Callable[[int], Awaitable[None]] = None,
     ) -> None:
         super().__init__(confirm_msg, target_id, on_confirm)
         self.dao = dao
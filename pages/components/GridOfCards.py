@@ -1,17 +1,31 @@
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
 from datetime import datetime
 from decimal import Decimal
-from typing import Callable, override
+from typing import Any, Awaitable, Callable, override
 
 from nicegui import ui
 
 from database.FieldSchema import FieldSchema
 
 from .constants import DAYS_OPTIONS
+from .RowIndex import RowIndex
+
+# Lazy mode creates LAZY_BATCH selected cards at a time,
+# the next batch when the scroll area is scrolled past LAZY_SCROLL_THRESHOLD
+LAZY_BATCH = 12
+LAZY_SCROLL_THRESHOLD = 0.9
 
 
 # GridofCards handle getting (and sorting) primary id locally because it need to get distinct id set, overring ORDER BY
+## _reference keeps the elements and the rows of each card by primary id, recreate compares new rows
+## against them and only adds, removes, patches (_patch_card) or moves the cards that changed
+## Rows are grouped once per data load into _index (RowIndex), sorted by sort_field if set
+## Lazy mode: no card is created up front, select creates the cards of the selected ids in batches
+## (more on scroll), with max_cards the least recently shown hidden cards are removed (LRU)
+## and created again when they are selected
 class GridOfCards(ui.grid):
+    sort_field: str | None = None
+
     def __init__(
         self,
         schemas: list[FieldSchema],
@@ -19,24 +33,31 @@ class GridOfCards(ui.grid):
         group_by: str,
         on_update: Callable[[int, list[dict]], None] = None,
         on_delete: Callable[[int], None] = None,
+        lazy: bool = False,
+        max_cards: int | None = None,
     ):
-        with ui.scroll_area().classes("w-full flex-1").props("visible='visible'"):
+        with ui.scroll_area(on_scroll=self._on_scroll if lazy else None).classes(
+            "w-full flex-1"
+        ).props("visible='visible'"):
             super().__init__(columns=6)
             self.classes("w-full")
         self.schemas = schemas
-        self.data = data
         self.group_by = group_by
+        self.lazy = lazy
+        self.max_cards = max_cards
+        self._load(data)
         self.on_update = on_update
         self.on_delete = on_delete
-        self._reference: defaultdict[int, dict[str, ui.card | ui.table | ui.button]] = (
-            defaultdict(dict)
-        )
+        self._reference: defaultdict[int, dict[str, Any]] = defaultdict(dict)
         self._modify_visible = False
         self._selected_ids: list[int] = []
+        # Lazy mode: shown ids from least to most recent, and how many selected cards to show
+        self._shown: OrderedDict[int, None] = OrderedDict()
+        self._shown_limit = LAZY_BATCH
         self._create()
 
-    def _create(self):
-        cols = [
+    def _columns(self) -> list[dict]:
+        return [
             {
                 "label": s.header_name,
                 "field": s.field,
@@ -45,25 +66,53 @@ class GridOfCards(ui.grid):
             }
             for s in self.schemas
         ]
+
+    def _load(self, data: list[dict] | None):
+        self.data = data
+        self._index = RowIndex(data, self.group_by, self.sort_field)
+        self._positions = {p_id: i for i, p_id in enumerate(self._get_primary_ids())}
+
+    def _create(self):
         if not self.data:
             self.clear()
-        else:
-            primary_ids = self._get_primary_ids()
-            for p_id in primary_ids:
-                table_data = [i for i in self.data if i[f"{self.group_by}_id"] == p_id]
-
-                with self:
-                    with ui.card().tight() as card:
-                        card.classes("col-span-6 sm:col-span-3 xl:col-span-2")
-                        self._create_header(table_data)
-                        table = self._create_table(cols, table_data)
-                        self._create_footer(p_id, table_data)
-                    self._reference[p_id]["card_ref"] = card
-                    self._reference[p_id]["table_ref"] = table
-                    card.visible = False
+        elif not self.lazy:
+            cols = self._columns()
+            for p_id in self._get_primary_ids():
+                self._create_card(p_id, self._index.rows[p_id], cols)
+
+    def _create_card(self, p_id: int, rows: list[dict], cols: list[dict]):
+        with self:
+            with ui.card().tight() as card:
+                card.classes("col-span-6 sm:col-span-3 xl:col-span-2")
+                self._create_header(rows)
+                table = self._create_table(cols, rows)
+                self._create_footer(p_id, rows)
+            self._reference[p_id]["card_ref"] = card
+            self._reference[p_id]["table_ref"] = table
+            self._reference[p_id]["rows"] = rows
+            card.visible = False
+
+    # Rebuild a changed card, subclasses patch the elements in place when they can
+    def _patch_card(
+        self, p_id: int, old_rows: list[dict], rows: list[dict], cols: list[dict]
+    ):
+        self._remove_card(p_id)
+        self._create_card(p_id, rows, cols)
+
+    def _remove_card(self, p_id: int):
+        self.remove(self._reference.pop(p_id)["card_ref"])
+        self._shown.pop(p_id, None)
+
+    # Move only the cards that are not at the index of their primary id (among created cards)
+    def _reorder(self):
+        for index, p_id in enumerate(sorted(self._reference, key=self._positions.get)):
+            card = self._reference[p_id]["card_ref"]
+            children = self.default_slot.children
+            if index >= len(children) or children[index] is not card:
+                card.move(self, target_index=index)
 
     def _get_primary_ids(self):
-        return {row[f"{self.group_by}_id"] for row in self.data}
+        return self._index.sorted_ids()
 
     def _create_header(self, rows: list[dict]):
         title = rows[0][f"{self.group_by}_name"]
@@ -87,9 +136,11 @@ class GridOfCards(ui.grid):
                 .classes(" !text-red-500")
                 .props("outline padding='none 4px'")
             )
-            # On update sent id and table data to update
+            # On update sent id and table data (latest rows of the card) to update
             if self.on_update:
-                update.on_click(lambda x=modify_id, d=rows: self.on_update(x, d))
+                update.on_click(
+                    lambda x=modify_id: self.on_update(x, self._reference[x]["rows"])
+                )
             # On delete sent id to delete
             if self.on_delete:
                 delete.on_click(lambda x=modify_id: self.on_delete(x))
@@ -101,24 +152,57 @@ class GridOfCards(ui.grid):
         if ids:
             selected_id = ids
         elif name:
-            selected_id = list(
-                {
-                    i[f"{self.group_by}_id"]
-                    for i in self.data
-                    if name in i[f"{self.group_by}_name"]
-                }
-            )
+            selected_id = self._index.ids_matching(name)
         elif all:
-            selected_id = list({i[f"{self.group_by}_id"] for i in self.data})
+            selected_id = self._index.ids()
         elif not all:
             selected_id = []
         self._selected_ids = selected_id
+        self._shown_limit = LAZY_BATCH
+        self._apply_selection()
+
+    def _apply_selection(self):
+        if self.lazy:
+            self._materialize(self._selected_ids)
+        selected_set = set(self._selected_ids)
         for i in self._reference.keys():
-            if i in selected_id:
+            if i in selected_set:
                 self._reference[i]["card_ref"].set_visibility(True)
             else:
                 self._reference[i]["card_ref"].set_visibility(False)
 
+    # Create the first _shown_limit selected cards (in primary id order) that do not exist yet
+    def _materialize(self, ids: list[int]):
+        cols = self._columns()
+        wanted = sorted(
+            (i for i in set(ids) if i in self._positions), key=self._positions.get
+        )[: self._shown_limit]
+        for p_id in wanted:
+            if p_id not in self._reference:
+                self._create_card(p_id, self._index.rows[p_id], cols)
+            self._shown[p_id] = None
+            self._shown.move_to_end(p_id)
+        self._evict(set(ids))
+        self._reorder()
+
+    # Remove the least recently shown cards that are not selected beyond max_cards
+    def _evict(self, selected: set[int]):
+        if self.max_cards is None:
+            return
+        for p_id in list(self._shown):
+            if len(self._reference) <= self.max_cards:
+                break
+            if p_id not in selected:
+                self._remove_card(p_id)
+
+    def _on_scroll(self, e):
+        if (
+            e.vertical_percentage >= LAZY_SCROLL_THRESHOLD
+            and len(self._selected_ids) > self._shown_limit
+        ):
+            self._shown_limit += LAZY_BATCH
+            self._apply_selection()
+
     # Delete and update visibilities are bind, so showing one is enough
     def show_modify(self):
         if self._modify_visible:
@@ -126,13 +210,47 @@ class GridOfCards(ui.grid):
         else:
             self._modify_visible = True
 
-    def recreate(self, new_data: list[dict]):
-        self.data = new_data
-        self._references = defaultdict(dict)
-        self.clear()
-        self._create()
+    # Keep selection (or status filter) after cards are added, removed or patched
+    def _refresh_visibility(self):
         if self._selected_ids:
-            self.select(self._selected_ids)
+            self._apply_selection()
+
+    def recreate(self, new_data: list[dict] | None):
+        old_rows = {p_id: ref["rows"] for p_id, ref in self._reference.items()}
+        self._load(new_data)
+        # From or to no data the placeholder (if any) changes, so the grid is rebuilt
+        if not new_data or not old_rows:
+            self._reference = defaultdict(dict)
+            self._shown.clear()
+            self.clear()
+            self._create()
+        else:
+            cols = self._columns()
+            new_rows = self._index.rows
+            for p_id in old_rows.keys() - new_rows.keys():
+                self._remove_card(p_id)
+            for p_id, rows in new_rows.items():
+                if p_id not in old_rows:
+                    # Lazy cards of new ids are created when they are selected
+                    if not self.lazy:
+                        self._create_card(p_id, rows, cols)
+                elif rows != old_rows[p_id]:
+                    self._patch_card(p_id, old_rows[p_id], rows, cols)
+            self._reorder()
+        self._refresh_visibility()
+
+    def rows_of(self, p_id: int) -> list[dict]:
+        return self._index.rows.get(p_id, [])
+
+    # Replace the rows of one primary id (no rows: the id is gone), only its card is touched
+    def apply_delta(self, p_id: int, rows: list[dict]):
+        self.apply_deltas({p_id: rows})
+
+    # apply_delta of many ids with one reconcile
+    def apply_deltas(self, changes: dict[int, list[dict]]):
+        id_col = f"{self.group_by}_id"
+        kept = [i for i in self.data or [] if i[id_col] not in changes]
+        self.recreate(kept + [row for rows in changes.values() for row in rows])
 
 
 class VendorCards(GridOfCards):
@@ -147,20 +265,15 @@ class VendorCards(GridOfCards):
         super().__init__(schemas, data, group_by, on_update, on_delete)
 
     @override
-    def _create(self):
-        if not self.data:
-            self.clear()
-        else:
-            primary_ids = self._get_primary_ids()
-            for p_id in primary_ids:
-                table_data = [i for i in self.data if i[f"{self.group_by}_id"] == p_id]
-                with self:
-                    with ui.card().tight() as card:
-                        card.classes("col-span-6 sm:col-span-3 xl:col-span-2")
-                        self._create_labels(table_data)
-                        self._create_footer(p_id, table_data)
-                    self._reference[p_id]["card_ref"] = card
-                    card.visible = False
+    def _create_card(self, p_id: int, rows: list[dict], cols: list[dict]):
+        with self:
+            with ui.card().tight() as card:
+                card.classes("col-span-6 sm:col-span-3 xl:col-span-2")
+                self._create_labels(rows)
+                self._create_footer(p_id, rows)
+            self._reference[p_id]["card_ref"] = card
+            self._reference[p_id]["rows"] = rows
+            card.visible = False
 
     @override
     def _create_header(self):
@@ -235,12 +348,16 @@ class PurchaseCards(GridOfCards):
         group_by: str,
         on_update: Callable[[int, list[dict]], None] = None,
         on_delete: Callable[[int], None] = None,
+        lazy: bool = False,
+        max_cards: int | None = None,
     ):
-        super().__init__(schemas, data, group_by, on_update, on_delete)
+        super().__init__(
+            schemas, data, group_by, on_update, on_delete, lazy, max_cards
+        )
 
     @override
     def _get_primary_ids(self):
-        return sorted(super()._get_primary_ids(), reverse=True)
+        return self._index.sorted_ids(reverse=True)
 
     @override
     def _create_header(self, rows: list[dict]):
@@ -259,8 +376,12 @@ class RecipeCards(GridOfCards):
         group_by: str,
         on_update: Callable[[int, dict], None] = None,
         on_delete: Callable[[int], None] = None,
+        lazy: bool = False,
+        max_cards: int | None = None,
     ):
-        super().__init__(schemas, data, group_by, on_update, on_delete)
+        super().__init__(
+            schemas, data, group_by, on_update, on_delete, lazy, max_cards
+        )
 
     @override
     def _create_header(self, rows: list[dict]):
@@ -272,6 +393,10 @@ class RecipeCards(GridOfCards):
 
 
 class OrderCards(GridOfCards):
+    # Order fields shown outside the status, price, table rows and paid button,
+    # a change in them rebuilds the card instead of patching it
+    rebuild_fields = ("order_timestamp", "note")
+
     def __init__(
         self,
         schemas: list[FieldSchema],
@@ -279,10 +404,13 @@ class OrderCards(GridOfCards):
         group_by: str,
         on_update: Callable[[int, list[dict]], None] = None,
         on_delete: Callable[[int], None] = None,
-        on_status_change: Callable[[int, str], None] = None,
+        on_status_change: Callable[[int, str], Awaitable[None]] = None,
     ):
         self._footer_visible = True
         self._paid_visible = False
+        # Bulk mode shows a checkbox on every card, checked ids are kept across card rebuilds
+        self._bulk_visible = False
+        self._checked: set[int] = set()
         self._status_visibility: dict[str, bool] = {
             "已完成": True,
             "已取消": True,
@@ -290,10 +418,11 @@ class OrderCards(GridOfCards):
         }
         super().__init__(schemas, data, group_by, on_update, on_delete)
         self.on_status_change = on_status_change
+        self._filter_by_status()
 
     @override
-    def _create(self):
-        cols = [
+    def _columns(self) -> list[dict]:
+        return [
             {
                 "label": s.header_name,
                 "field": s.field,
@@ -303,31 +432,63 @@ class OrderCards(GridOfCards):
             for s in self.schemas
         ]
 
+    @override
+    def _create(self):
         if not self.data:
             with self:
                 with ui.card().tight().classes("col-span-6"):
                     ui.label("請建立新訂單開始").classes("w-full text-xl p-5")
         else:
-            primary_ids = self._get_primary_ids()
-            for p_id in primary_ids:
-                table_data = [i for i in self.data if i[f"{self.group_by}_id"] == p_id]
-                with self.classes("w-full"):
-                    with ui.card().tight() as card:
-                        card.classes("col-span-6 sm:col-span-3 xl:col-span-2")
-                        price, status = self._create_header(table_data)
-                        table = self._create_table(cols, table_data)
-                        paid = self._create_footer(p_id, table_data)
-                    self._reference[p_id]["card_ref"] = card
-                    self._reference[p_id]["price_ref"] = price
-                    self._reference[p_id]["status_ref"] = status
-                    self._reference[p_id]["table_ref"] = table
-                    self._reference[p_id]["paid_ref"] = paid
-                    self._change_status_display(p_id)
-            self._filter_by_status()
+            super()._create()
 
     @override
-    def _get_primary_ids(self):
-        return sorted(super()._get_primary_ids())
+    def _create_card(self, p_id: int, rows: list[dict], cols: list[dict]):
+        with self.classes("w-full"):
+            with ui.card().tight() as card:
+                card.classes("col-span-6 sm:col-span-3 xl:col-span-2")
+                with ui.row().classes("w-full px-1") as check_row:
+                    check = ui.checkbox(
+                        "勾選",
+                        value=p_id in self._checked,
+                        on_change=lambda e, o=p_id: self._check(o, e.value),
+                    ).props("dense")
+                check_row.bind_visibility_from(self, "_bulk_visible")
+                price, status = self._create_header(rows)
+                table = self._create_table(cols, rows)
+                paid = self._create_footer(p_id, rows)
+            self._reference[p_id]["card_ref"] = card
+            self._reference[p_id]["price_ref"] = price
+            self._reference[p_id]["status_ref"] = status
+            self._reference[p_id]["table_ref"] = table
+            self._reference[p_id]["paid_ref"] = paid
+            self._reference[p_id]["check_ref"] = check
+            self._reference[p_id]["rows"] = rows
+            self._change_status_display(p_id)
+            self._change_paid_display(p_id)
+
+    # Patch status label, price, table rows and paid button of a changed order
+    @override
+    def _patch_card(
+        self, p_id: int, old_rows: list[dict], rows: list[dict], cols: list[dict]
+    ):
+        if any(old_rows[0][f] != rows[0][f] for f in self.rebuild_fields):
+            super()._patch_card(p_id, old_rows, rows, cols)
+            return
+        ref = self._reference[p_id]
+        ref["rows"] = rows
+        ref["price_ref"].text = f"總金額：{rows[0]['order_total']}元"
+        if ref["status_ref"].text != rows[0]["order_status"]:
+            self._reset_status_display(p_id)
+            ref["status_ref"].text = rows[0]["order_status"]
+            self._change_status_display(p_id)
+        ref["table_ref"].rows[:] = rows
+        ref["table_ref"].update()
+        ref["paid_ref"].text = "已付款" if rows[0]["is_paid"] else "未付款"
+        self._change_paid_display(p_id)
+
+    @override
+    def _refresh_visibility(self):
+        self._filter_by_status()
 
     @override
     def _create_header(self, rows: list[dict]):
@@ -380,9 +541,11 @@ class OrderCards(GridOfCards):
                 complete.classes("text-black  text-base md:text-lg")
                 complete.props("flat padding=none")
                 complete.on_click(lambda o=order_id: self._change_status(o, "已完成"))
-            # On update sent id and table data to update
+            # On update sent id and table data (latest rows of the card) to update
             if self.on_update:
-                update.on_click(lambda o=order_id, r=rows: self.on_update(o, r))
+                update.on_click(
+                    lambda o=order_id: self.on_update(o, self._reference[o]["rows"])
+                )
             # On delete sent id to delete
             if self.on_delete:
                 delete.on_click(lambda o=order_id: self.on_delete(o))
@@ -390,6 +553,13 @@ class OrderCards(GridOfCards):
             footer.bind_visibility_from(self, "_footer_visible")
             return paid
 
+    def _reset_status_display(self, order_id: int):
+        ref = self._reference[order_id]
+        ref["card_ref"].classes(remove="text-gray-400")
+        ref["table_ref"].classes(remove="text-gray-400")
+        ref["price_ref"].classes(remove="text-black line-through")
+        ref["status_ref"].classes(remove="text-green-600 text-red-600")
+
     def _change_status_display(self, order_id: int):
         card = self._reference[order_id]["card_ref"]
         price = self._reference[order_id]["price_ref"]
@@ -406,10 +576,12 @@ class OrderCards(GridOfCards):
             price.classes("line-through")
             status.classes("text-red-600")
 
-    def _change_status(self, order_id: int, new_status: str):
+    async def _change_status(self, order_id: int, new_status: str):
         if self.on_status_change:
-            self.on_status_change(order_id, new_status)
-            self._change_status_display(order_id)
+            await self.on_status_change(order_id, new_status)
+            # The card is already patched if the callback recreated the grid
+            if order_id in self._reference:
+                self._change_status_display(order_id)
 
     # Today Order does not change is_paid status
     def _change_paid_status(self, order_id: int, button: ui.button):
@@ -418,9 +590,9 @@ class OrderCards(GridOfCards):
     def _change_paid_display(self, order_id: int):
         paid = self._reference[order_id]["paid_ref"]
         if paid.text == "已付款":
-            paid.classes("!text-green-600")
+            paid.classes("!text-green-600", remove="!text-red-600")
         elif paid.text == "未付款":
-            paid.classes("!text-red-600")
+            paid.classes("!text-red-600", remove="!text-green-600")
 
     # Control the visiblity of cards based on status
     # _status_visibility example: {"準備中": True; "已完成": False}
@@ -437,6 +609,40 @@ class OrderCards(GridOfCards):
         if any(cards) and not any(cards_visibility):
             ui.notify("提醒：目前所有訂單皆被隱藏，但仍然存在於列表中。")
 
+    # Patch fields of orders' rows without a query, for writes whose result is known
+    ## (a status or paid click), the cards are patched like any other changed order
+    def patch_order(self, order_id: int, **fields):
+        self.patch_orders([order_id], **fields)
+
+    def patch_orders(self, order_ids: list[int], **fields):
+        changes = {
+            i: [{**row, **fields} for row in self.rows_of(i)]
+            for i in order_ids
+            if self.rows_of(i)
+        }
+        if changes:
+            self.apply_deltas(changes)
+
+    def _check(self, order_id: int, checked: bool):
+        if checked:
+            self._checked.add(order_id)
+        else:
+            self._checked.discard(order_id)
+
+    # Checked orders that still have a card
+    def checked_ids(self) -> list[int]:
+        return [i for i in self._reference if i in self._checked]
+
+    def clear_checked(self):
+        self._checked.clear()
+        for ref in self._reference.values():
+            ref["check_ref"].set_value(False)
+
+    def show_bulk(self):
+        self._bulk_visible = not self._bulk_visible
+        if not self._bulk_visible:
+            self.clear_checked()
+
     def update_status_visibility(self, stauts_visibilty: dict[str, bool]):
         self._status_visibility = stauts_visibilty
         self._filter_by_status()
@@ -450,8 +656,8 @@ class FutureOrderCards(OrderCards):
         group_by: str,
         on_update: Callable[[int, list[dict]], None] = None,
         on_delete: Callable[[int], None] = None,
-        on_status_change: Callable[[int, str], None] = None,
-        on_paid_change: Callable[[int, bool], None] = None,
+        on_status_change: Callable[[int, str], Awaitable[None]] = None,
+        on_paid_change: Callable[[int, bool], Awaitable[None]] = None,
     ):
         self.on_paid_change = on_paid_change
         super().__init__(
@@ -459,22 +665,12 @@ class FutureOrderCards(OrderCards):
         )
         self._paid_visible = True
 
+    # The delivery warning follows the status, so a status change rebuilds the card
+    rebuild_fields = ("completion_timestamp", "note", "order_status")
+
     # Let id be sorted based on completion_timestamp
     # Because order_id does not have a direct relationship with completion_timestamp
-    @override
-    def _get_primary_ids(self):
-        id_cpt = {(i["order_id"], i["completion_timestamp"]) for i in self.data}
-        cp_based_ids = sorted(id_cpt, key=lambda x: x[1])
-        cp_based_ids = [i[0] for i in cp_based_ids]
-        return cp_based_ids
-
-    @override
-    def _create(self):
-        super()._create()
-        # Change is_paid button color, similar to _change_status_display being applied for every id
-        if self.data:
-            for i in self._get_primary_ids():
-                self._change_paid_display(i)
+    sort_field = "completion_timestamp"
 
     @override
     def _create_header(self, rows: list[dict]):
@@ -510,12 +706,12 @@ class FutureOrderCards(OrderCards):
         return diff
 
     @override
-    def _change_paid_status(self, order_id: int, button: ui.button):
+    async def _change_paid_status(self, order_id: int, button: ui.button):
         if self.on_paid_change:
             if button.text == "已付款":
-                self.on_paid_change(order_id, False)
+                await self.on_paid_change(order_id, False)
             elif button.text == "未付款":
-                self.on_paid_change(order_id, True)
+                await self.on_paid_change(order_id, True)
 
 
 class PreviousOrderCards(OrderCards):
@@ -526,8 +722,8 @@ class PreviousOrderCards(OrderCards):
         group_by: str,
         on_update: Callable[[int, list[dict]], None] = None,
         on_delete: Callable[[int], None] = None,
-        on_status_change: Callable[[int, str], None] = None,
-        on_paid_change: Callable[[int, bool], None] = None,
+        on_status_change: Callable[[int, str], Awaitable[None]] = None,
+        on_paid_change: Callable[[int, bool], Awaitable[None]] = None,
     ):
         self._cost: ui.label | None = None
         self.on_paid_change = on_paid_change
@@ -537,23 +733,19 @@ class PreviousOrderCards(OrderCards):
         self._paid_visible = True
         self._footer_visible = False
 
+    # The cost label is computed from products_cost, so a cost change rebuilds the card
+    rebuild_fields = ("order_timestamp", "note", "products_cost")
+
     # Let id be sorted based on order_timestamp
     # Because order_id does not have a direct relationship with order_timestamp when it can be changed on_complete (i.e., when future order becomes previous)
-    @override
-    def _get_primary_ids(self):
-        id_ot = {(i["order_id"], i["order_timestamp"]) for i in self.data}
-        cp_based_ids = sorted(id_ot, key=lambda x: x[1])
-        cp_based_ids = [i[0] for i in cp_based_ids]
-        return cp_based_ids
+    sort_field = "order_timestamp"
 
     @override
     def _create(self):
         if not self.data:
             self.clear()
         else:
-            super()._create()
-            for i in self._get_primary_ids():
-                self._change_paid_display(i)
+            GridOfCards._create(self)
 
     @override
     def _create_table(self, cols: list[dict], rows: list[dict]):
@@ -567,14 +759,21 @@ class PreviousOrderCards(OrderCards):
                 self._cost = ui.label(f"總成本：{summed_cost}元")
         return table
 
+    # The cost label is created in _create_table, it is bound to the card on its first display
     @override
     def _change_status_display(self, order_id: int):
         super()._change_status_display(order_id)
         status = self._reference[order_id]["status_ref"]
+        cost = self._reference[order_id].setdefault("cost_ref", self._cost)
         if status.text == "已完成":
-            self._cost.classes("text-black")
+            cost.classes("text-black")
         elif status.text == "已取消":
-            self._cost.classes("line-through")
+            cost.classes("line-through")
+
+    @override
+    def _reset_status_display(self, order_id: int):
+        super()._reset_status_display(order_id)
+        self._reference[order_id]["cost_ref"].classes(remove="text-black line-through")
 
     @override
     def select(self):
@@ -582,10 +781,8 @@ class PreviousOrderCards(OrderCards):
             "Disabled. PreviousOrderCards is now created on selection"
         )
 
-    def create_on_select(self, details: list[dict]):
-        self.data = details
-        self.clear()
-        self._create()
+    def create_on_select(self, details: list[dict] | None):
+        self.recreate(details)
 
     def show_footer(self):
         if not self.data:
@@ -598,9 +795,9 @@ class PreviousOrderCards(OrderCards):
                 self._footer_visible = True
 
     @override
-    def _change_paid_status(self, order_id: int, button: ui.button):
+    async def _change_paid_status(self, order_id: int, button: ui.button):
         if self.on_paid_change:
             if button.text == "已付款":
-                self.on_paid_change(order_id, False)
+                await self.on_paid_change(order_id, False)
             elif button.text == "未付款":
-                self.on_paid_change(order_id, True)
+                await self.on_paid_change(order_id, True)
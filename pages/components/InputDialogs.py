@@ -1,5 +1,5 @@
 from datetime import date, datetime
-from typing import Callable, override
+from typing import Awaitable, Callable, override
 
 from nicegui import ui
 
@@ -26,7 +26,7 @@ class BaseInputDialog(ui.dialog):
     def __init__(
         self,
         detail_grid_config: list[FieldSchema],
-        on_confirm: Callable[[None], None] = None,
+        on_confirm: Callable[[], Awaitable[None]] = None,
     ) -> None:
         super().__init__()
         self.detail_grid_config = detail_grid_config
@@ -72,15 +72,16 @@ class BaseInputDialog(ui.dialog):
             return False
         return True
 
-    def _submit_input(self):
+    async def _submit_input(self):
         detail = self.get_grid_values()
         detail_vals = [v for row in detail for v in row.values()]
         quantity = [v for row in detail for key, v in row.items() if key == "quantity"]
         if self._validate_fields_not_null(
             detail_vals
         ) and self._validate_quantity_positive(quantity):
-            self.on_confirm()
+            # Close before awaiting to prevent submitting twice
             self.close()
+            await self.on_confirm()
         else:
             pass
 
@@ -97,7 +98,7 @@ class GenericInputDialog(BaseInputDialog):
         self,
         basic_grid_config: list[FieldSchema],
         detail_grid_config: list[FieldSchema],
-        on_confirm: Callable[[None], None] = None,
+        on_confirm: Callable[[], Awaitable[None]] = None,
     ) -> None:
         self.basic_grid_config = basic_grid_config
         self._basic_grid: InputGrid | None = None
@@ -121,15 +122,20 @@ class GenericInputDialog(BaseInputDialog):
         with self._submit_dialog, ui.card():
             self._submit_summary = ui.label().classes("whitespace-pre-wrap")
             with ui.row().classes("w-full items-center justify-between"):
-                keep_adding = ui.button("送出並繼續新增", on_click=self.on_confirm)
-                finish = ui.button("送出並結束", on_click=self.on_confirm)
+                keep_adding = ui.button("送出並繼續新增")
+                finish = ui.button("送出並結束")
                 keep_adding.classes("text-black font-semibold").props("outline")
-                keep_adding.on_click(self.refresh)
-                keep_adding.on_click(self._submit_dialog.close)
+                keep_adding.on_click(lambda: self._confirm_submit(keep_adding=True))
                 finish.classes("text-black font-semibold").props("outline")
-                finish.on_click(self.refresh)
-                finish.on_click(self._submit_dialog.close)
-                finish.on_click(self.close)
+                finish.on_click(lambda: self._confirm_submit(keep_adding=False))
+
+    # Await on_confirm before refresh, otherwise the grid is cleared before its values are read
+    async def _confirm_submit(self, keep_adding: bool):
+        self._submit_dialog.close()
+        if not keep_adding:
+            self.close()
+        await self.on_confirm()
+        self.refresh()
 
     @override
     def _submit_input(self):
@@ -153,7 +159,7 @@ class PurchaseInputDialog(GenericInputDialog):
         self,
         basic_grid_config: list[FieldSchema],
         detail_grid_config: list[FieldSchema],
-        on_confirm: Callable[[None], None] = None,
+        on_confirm: Callable[[], Awaitable[None]] = None,
     ) -> None:
         super().__init__(basic_grid_config, detail_grid_config, on_confirm)
 
@@ -184,7 +190,7 @@ class RecipeInputDialog(GenericInputDialog):
         basic_grid_config: list[FieldSchema],
         detail_grid_config: list[FieldSchema],
         existed_products: list,
-        on_confirm: Callable[[None], None] = None,
+        on_confirm: Callable[[], Awaitable[None]] = None,
     ) -> None:
         self.existed_products = existed_products
         super().__init__(basic_grid_config, detail_grid_config, on_confirm)
@@ -234,7 +240,7 @@ class OrderInputDialog(BaseInputDialog):
         self,
         detail_grid_config: list[FieldSchema],
         product_price_pairs: list[dict],
-        on_confirm: Callable[[None], None] = None,
+        on_confirm: Callable[[], Awaitable[None]] = None,
     ) -> None:
         self.product_price_pairs = product_price_pairs
         self._note: ui.input | None = None
@@ -276,7 +282,7 @@ class FutureOrderInputDialog(OrderInputDialog):
         self,
         detail_grid_config: list[FieldSchema],
         product_price_pairs: list[dict],
-        on_confirm: Callable[[None], None] = None,
+        on_confirm: Callable[[], Awaitable[None]] = None,
     ) -> None:
         self._cp_date: ui.input | None = None
         self._cp_time: ui.input | None = None
@@ -336,7 +342,7 @@ class FutureOrderInputDialog(OrderInputDialog):
 
     # Include check for _co_date/time not null in _submit_input
     @override
-    def _submit_input(self):
+    async def _submit_input(self):
         detail = self.get_grid_values()
         detail_vals = [v for row in detail for v in row.values()]
         detail_vals.extend([self._cp_date.value, self._cp_time.value])
@@ -345,8 +351,8 @@ class FutureOrderInputDialog(OrderInputDialog):
         if self._validate_fields_not_null(
             detail_vals
         ) and self._validate_quantity_positive(quantity):
-            self.on_confirm()
             self.close()
+            await self.on_confirm()
         else:
             pass
 
@@ -362,7 +368,7 @@ class VendorInputDialog(BaseInputDialog):
         self,
         detail_grid_config: list[FieldSchema],
         existed_vendors: list,
-        on_confirm: Callable[[None], None] = None,
+        on_confirm: Callable[[], Awaitable[None]] = None,
     ) -> None:
         self.existed_vendors = existed_vendors
         super().__init__(detail_grid_config, on_confirm)
@@ -389,14 +395,14 @@ class VendorInputDialog(BaseInputDialog):
                 confirm_button.on_click(self._submit_input)
 
     @override
-    def _submit_input(self):
+    async def _submit_input(self):
         detail = self.get_grid_values()
         vendor_name = detail[0]["vendor_name"]
         if self._validate_vendor_name_not_null(
             vendor_name
         ) and self._validate_vendor_unique(vendor_name):
-            self.on_confirm()
             self.close()
+            await self.on_confirm()
         else:
             pass
 
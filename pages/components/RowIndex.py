@@ -0,0 +1,46 @@
+from collections import defaultdict
+
+
+# One-pass group-by index of the rows shown by GridOfCards, built once per data load
+## rows: primary id -> its rows (in data order), names: primary id -> {group_by}_name of its first row,
+## ids_by_name: name -> primary ids, sort_keys: primary id -> sort_field of its first row
+class RowIndex:
+    def __init__(
+        self, data: list[dict] | None, group_by: str, sort_field: str | None = None
+    ):
+        self.sort_field = sort_field
+        self.rows: dict[int, list[dict]] = {}
+        self.names: dict[int, str | None] = {}
+        self.ids_by_name: defaultdict[str, list[int]] = defaultdict(list)
+        self.sort_keys: dict[int, object] = {}
+        id_col, name_col = f"{group_by}_id", f"{group_by}_name"
+        for row in data or []:
+            p_id = row[id_col]
+            rows = self.rows.get(p_id)
+            if rows is None:
+                rows = self.rows[p_id] = []
+                name = row.get(name_col)
+                self.names[p_id] = name
+                if name is not None:
+                    self.ids_by_name[name].append(p_id)
+                if sort_field:
+                    self.sort_keys[p_id] = row[sort_field]
+            rows.append(row)
+
+    def ids(self) -> list[int]:
+        return list(self.rows)
+
+    # Ids in sort_field order (ties keep data order), or in id order without a sort_field
+    def sorted_ids(self, reverse: bool = False) -> list[int]:
+        if self.sort_field:
+            return sorted(self.rows, key=self.sort_keys.__getitem__, reverse=reverse)
+        return sorted(self.rows, reverse=reverse)
+
+    # Ids whose name contains name_part, only distinct names are scanned
+    def ids_matching(self, name_part: str) -> list[int]:
+        return [
+            p_id
+            for name, ids in self.ids_by_name.items()
+            if name_part in name
+            for p_id in ids
+        ]
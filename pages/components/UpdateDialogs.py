@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Callable, override
+from typing import Awaitable, Callable, override
 
 from database.FieldSchema import FieldSchema
 
@@ -33,7 +33,7 @@ class GenericUpdateDialog(GenericInputDialog):
         self,
         basic_grid_config: list[FieldSchema],
         detail_grid_config: list[FieldSchema],
-        on_confirm: Callable[[None], None] = None,
+        on_confirm: Callable[[int], Awaitable[None]] = None,
     ) -> None:
         super().__init__(basic_grid_config, detail_grid_config, on_confirm)
         self.update_id: int | None = None
@@ -89,7 +89,7 @@ class PurchaseUpdateDialog(GenericUpdateDialog):
         self,
         basic_grid_config: list[FieldSchema],
         detail_grid_config: list[FieldSchema],
-        on_confirm: Callable[[int], None] = None,
+        on_confirm: Callable[[int], Awaitable[None]] = None,
     ) -> None:
         super().__init__(basic_grid_config, detail_grid_config, on_confirm)
 
@@ -127,7 +127,7 @@ class RecipeUpdateDialog(GenericUpdateDialog):
         self,
         basic_grid_config: list[FieldSchema],
         detail_grid_config: list[FieldSchema],
-        on_confirm: Callable[[int], None] = None,
+        on_confirm: Callable[[int], Awaitable[None]] = None,
     ) -> None:
         super().__init__(basic_grid_config, detail_grid_config, on_confirm)
 
@@ -160,7 +160,7 @@ class OrderUpdateDialog(OrderInputDialog):
         self,
         detail_grid_config: list[FieldSchema],
         product_price_pairs: list[dict],
-        on_confirm: Callable[[int], None] = None,
+        on_confirm: Callable[[int], Awaitable[None]] = None,
     ) -> None:
         super().__init__(detail_grid_config, product_price_pairs, on_confirm)
         self.update_id: int | None = None
@@ -225,7 +225,7 @@ class FutureOrderUpdateDialog(OrderUpdateDialog, FutureOrderInputDialog):
         self,
         detail_grid_config: list[FieldSchema],
         product_price_pairs: list[dict],
-        on_confirm: Callable[[int], None] = None,
+        on_confirm: Callable[[int], Awaitable[None]] = None,
     ) -> None:
         super().__init__(detail_grid_config, product_price_pairs, on_confirm)
         self.update_id: int | None = None
@@ -274,7 +274,7 @@ class VendorUpdateDialog(VendorInputDialog):
         self,
         detail_grid_config: list[FieldSchema],
         existed_vendors: list,
-        on_confirm: Callable[[int], None] = None,
+        on_confirm: Callable[[int], Awaitable[None]] = None,
     ) -> None:
         super().__init__(detail_grid_config, existed_vendors, on_confirm)
         self.update_id: int | None = None
@@ -298,6 +298,6 @@ class VendorUpdateDialog(VendorInputDialog):
         self.open()
 
     @override
-    def _submit_input(self):
-        self.on_confirm(self.update_id)
+    async def _submit_input(self):
         self.close()
+        await self.on_confirm(self.update_id)
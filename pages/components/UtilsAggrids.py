@@ -1,14 +1,38 @@
-from typing import Callable, override
+import inspect
+import json
+from datetime import date, datetime
+from typing import Awaitable, Callable, override
 
-from nicegui import ui
+from nicegui import events, ui
 
 from database.FieldSchema import FieldSchema
+from database.Metrics import METRICS
+from logging_setup.setup import LOGGER
 
+from .constants import GRID_BLOCK_SIZE, GRID_MAX_BLOCKS
 
+# Fetch of one server-side block: start_row, end_row, sort model, filter model -> rows
+GridDatasource = Callable[[int, int, list[dict], dict], Awaitable[list[dict]]]
+
+
+# With a datasource the grid uses ag-grid's infinite row model instead of rowData:
+## the browser asks for blocks of GRID_BLOCK_SIZE rows with its sort and filter models
+## (gridBlock event), the datasource reads them with SQL and the block is answered by request id,
+## so the page sends no rows up front and the browser keeps at most GRID_MAX_BLOCKS blocks
+# With a row_key, rows get that field as their ag-grid row id, so selection survives row updates
+## and apply_delta sends only the added, removed and changed rows (applyTransaction)
 class RefreshableAggrid(ui.aggrid):
-    def __init__(self, schemas: list[FieldSchema], data: list[dict]):
+    def __init__(
+        self,
+        schemas: list[FieldSchema],
+        data: list[dict] | None,
+        datasource: GridDatasource | None = None,
+        row_key: str | None = None,
+    ):
         self.schemas = schemas
         self.data = data
+        self.datasource = datasource
+        self.row_key = row_key
         self._header = self._customize_header()
         self._default_setting = self._customize_general()
         self._create()
@@ -17,6 +41,9 @@ class RefreshableAggrid(ui.aggrid):
     @ui.refreshable
     def _create(self):
         super().__init__(self._default_setting, auto_size_columns=False)
+        if self.datasource:
+            self.options[":datasource"] = self._datasource_js()
+            self.on("gridBlock", self._serve_block)
 
     def _customize_general(self) -> dict:
         default_setting = {
@@ -26,8 +53,56 @@ class RefreshableAggrid(ui.aggrid):
             "rowSelection": "multiple",
             "localeText": {"contains": "包含", "inRange": "範圍", "reset": "重置"},
         }
+        if self.row_key:
+            row_id = f"(params) => String(params.data.{self.row_key})"
+            default_setting[":getRowId"] = row_id
+        if self.datasource:
+            del default_setting["rowData"]
+            default_setting["rowModelType"] = "infinite"
+            default_setting["cacheBlockSize"] = GRID_BLOCK_SIZE
+            default_setting["maxBlocksInCache"] = GRID_MAX_BLOCKS
         return default_setting
 
+    # getRows keeps ag-grid's params by request id until _serve_block answers them
+    def _datasource_js(self) -> str:
+        return (
+            "{getRows: (params) => {"
+            "const blocks = (window.orderappGridBlocks = window.orderappGridBlocks || {});"
+            "const request = (window.orderappGridRequest || 0) + 1;"
+            "window.orderappGridRequest = request;"
+            "blocks[request] = params;"
+            f"getElement({self.id}).$emit('gridBlock', {{"
+            "request, startRow: params.startRow, endRow: params.endRow,"
+            "sortModel: params.sortModel, filterModel: params.filterModel});"
+            "}}"
+        )
+
+    async def _serve_block(self, e: events.GenericEventArguments):
+        block = e.args
+        request = int(block["request"])
+        try:
+            rows = await self.datasource(
+                block["startRow"],
+                block["endRow"],
+                block["sortModel"],
+                block["filterModel"],
+            )
+        except Exception as error:
+            LOGGER.error(f"Grid block {block['startRow']}-{block['endRow']}: {error}")
+            ui.run_javascript(
+                f"{{const b = window.orderappGridBlocks[{request}];"
+                f"delete window.orderappGridBlocks[{request}]; b.failCallback();}}"
+            )
+            return
+        # A short block is the last one, otherwise the row count is still unknown (-1)
+        requested = block["endRow"] - block["startRow"]
+        last_row = block["startRow"] + len(rows) if len(rows) < requested else -1
+        ui.run_javascript(
+            f"{{const b = window.orderappGridBlocks[{request}];"
+            f"delete window.orderappGridBlocks[{request}];"
+            f"b.successCallback({json.dumps(rows, default=str)}, {last_row});}}"
+        )
+
     def _customize_header(self) -> list[dict]:
         header = []
         for s in self.schemas:
@@ -70,15 +145,102 @@ class RefreshableAggrid(ui.aggrid):
         self._default_setting["rowData"] = new_data
         self._create.refresh()
 
+    # Server-side grid: the loaded blocks are read again, sort, filter and scroll are kept
+    def refresh_blocks(self) -> None:
+        self.run_grid_method("refreshInfiniteCache")
+
+    # Diff new_data against the last rowData by row_key and send only the delta (applyTransaction),
+    ## the grid is not recreated so selection, scroll, sort and filter stay as they are
+    ## Added rows are inserted at their position if they form one block in new_data and the kept rows
+    ## keep their order, otherwise rowData is replaced (row ids still keep the selection)
+    ## Returns the row counts and the payload sent against a full rowData resend (bytes)
+    def apply_delta(self, new_data: list[dict] | None) -> dict:
+        if self.datasource:
+            self.refresh_blocks()
+            return {}
+        if not self.row_key:
+            self.refresh(new_data)
+            return {}
+        key = self.row_key
+        old_rows = {row[key]: row for row in self._default_setting["rowData"] or []}
+        new_rows = {row[key]: row for row in new_data or []}
+        added_at = [i for i, k in enumerate(new_rows) if k not in old_rows]
+        transaction = {
+            "add": [new_rows[k] for k in new_rows if k not in old_rows],
+            "update": [
+                row
+                for k, row in new_rows.items()
+                if k in old_rows and old_rows[k] != row
+            ],
+            "remove": [{key: k} for k in old_rows if k not in new_rows],
+        }
+        kept_in_order = [k for k in new_rows if k in old_rows] == [
+            k for k in old_rows if k in new_rows
+        ]
+        self._default_setting["rowData"] = new_data
+        full = len(json.dumps(new_data or [], default=str))
+        added_in_block = not added_at or added_at[-1] - added_at[0] < len(added_at)
+        if not kept_in_order or not added_in_block:
+            self.run_grid_method("setRowData", new_data or [])
+            sent = full
+        elif any(transaction.values()):
+            if added_at:
+                transaction["addIndex"] = added_at[0]
+            self.run_grid_method("applyTransaction", transaction)
+            sent = len(json.dumps(transaction, default=str))
+        else:
+            sent = 0
+        METRICS.inc("orderapp_grid_payload_bytes_total", sent, kind="sent")
+        METRICS.inc("orderapp_grid_payload_bytes_total", full - sent, kind="saved")
+        delta = {
+            "added": len(transaction["add"]),
+            "updated": len(transaction["update"]),
+            "removed": len(transaction["remove"]),
+            "bytes_sent": sent,
+            "bytes_full": full,
+        }
+        LOGGER.debug(f"Grid delta {delta}, {full - sent} bytes saved")
+        return delta
+
+    # Scoped apply_delta: rows replace the snapshot rows of keys in place,
+    ## keys without a row are removed and rows of new keys are appended
+    def patch_rows(self, keys: list, rows: list[dict] | None) -> dict:
+        by_key = {row[self.row_key]: row for row in rows or []}
+        new_data = []
+        for row in self._default_setting["rowData"] or []:
+            if row[self.row_key] not in keys:
+                new_data.append(row)
+            elif row[self.row_key] in by_key:
+                new_data.append(by_key.pop(row[self.row_key]))
+        new_data.extend(by_key.values())
+        return self.apply_delta(new_data)
+
+    @property
+    def row_data(self) -> list[dict] | None:
+        return self._default_setting.get("rowData")
+
+    # Replace or add rows without recreating the grid, so the filter set in the browser is kept
+    def replace_rows(self, new_data: list[dict] | None) -> None:
+        self._default_setting["rowData"] = new_data
+        self.run_grid_method("setRowData", new_data or [])
+
+    def append_rows(self, new_data: list[dict]) -> None:
+        self._default_setting["rowData"] = (
+            self._default_setting["rowData"] or []
+        ) + new_data
+        self.run_grid_method("applyTransaction", {"add": new_data})
+
 
 class SelectableAggrid(RefreshableAggrid):
     def __init__(
         self,
         schemas: list[FieldSchema],
-        data: list[dict],
-        select_cards: Callable[[int | bool], None] = None,
+        data: list[dict] | None,
+        select_cards: Callable[..., Awaitable[None] | None] = None,
+        datasource: GridDatasource | None = None,
+        row_key: str | None = None,
     ):
-        super().__init__(schemas, data)
+        super().__init__(schemas, data, datasource, row_key)
         self.select_cards = select_cards
         # Make the checkbox align to left, not sure why but justify center has the best result
         ui.add_css(".checkboxLeft .ag-cell-wrapper {justify-content: center;}")
@@ -117,14 +279,17 @@ class SelectableAggrid(RefreshableAggrid):
         self.run_grid_method("deselectAll")
 
     # Currently the select_cards takes in the select method in GridOfCards
+    # (or a coroutine loading the selected cards first, see purchase_page)
     # Beware of this coupling when changing in the future
     async def _get_selected_ids(self):
         rows: list[dict] = await self.get_selected_rows()
         if rows:
             selected_ids = [val for r in rows for key, val in r.items() if "id" in key]
-            self.select_cards(ids=selected_ids)
+            result = self.select_cards(ids=selected_ids)
         else:
-            self.select_cards(all=False)
+            result = self.select_cards(all=False)
+        if inspect.isawaitable(result):
+            await result
 
 
 class PreviousOrderGrid(SelectableAggrid):
@@ -132,13 +297,14 @@ class PreviousOrderGrid(SelectableAggrid):
         self,
         schemas: list[FieldSchema],
         data: list[dict],
-        get_selected_details: Callable[[list[int]], list[dict]] = None,
+        get_selected_details: Callable[[list[str]], Awaitable[list[dict]]] = None,
         create_select_cards: Callable[[list[int], list[dict]], None] = None,
+        fetch_by_date: Callable[[date | None, date | None], Awaitable[None]] = None,
     ):
-        super().__init__(schemas, data, None)
+        super().__init__(schemas, data, None, row_key="order_date")
         self.get_selected_details = get_selected_details
         self.create_select_cards = create_select_cards
-        self._ids_to_created: list[str] | None = None
+        self.fetch_by_date = fetch_by_date
 
     @override
     @ui.refreshable
@@ -147,6 +313,7 @@ class PreviousOrderGrid(SelectableAggrid):
         # Pop the previous on_selection_change in the parent class
         self._event_listeners.popitem()
         self.on("selectionChanged", lambda: self._create_selected_order_cards())
+        self.on("filterChanged", lambda: self._push_date_filter())
 
     @override
     async def _get_selected_ids(self):
@@ -154,6 +321,23 @@ class PreviousOrderGrid(SelectableAggrid):
             "Disabled. Select rows now instead call _create_selected_order_cards"
         )
 
+    # The order_date filter is pushed down to SQL through fetch_by_date,
+    # so only the filtered dates are sent to the browser (None, None when the filter is reset)
+    async def _push_date_filter(self):
+        def to_date(filter_date: str | None) -> date | None:
+            if not filter_date:
+                return None
+            return datetime.strptime(filter_date[:10], "%Y-%m-%d").date()
+
+        filter_model: dict | None = await self.run_grid_method("getFilterModel")
+        date_filter = filter_model.get("order_date") if filter_model else None
+        if date_filter:
+            await self.fetch_by_date(
+                to_date(date_filter.get("dateFrom")), to_date(date_filter.get("dateTo"))
+            )
+        else:
+            await self.fetch_by_date(None, None)
+
     async def _create_selected_order_cards(self):
         rows: list[dict] = await self.get_selected_rows()
         if rows:
@@ -164,18 +348,7 @@ class PreviousOrderGrid(SelectableAggrid):
                     id_list_strs.append(id_list)
                 else:
                     id_list_strs.extend(id_list.split(","))
-            self._ids_to_created = id_list_strs
-            details = self.get_selected_details(id_list_strs)
-            self.create_select_cards(details)
-        else:
-            self.create_select_cards(None)
-
-    def recreate_selected(self, deleted_id: str | None = None):
-        if self._ids_to_created:
-            id_list_strs = self._ids_to_created.copy()
-            if deleted_id:
-                id_list_strs.remove(deleted_id)
-            details = self.get_selected_details(id_list_strs)
+            details = await self.get_selected_details(id_list_strs)
             self.create_select_cards(details)
         else:
             self.create_select_cards(None)
@@ -7,3 +7,8 @@ DAYS_OPTIONS = {
     "星期六": 5,
     "星期日": 6,
 }
+
+# Server-side grids (RefreshableAggrid datasource) request GRID_BLOCK_SIZE rows at a time
+# and keep at most GRID_MAX_BLOCKS blocks in the browser
+GRID_BLOCK_SIZE = 100
+GRID_MAX_BLOCKS = 10
@@ -16,6 +16,11 @@ ORDERS_TEMPLATE: list[FieldSchema] = [
     FieldSchema(header_name="單位", field="uom_name"),
     FieldSchema(header_name="金額", field="price_total"),
 ]
+# Number of order dates loaded at a time in the previous orders overview
+PREVIOUS_ORDERS_PAGE_SIZE = 60
+# Purchase and recipe cards are created lazily, at most this many are kept per client
+LAZY_CARDS_MAX = 60
+
 PREVIOUS_ORDERS_OVERVIEW: list[FieldSchema] = [
     FieldSchema(header_name="日期", field="order_date"),
     FieldSchema(header_name="訂單", field="order_counts"),
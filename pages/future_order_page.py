@@ -1,29 +1,28 @@
-from mysql.connector import MySQLConnection
 from nicegui import ui
 
-from database import queries
+from database.AsyncDataAccessObjects import AsyncDao
+from database.ConnectionPool import ConnectionPool
 from database.DataAccessObjects import DaoFutureOrderPage
 
 from . import constants, page_setup
-from .components.Buttons import DropdownNavigate, VisibilityMenu
+from .components.Buttons import BulkActions, DropdownNavigate, VisibilityMenu
+from .components.ChangeFeed import follow_order_changes
 from .components.ConfirmDialogs import ConfirmDialog
 from .components.GridOfCards import FutureOrderCards
 from .components.InputDialogs import FutureOrderInputDialog
 from .components.UpdateDialogs import FutureOrderUpdateDialog
 
 
-def future_order_page(connection: MySQLConnection):
+def future_order_page(pool: ConnectionPool):
     page_setup.font_setup()
     page_setup.style_setup(dense_card=True, dynamic_scroll_padding=True)
 
-    def reinitialize():
+    # Order cards follow ORDER_CHANGES (own writes included), only the dialogs are reset here
+    async def reinitialize():
         # Reinitialize input dialogues
         input_dialog.refresh()
-        # Reinitialize order cards
-        new_orders = DAO_FUTURE_ORDER.fetch_future_orders()
-        future_order_cards.recreate(new_orders)
 
-    def commit_input():
+    async def commit_input():
         order_details = input_dialog.get_grid_values()
         o_basic = (
             input_dialog.get_summed_price(),
@@ -31,10 +30,10 @@ def future_order_page(connection: MySQLConnection):
             input_dialog.get_completion_datetime(),
             False,
         )
-        DAO_FUTURE_ORDER.insert_order_records(o_basic, order_details)
-        reinitialize()
+        await ASYNC_DAO_FUTURE_ORDER.insert_order_records(o_basic, order_details)
+        await reinitialize()
 
-    def commit_update(order_id: int):
+    async def commit_update(order_id: int):
         order_details = update_dialog.get_grid_values()
         old_o_basic = update_dialog.original_basic
         new_o_basic = (
@@ -42,30 +41,50 @@ def future_order_page(connection: MySQLConnection):
             update_dialog.get_note_value(),
             update_dialog.get_completion_datetime(),
         )
-        DAO_FUTURE_ORDER.update_order_basic(order_id, old_o_basic, new_o_basic)
-        DAO_FUTURE_ORDER.update_order_detail(
+        await ASYNC_DAO_FUTURE_ORDER.update_order_basic(
+            order_id, old_o_basic, new_o_basic
+        )
+        await ASYNC_DAO_FUTURE_ORDER.update_order_detail(
             order_id, update_dialog.original_detail, order_details
         )
-        reinitialize()
+        await reinitialize()
 
     # Order_details are to be deleted first, because the foreign key order_id in
     # orders table is referencing the order_details table
-    def commit_delete(order_id: int):
-        DAO_FUTURE_ORDER.commit_delete(order_id, "order_details")
-        DAO_FUTURE_ORDER.commit_delete(order_id, "orders")
-        reinitialize()
-
-    def handle_status_change(order_id: int, new_status: str):
-        DAO_FUTURE_ORDER.change_order_status(order_id, new_status)
-        DAO_FUTURE_ORDER.match_order_completion(order_id)
-        reinitialize()
-
-    def handle_paid_change(order_id: int, is_paid: bool):
-        DAO_FUTURE_ORDER.change_paid_status(order_id, is_paid)
-        reinitialize()
+    async def commit_delete(order_id: int):
+        await ASYNC_DAO_FUTURE_ORDER.commit_delete(order_id, "order_details")
+        await ASYNC_DAO_FUTURE_ORDER.commit_delete(order_id, "orders")
+        await reinitialize()
+
+    async def handle_status_change(order_id: int, new_status: str):
+        await ASYNC_DAO_FUTURE_ORDER.change_order_status(order_id, new_status)
+        await ASYNC_DAO_FUTURE_ORDER.match_order_completion(order_id)
+        await reinitialize()
+
+    async def handle_paid_change(order_id: int, is_paid: bool):
+        await ASYNC_DAO_FUTURE_ORDER.change_paid_status(order_id, is_paid)
+        await reinitialize()
+
+    # Checked orders are changed in one transaction, their cards follow ORDER_CHANGES once
+    async def handle_bulk_status(new_status: str):
+        order_ids = future_order_cards.checked_ids()
+        if not order_ids:
+            ui.notify("請先勾選訂單")
+            return
+        await ASYNC_DAO_FUTURE_ORDER.change_order_status_bulk(order_ids, new_status)
+        future_order_cards.clear_checked()
+
+    async def handle_bulk_paid(is_paid: bool):
+        order_ids = future_order_cards.checked_ids()
+        if not order_ids:
+            ui.notify("請先勾選訂單")
+            return
+        await ASYNC_DAO_FUTURE_ORDER.change_paid_status_bulk(order_ids, is_paid)
+        future_order_cards.clear_checked()
 
     # Fetch SQL data for today's order and construct input/display schema
-    DAO_FUTURE_ORDER = DaoFutureOrderPage(connection=connection)
+    DAO_FUTURE_ORDER = DaoFutureOrderPage(pool=pool)
+    ASYNC_DAO_FUTURE_ORDER = AsyncDao(DAO_FUTURE_ORDER)
     orders_data = DAO_FUTURE_ORDER.fetch_future_orders()
     input_template = [
         s
@@ -74,7 +93,7 @@ def future_order_page(connection: MySQLConnection):
         )
         if s.field in ["product_name", "quantity", "price_total"]
     ]
-    product_price_pairs = DAO_FUTURE_ORDER.query_data(queries.PRODUCT_PRICE)
+    product_price_pairs = DAO_FUTURE_ORDER.fetch_product_price_pairs()
 
     # Order input dialogs
     input_dialog = FutureOrderInputDialog(
@@ -100,9 +119,15 @@ def future_order_page(connection: MySQLConnection):
             with ui.button(icon="filter_list"):
                 ui.tooltip("顯示/隱藏訂單")
                 filter = VisibilityMenu(["準備中", "已完成", "已取消"])
-            with ui.button(icon="edit_note").classes("ml-auto") as show_modify:
+            with ui.button(icon="checklist").classes("ml-auto") as show_bulk:
+                ui.tooltip("批次修改訂單")
+            with ui.button(icon="edit_note") as show_modify:
                 ui.tooltip("顯示刪除/修改按鈕")
 
+        bulk_actions = BulkActions(
+            ["準備中", "已完成", "已取消"], handle_bulk_status, handle_bulk_paid
+        )
+
         future_order_cards = FutureOrderCards(
             constants.ORDERS_TEMPLATE,
             orders_data,
@@ -116,3 +141,10 @@ def future_order_page(connection: MySQLConnection):
         # Deferred binding filter.on_change
         filter.on_change = future_order_cards.update_status_visibility
         show_modify.on_click(future_order_cards.show_modify)
+        show_bulk.on_click(future_order_cards.show_bulk)
+        bulk_actions.bind_visibility_from(future_order_cards, "_bulk_visible")
+
+        # Apply the writes of every client, fetching only the changed order
+        follow_order_changes(
+            future_order_cards, ASYNC_DAO_FUTURE_ORDER.fetch_future_orders
+        )
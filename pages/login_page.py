@@ -2,16 +2,16 @@ from datetime import datetime
 from pathlib import Path
 
 from fastapi.responses import RedirectResponse
-from mysql.connector import MySQLConnection
 from nicegui import app, ui
 
 from auth.login import EXPIRATION_FORMAT, SESSION_LENGTH, verify_password
+from database.ConnectionPool import ConnectionPool
 from database.DataAccessObjects import DaoOrderapp
 
 from . import page_setup
 
 
-def login_page(connection: MySQLConnection) -> RedirectResponse | None:
+def login_page(pool: ConnectionPool) -> RedirectResponse | None:
     page_setup.font_setup()
     page_setup.style_setup()
 
@@ -19,7 +19,7 @@ def login_page(connection: MySQLConnection) -> RedirectResponse | None:
     ui.image(Path("pages", "static", "images", "logo_removeb.png")).classes(
         "max-h-screen max-w-screen-lg absolute-center"
     )
-    DAO = DaoOrderapp(connection)
+    DAO = DaoOrderapp(pool=pool)
 
     # local function to avoid passing username and password as arguments
     def try_login() -> None:
@@ -44,10 +44,7 @@ def login_page(connection: MySQLConnection) -> RedirectResponse | None:
 
     # Fetch user info
     users = {
-        row["user_name"]: row["hashed_password"]
-        for row in DAO.query_data(
-            "SELECT user_name, hashed_password FROM orderapp.users"
-        )
+        row["user_name"]: row["hashed_password"] for row in DAO.fetch_users() or []
     }
 
     with ui.card().classes("w-2/3 lg:1/2 absolute-center").style(
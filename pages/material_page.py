@@ -1,7 +1,10 @@
-from mysql.connector import MySQLConnection
+from functools import partial
+
 from nicegui import ui
 
 from database import queries
+from database.AsyncDataAccessObjects import AsyncDao
+from database.ConnectionPool import ConnectionPool
 from database.DataAccessObjects import DaoOrderapp
 
 from . import constants, page_setup
@@ -10,18 +13,27 @@ from .components.Notifications import NotifyAwaitInput
 from .components.UtilsAggrids import RefreshableAggrid
 
 
-def material_page(connection: MySQLConnection):
+def material_page(pool: ConnectionPool):
     page_setup.font_setup()
     page_setup.style_setup(responsive_ag=True)
 
-    # Fetch SQL data
-    DAO_MATERIAL = DaoOrderapp(connection=connection)
-    materials_data = DAO_MATERIAL.query_data(queries.MATERIALS)
+    # Materials are read by the grid in blocks (server-side), here only their existence is checked
+    DAO_MATERIAL = DaoOrderapp(pool=pool)
+    ASYNC_DAO_MATERIAL = AsyncDao(DAO_MATERIAL)
+    material_fields = [s.field for s in constants.MATERIALS_TEMPLATE]
+    fetch_material_block = partial(
+        ASYNC_DAO_MATERIAL.fetch_grid_block,
+        queries.MATERIALS,
+        material_fields,
+        "material_name",
+    )
 
     # Notification for null data
     # Check for overview data intitally and on reinitialize
     notify_null = NotifyAwaitInput("無原料紀錄，請至採購頁面新增資料")
-    notify_null.notify_if_null_data(materials_data)
+    notify_null.notify_if_null_data(
+        DAO_MATERIAL.query_data("SELECT material_id FROM orderapp.materials LIMIT 1")
+    )
 
     # ui.query(".nicegui-content").classes("h-screen")
     with ui.column().classes("w-full max-w-7xl h-full"):
@@ -32,4 +44,6 @@ def material_page(connection: MySQLConnection):
             to_recipes.classes("text-base md:text-lg").props("flat padding='none'")
             to_recipes.on_click(lambda: ui.navigate.to("/recipes"))
 
-        RefreshableAggrid(constants.MATERIALS_TEMPLATE, materials_data)
+        RefreshableAggrid(
+            constants.MATERIALS_TEMPLATE, None, datasource=fetch_material_block
+        )
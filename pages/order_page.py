@@ -1,57 +1,67 @@
-from mysql.connector import MySQLConnection
 from nicegui import ui
 
-from database import queries
+from database.AsyncDataAccessObjects import AsyncDao
+from database.ConnectionPool import ConnectionPool
 from database.DataAccessObjects import DaoOrderPage
 
 from . import constants, page_setup
-from .components.Buttons import DropdownNavigate, VisibilityMenu
+from .components.Buttons import BulkActions, DropdownNavigate, VisibilityMenu
+from .components.ChangeFeed import follow_order_changes
 from .components.ConfirmDialogs import ConfirmDialog
 from .components.GridOfCards import OrderCards
 from .components.InputDialogs import OrderInputDialog
 from .components.UpdateDialogs import OrderUpdateDialog
 
 
-def order_page(connection: MySQLConnection):
+def order_page(pool: ConnectionPool):
     page_setup.font_setup()
     page_setup.style_setup(dense_card=True, dynamic_scroll_padding=True)
 
-    def reinitialize():
+    # Callbacks await ASYNC_DAO_ORDER so queries run off the event loop
+    ## Order cards follow ORDER_CHANGES (own writes included), only the dialogs are reset here
+    async def reinitialize():
         # Reinitialize input dialogues
         input_dialog.refresh()
-        # Reinitialize order cards
-        new_orders = DAO_ORDER.fetch_today_orders()
-        order_cards.recreate(new_orders)
 
-    def commit_input():
+    async def commit_input():
         order_details = input_dialog.get_grid_values()
         o_basic = (input_dialog.get_summed_price(), input_dialog.get_note_value())
-        DAO_ORDER.insert_order_records(o_basic, order_details)
-        reinitialize()
+        await ASYNC_DAO_ORDER.insert_order_records(o_basic, order_details)
+        await reinitialize()
 
-    def commit_update(order_id: int):
+    async def commit_update(order_id: int):
         order_details = update_dialog.get_grid_values()
         old_o_basic = update_dialog.original_basic
         new_o_basic = (update_dialog.get_summed_price(), update_dialog.get_note_value())
-        DAO_ORDER.update_order_basic(order_id, old_o_basic, new_o_basic)
-        DAO_ORDER.update_order_detail(
+        await ASYNC_DAO_ORDER.update_order_basic(order_id, old_o_basic, new_o_basic)
+        await ASYNC_DAO_ORDER.update_order_detail(
             order_id, update_dialog.original_detail, order_details
         )
-        reinitialize()
+        await reinitialize()
 
     # Order_details are to be deleted first, because the foreign key order_id in
     # orders table is referencing the order_details table
-    def commit_delete(order_id: int):
-        DAO_ORDER.commit_delete(order_id, "order_details")
-        DAO_ORDER.commit_delete(order_id, "orders")
-        reinitialize()
-
-    def handle_status_change(order_id: int, new_status: str):
-        DAO_ORDER.change_order_status(order_id, new_status)
-        reinitialize()
+    async def commit_delete(order_id: int):
+        await ASYNC_DAO_ORDER.commit_delete(order_id, "order_details")
+        await ASYNC_DAO_ORDER.commit_delete(order_id, "orders")
+        await reinitialize()
+
+    async def handle_status_change(order_id: int, new_status: str):
+        await ASYNC_DAO_ORDER.change_order_status(order_id, new_status)
+        await reinitialize()
+
+    # Checked orders are changed in one transaction, their cards follow ORDER_CHANGES once
+    async def handle_bulk_status(new_status: str):
+        order_ids = order_cards.checked_ids()
+        if not order_ids:
+            ui.notify("請先勾選訂單")
+            return
+        await ASYNC_DAO_ORDER.change_order_status_bulk(order_ids, new_status)
+        order_cards.clear_checked()
 
     # Fetch SQL data for today's order and construct input/display schema
-    DAO_ORDER = DaoOrderPage(connection=connection)
+    DAO_ORDER = DaoOrderPage(pool=pool)
+    ASYNC_DAO_ORDER = AsyncDao(DAO_ORDER)
     orders_data = DAO_ORDER.fetch_today_orders()
     input_template = [
         s
@@ -60,7 +70,7 @@ def order_page(connection: MySQLConnection):
         )
         if s.field in ["product_name", "quantity", "price_total"]
     ]
-    product_price_pairs = DAO_ORDER.query_data(queries.PRODUCT_PRICE)
+    product_price_pairs = DAO_ORDER.fetch_product_price_pairs()
 
     # Order input dialogs
     input_dialog = OrderInputDialog(input_template, product_price_pairs, commit_input)
@@ -87,9 +97,13 @@ def order_page(connection: MySQLConnection):
             with ui.button(icon="filter_list"):
                 ui.tooltip("顯示/隱藏訂單")
                 filter = VisibilityMenu(["準備中", "已完成", "已取消"])
-            with ui.button(icon="edit_note").classes("ml-auto") as show_modify:
+            with ui.button(icon="checklist").classes("ml-auto") as show_bulk:
+                ui.tooltip("批次修改訂單")
+            with ui.button(icon="edit_note") as show_modify:
                 ui.tooltip("顯示刪除/修改按鈕")
 
+        bulk_actions = BulkActions(["準備中", "已完成", "已取消"], handle_bulk_status)
+
         order_cards = OrderCards(
             constants.ORDERS_TEMPLATE,
             orders_data,
@@ -102,6 +116,11 @@ def order_page(connection: MySQLConnection):
         # Deferred binding filter.on_change
         filter.on_change = order_cards.update_status_visibility
         show_modify.on_click(order_cards.show_modify)
+        show_bulk.on_click(order_cards.show_bulk)
+        bulk_actions.bind_visibility_from(order_cards, "_bulk_visible")
+
+        # Apply the writes of every client, fetching only the changed order
+        follow_order_changes(order_cards, ASYNC_DAO_ORDER.fetch_today_orders)
 
         # Order_page default to hide order_cards on complete
         filter.manual_switch("已完成", False)
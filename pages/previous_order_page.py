@@ -1,12 +1,13 @@
-from mysql.connector import MySQLConnection
+from datetime import date
+
 from nicegui import ui
 
-from database import queries
+from database.AsyncDataAccessObjects import AsyncDao
+from database.ConnectionPool import ConnectionPool
 from database.DataAccessObjects import DaoPreOrderPage
-from database.update_cost import store_update_startdate
 
 from . import constants, page_setup
-from .components.Buttons import DropdownNavigate, VisibilityMenu
+from .components.Buttons import BulkActions, DropdownNavigate, VisibilityMenu
 from .components.ConfirmDialogs import ConfirmDialog
 from .components.GridOfCards import PreviousOrderCards
 from .components.Notifications import NotifyAwaitInput
@@ -14,56 +15,134 @@ from .components.UpdateDialogs import OrderUpdateDialog
 from .components.UtilsAggrids import PreviousOrderGrid
 
 
-def previous_order_page(connection: MySQLConnection):
+def previous_order_page(pool: ConnectionPool):
     page_setup.font_setup()
     page_setup.style_setup(
         responsive_ag=True, dense_card=True, dynamic_scroll_padding=True
     )
 
-    def reinitialize(deleted_id: int | None = None):
-        new_previous_overview = DAO_PREORDER.fetch_previous_orders()
-        previous_order_grid.refresh(new_previous_overview)
-        notify_null.notify_if_null_data(new_previous_overview)
-        # Although refresh order_grid is unchecked all, still render the remained cards from delete as QoL
-        if deleted_id:
-            previous_order_grid.recreate_selected(str(deleted_id))
-        else:
-            previous_order_grid.recreate_selected()
-
-    def commit_update(order_id: int):
+    # Overview only holds the dates in overview_window
+    ## Starts with the latest page of dates, widened by load_older or replaced by the date filter
+    overview_window = {"start_date": None, "end_date": None}
+
+    async def fetch_overview() -> list[dict] | None:
+        if overview_window["start_date"] or overview_window["end_date"]:
+            return await ASYNC_DAO_PREORDER.fetch_previous_orders(**overview_window)
+        overview = await ASYNC_DAO_PREORDER.fetch_previous_orders(
+            limit=constants.PREVIOUS_ORDERS_PAGE_SIZE
+        )
+        overview_window["start_date"] = overview[-1]["order_date"] if overview else None
+        return overview
+
+    async def load_older():
+        if overview_window["end_date"]:
+            ui.notify("請先重置日期篩選")
+            return
+        older_overview = await ASYNC_DAO_PREORDER.fetch_previous_orders(
+            before_date=overview_window["start_date"],
+            limit=constants.PREVIOUS_ORDERS_PAGE_SIZE,
+        )
+        if not older_overview:
+            ui.notify("無更早的訂單紀錄")
+            return
+        overview_window["start_date"] = older_overview[-1]["order_date"]
+        previous_order_grid.append_rows(older_overview)
+
+    async def filter_by_date(start_date: date | None, end_date: date | None):
+        overview_window["start_date"] = start_date
+        overview_window["end_date"] = end_date
+        previous_order_grid.replace_rows(await fetch_overview())
+
+    # A write only rereads the overview row of the order's date (taken from its card),
+    ## the selection is kept by the grid delta and the card is patched on its own
+    def date_of(order_id: int) -> date:
+        return previous_order_cards.rows_of(order_id)[0]["order_timestamp"].date()
+
+    # One query for the span of the dates, only the rows of the dates are patched
+    async def refresh_dates(order_dates: list[date]):
+        span_overview = await ASYNC_DAO_PREORDER.fetch_previous_orders(
+            start_date=min(order_dates), end_date=max(order_dates)
+        )
+        date_overview = [
+            i for i in span_overview or [] if i["order_date"] in order_dates
+        ]
+        previous_order_grid.patch_rows(order_dates, date_overview)
+        notify_null.notify_if_null_data(previous_order_grid.row_data)
+
+    async def commit_update(order_id: int):
+        order_date = date_of(order_id)
         order_details = update_dialog.get_grid_values()
         old_o_basic = update_dialog.original_basic
         new_o_basic = (update_dialog.get_summed_price(), update_dialog.get_note_value())
-        DAO_PREORDER.update_order_basic(order_id, old_o_basic, new_o_basic)
-        DAO_PREORDER.update_order_detail(
+        await ASYNC_DAO_PREORDER.update_order_basic(order_id, old_o_basic, new_o_basic)
+        await ASYNC_DAO_PREORDER.update_order_detail(
             order_id, update_dialog.original_detail, order_details
         )
-        reinitialize()
+        await refresh_dates([order_date])
+        new_details = await ASYNC_DAO_PREORDER.fetch_previous_order_details([order_id])
+        previous_order_cards.apply_delta(order_id, new_details or [])
 
     # Order_details are to be deleted first, because the foreign key order_id in
     # orders table is referencing the order_details table
-    def commit_delete(order_id):
-        update_date = DAO_PREORDER.fetch_order_date(order_id)
-        store_update_startdate(update_date)
-
-        DAO_PREORDER.commit_delete(order_id, "order_details")
-        DAO_PREORDER.commit_delete(order_id, "orders")
-        reinitialize(deleted_id=order_id)
-
-    def handle_status_change(order_id: int, new_status: str):
-        update_date = DAO_PREORDER.fetch_order_date(order_id)
-        store_update_startdate(update_date)
-
-        DAO_PREORDER.change_order_status(order_id, new_status)
-        reinitialize()
-
-    def handle_paid_change(order_id: int, is_paid: bool):
-        DAO_PREORDER.change_paid_status(order_id, is_paid)
-        reinitialize()
+    ## The card is read again by id, so it is only removed once the order is really gone
+    async def commit_delete(order_id):
+        order_date = date_of(order_id)
+        await ASYNC_DAO_PREORDER.commit_delete(order_id, "order_details")
+        if not await ASYNC_DAO_PREORDER.commit_delete(order_id, "orders"):
+            ui.notify("訂單刪除失敗，請稍後再試", color="negative")
+        new_details = await ASYNC_DAO_PREORDER.fetch_previous_order_details([order_id])
+        previous_order_cards.apply_delta(order_id, new_details or [])
+        await refresh_dates([order_date])
+
+    # The new status (or paid) is patched into the card once it is saved,
+    ## only the date's counts are read, a failed write leaves the card as it was
+    async def handle_status_change(order_id: int, new_status: str):
+        if not await ASYNC_DAO_PREORDER.change_order_status(order_id, new_status):
+            ui.notify("訂單狀態更新失敗，請稍後再試", color="negative")
+            return
+        previous_order_cards.patch_order(order_id, order_status=new_status)
+        await refresh_dates([date_of(order_id)])
+
+    async def handle_paid_change(order_id: int, is_paid: bool):
+        if not await ASYNC_DAO_PREORDER.change_paid_status(order_id, is_paid):
+            ui.notify("付款狀態更新失敗，請稍後再試", color="negative")
+            return
+        previous_order_cards.patch_order(order_id, is_paid=is_paid)
+        await refresh_dates([date_of(order_id)])
+
+    # Checked orders are changed in one transaction, their cards are patched and their dates
+    ## reread once
+    async def handle_bulk_status(new_status: str):
+        order_ids = previous_order_cards.checked_ids()
+        if not order_ids:
+            ui.notify("請先勾選訂單")
+            return
+        if not await ASYNC_DAO_PREORDER.change_order_status_bulk(order_ids, new_status):
+            ui.notify("訂單狀態更新失敗，請稍後再試", color="negative")
+            return
+        previous_order_cards.patch_orders(order_ids, order_status=new_status)
+        previous_order_cards.clear_checked()
+        await refresh_dates(list({date_of(i) for i in order_ids}))
+
+    async def handle_bulk_paid(is_paid: bool):
+        order_ids = previous_order_cards.checked_ids()
+        if not order_ids:
+            ui.notify("請先勾選訂單")
+            return
+        if not await ASYNC_DAO_PREORDER.change_paid_status_bulk(order_ids, is_paid):
+            ui.notify("付款狀態更新失敗，請稍後再試", color="negative")
+            return
+        previous_order_cards.patch_orders(order_ids, is_paid=is_paid)
+        previous_order_cards.clear_checked()
 
     # Fetch SQL data
-    DAO_PREORDER = DaoPreOrderPage(connection=connection)
-    previous_orders_overview = DAO_PREORDER.fetch_previous_orders()
+    DAO_PREORDER = DaoPreOrderPage(pool=pool)
+    ASYNC_DAO_PREORDER = AsyncDao(DAO_PREORDER)
+    previous_orders_overview = DAO_PREORDER.fetch_previous_orders(
+        limit=constants.PREVIOUS_ORDERS_PAGE_SIZE
+    )
+    if previous_orders_overview:
+        overview_window["start_date"] = previous_orders_overview[-1]["order_date"]
     input_template = [
         s
         for s in DAO_PREORDER.get_value_options(
@@ -71,14 +150,14 @@ def previous_order_page(connection: MySQLConnection):
         )
         if s.field in ["product_name", "quantity", "price_total"]
     ]
-    product_price_pairs = DAO_PREORDER.query_data(queries.PRODUCT_PRICE)
+    product_price_pairs = DAO_PREORDER.fetch_product_price_pairs()
 
     update_dialog = OrderUpdateDialog(
         input_template, product_price_pairs, commit_update
     )
 
     # Notification for null data
-    # Check for overview data intitally and on delete
+    # Check for overview data intitally and after writes
     notify_null = NotifyAwaitInput("無過往訂單紀錄，請待未來訂單完成")
     notify_null.notify_if_null_data(previous_orders_overview)
 
@@ -93,7 +172,11 @@ def previous_order_page(connection: MySQLConnection):
             with ui.button(icon="filter_list"):
                 ui.tooltip("顯示/隱藏訂單")
                 filter = VisibilityMenu(["準備中", "已完成", "已取消"])
-            with ui.button(icon="settings").classes("ml-auto") as show_footer:
+            with ui.button(icon="history") as show_older:
+                ui.tooltip("載入更早訂單")
+            with ui.button(icon="checklist").classes("ml-auto") as show_bulk:
+                ui.tooltip("批次修改訂單")
+            with ui.button(icon="settings") as show_footer:
                 ui.tooltip("顯示訂單狀態列")
             with ui.button(icon="edit_note") as show_modify:
                 ui.tooltip("顯示刪除/修改按鈕")
@@ -102,6 +185,10 @@ def previous_order_page(connection: MySQLConnection):
             constants.PREVIOUS_ORDERS_OVERVIEW, previous_orders_overview
         )
 
+        bulk_actions = BulkActions(
+            ["準備中", "已完成", "已取消"], handle_bulk_status, handle_bulk_paid
+        )
+
         previous_order_cards = PreviousOrderCards(
             constants.PREVIOUS_ORDERS_DETAIL,
             None,
@@ -115,9 +202,13 @@ def previous_order_page(connection: MySQLConnection):
         # Deferred bindings
         filter.on_change = previous_order_cards.update_status_visibility
         unselect.on_click(previous_order_grid.uncheck_all)
+        show_older.on_click(load_older)
         show_footer.on_click(previous_order_cards.show_footer)
         show_modify.on_click(previous_order_cards.show_modify)
+        show_bulk.on_click(previous_order_cards.show_bulk)
+        bulk_actions.bind_visibility_from(previous_order_cards, "_bulk_visible")
         previous_order_grid.get_selected_details = (
-            DAO_PREORDER.fetch_previous_order_details
+            ASYNC_DAO_PREORDER.fetch_previous_order_details
         )
         previous_order_grid.create_select_cards = previous_order_cards.create_on_select
+        previous_order_grid.fetch_by_date = filter_by_date
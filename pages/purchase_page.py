@@ -1,8 +1,11 @@
-from mysql.connector import MySQLConnection
+from functools import partial
+
 from nicegui import ui
 
+from database import queries
+from database.AsyncDataAccessObjects import AsyncDao
+from database.ConnectionPool import ConnectionPool
 from database.DataAccessObjects import DaoPurchasePage
-from database.update_cost import store_update_startdate, update_costs
 
 from . import constants, page_setup
 from .components.Buttons import DropdownNavigate
@@ -14,73 +17,105 @@ from .components.UpdateDialogs import PurchaseUpdateDialog
 from .components.UtilsAggrids import SelectableAggrid
 
 
-def purchase_page(connection: MySQLConnection):
+def purchase_page(pool: ConnectionPool):
     page_setup.font_setup()
     page_setup.style_setup(
         responsive_ag=True, dense_card=True, dynamic_scroll_padding=True
     )
-    DAO_PURCHASE = DaoPurchasePage(connection=connection)
+    DAO_PURCHASE = DaoPurchasePage(pool=pool)
+    ASYNC_DAO_PURCHASE = AsyncDao(DAO_PURCHASE)
 
-    def reinitialize():
+    # Only the written purchase is read again (its card, if loaded), the grid rereads its loaded blocks
+    ## A deleted purchase reads no details, a failed read leaves the card as it was
+    async def reinitialize(purchase_id: int | None):
         # Reinitialize input dialogues
         input_dialog.refresh()
-        # Reinitialize aggrid and cards
-        new_overview_data, new_details_data = DAO_PURCHASE.fetch_purchase_data()
-        notify_null.notify_if_null_data(new_overview_data)
-        purchase_records.refresh(new_overview_data)
-        purchase_cards.recreate(new_details_data)
+        if purchase_id is None:
+            return
+        if purchase_cards.rows_of(purchase_id):
+            new_details = await ASYNC_DAO_PURCHASE.fetch_purchase_details([purchase_id])
+            if new_details is not None:
+                purchase_cards.apply_delta(purchase_id, new_details)
+        purchase_records.refresh_blocks()
+        notify_null.notify_if_null_data(
+            await ASYNC_DAO_PURCHASE.query_data(queries.PURCHASE_EXISTS)
+        )
+
+    # Details are read for the selected purchases only, the cards keep no others
+    ## A selection overtaken by a newer one while reading is dropped
+    selection = {"latest": 0}
+
+    async def select_purchases(ids: list[int] | None = None, all: bool = False):
+        selection["latest"] += 1
+        current = selection["latest"]
+        if not ids:
+            purchase_cards.select(all=False)
+            return
+        kept = [i for i in purchase_cards.data or [] if i["purchase_id"] in ids]
+        missing = [i for i in ids if not purchase_cards.rows_of(i)]
+        new_details = None
+        if missing:
+            new_details = await ASYNC_DAO_PURCHASE.fetch_purchase_details(missing)
+        if current != selection["latest"]:
+            return
+        purchase_cards.recreate(kept + (new_details or []))
+        purchase_cards.select(ids=ids)
 
     # Commit inserting purchase records into database
-    def commit_input():
+    async def commit_input():
         purchase_basic, purchase_details = input_dialog.get_grid_values()
-        store_update_startdate(purchase_basic[0]["purchase_date"])
 
         input_vendors = [i["vendor_name"] for i in purchase_basic]
         input_materials = [i["material_name"] for i in purchase_details]
-        DAO_PURCHASE.insert_new_names("vendor_name", input_vendors)
-        DAO_PURCHASE.insert_new_names("material_name", input_materials)
+        await ASYNC_DAO_PURCHASE.insert_new_names("vendor_name", input_vendors)
+        await ASYNC_DAO_PURCHASE.insert_new_names("material_name", input_materials)
         p_bascic = (
             purchase_basic[0]["purchase_date"],
             purchase_basic[0]["vendor_name"],
         )
-        DAO_PURCHASE.insert_purchase_records(p_bascic, purchase_details)
-        update_costs(DAO_PURCHASE)
-        reinitialize()
+        purchase_id = await ASYNC_DAO_PURCHASE.insert_purchase_records(
+            p_bascic, purchase_details
+        )
+        await reinitialize(purchase_id)
 
     # Commit updating purchase details
-    def commit_update(purchase_id: int):
+    async def commit_update(purchase_id: int):
         # Purchase basic (_) is diabled, no need to update
         _, update_detail = update_dialog.get_grid_values()
         update_materials = [i["material_name"] for i in update_detail]
-        DAO_PURCHASE.insert_new_names("material_name", update_materials)
-        DAO_PURCHASE.update_purchase_records(
+        await ASYNC_DAO_PURCHASE.insert_new_names("material_name", update_materials)
+        await ASYNC_DAO_PURCHASE.update_purchase_records(
             purchase_id, update_dialog.original_detail, update_detail
         )
-        update_costs(DAO_PURCHASE)
-        reinitialize()
+        await reinitialize(purchase_id)
 
     # Purchase_details are to be deleted first, because the foreign key order_id in
     # orders table is referencing the order_details table
-    def commit_delete(purchase_id: int):
-        update_date = DAO_PURCHASE.fetch_purchase_date(purchase_id)
-        store_update_startdate(update_date)
-
-        material_ids = DAO_PURCHASE.query_data(
+    async def commit_delete(purchase_id: int):
+        material_ids = await ASYNC_DAO_PURCHASE.query_data(
             "SELECT material_id from orderapp.purchase_details WHERE purchase_id = %s",
             (purchase_id,),
         )
         material_ids = [i["material_id"] for i in material_ids]
 
-        DAO_PURCHASE.commit_delete(purchase_id, "purchase_details")
-        DAO_PURCHASE.commit_delete(purchase_id, "purchases")
-
-        # Will check for existence and clean up none-referecing uom_id AFTER product deletions
-        DAO_PURCHASE.clean_up_materials(material_ids)
-        update_costs(DAO_PURCHASE)
-        reinitialize()
+        await ASYNC_DAO_PURCHASE.commit_delete(purchase_id, "purchase_details")
+        if await ASYNC_DAO_PURCHASE.commit_delete(purchase_id, "purchases"):
+            # Will check for existence and clean up none-referecing uom_id AFTER product deletions
+            await ASYNC_DAO_PURCHASE.clean_up_materials(material_ids)
+        else:
+            ui.notify("採購刪除失敗，請稍後再試", color="negative")
+        await reinitialize(purchase_id)
 
     # Fetch SQL data and construct input/display schema
-    purchases_overview, purchase_details_data = DAO_PURCHASE.fetch_purchase_data()
+    ## The overview grid reads PURCHASES_OVERVIEW in blocks (server-side), newest purchase first
+    ## and the cards read the details of the selected purchases (select_purchases)
+    fetch_purchase_block = partial(
+        ASYNC_DAO_PURCHASE.fetch_grid_block,
+        queries.PURCHASES_OVERVIEW,
+        [s.field for s in constants.PURCHASES_OVERVIEW_TEMPLATE],
+        "purchase_id",
+        default_sort=[{"colId": "purchase_date", "sort": "desc"}],
+    )
     purchase_basic = [
         s
         for s in DAO_PURCHASE.get_value_options(
@@ -97,7 +132,7 @@ def purchase_page(connection: MySQLConnection):
     # Notification for null data
     # Check for overview data intitally and on reinitialize
     notify_null = NotifyAwaitInput("請點擊「新增採購資料」輸入首筆資料")
-    notify_null.notify_if_null_data(purchases_overview)
+    notify_null.notify_if_null_data(DAO_PURCHASE.query_data(queries.PURCHASE_EXISTS))
 
     # Dialog for inputting new purchase records to be inserted
     input_dialog = PurchaseInputDialog(purchase_basic, purchase_details, commit_input)
@@ -129,20 +164,24 @@ def purchase_page(connection: MySQLConnection):
 
         # Display purchase records overview
         purchase_records = SelectableAggrid(
-            constants.PURCHASES_OVERVIEW_TEMPLATE, purchases_overview
+            constants.PURCHASES_OVERVIEW_TEMPLATE,
+            None,
+            datasource=fetch_purchase_block,
         )
 
         # Display selected (if not selected = all) purchase details
         purchase_cards = PurchaseCards(
             constants.PURCHASE_DETAILS_TEMPLATE,
-            purchase_details_data,
+            None,
             "purchase",
             update_dialog.start_update,
             confirm_delete.start,
+            lazy=True,
+            max_cards=constants.LAZY_CARDS_MAX,
         )
         purchase_cards.select(all=False)
 
         # Deferred binding
         unselect.on_click(purchase_records.uncheck_all)
         show_modify.on_click(purchase_cards.show_modify)
-        purchase_records.select_cards = purchase_cards.select
+        purchase_records.select_cards = select_purchases
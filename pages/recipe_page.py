@@ -1,9 +1,8 @@
-from mysql.connector import MySQLConnection
 from nicegui import ui
 
-from database import queries
+from database.AsyncDataAccessObjects import AsyncDao
+from database.ConnectionPool import ConnectionPool
 from database.DataAccessObjects import DaoRecipePage
-from database.update_cost import update_costs
 
 from . import constants, page_setup
 from .components.Buttons import DropdownNavigate
@@ -15,95 +14,76 @@ from .components.UpdateDialogs import RecipeUpdateDialog
 from .components.UtilsAggrids import SelectableAggrid
 
 
-def recipe_page(connection: MySQLConnection):
+def recipe_page(pool: ConnectionPool):
     page_setup.font_setup()
     page_setup.style_setup(
         responsive_ag=True, dense_card=True, dynamic_scroll_padding=True
     )
-    DAO_RECIPE = DaoRecipePage(connection=connection)
+    DAO_RECIPE = DaoRecipePage(pool=pool)
+    ASYNC_DAO_RECIPE = AsyncDao(DAO_RECIPE)
 
-    def reinitialize():
+    # Only the written product is read again (PRODUCT_OVERVIEW and RECIPES by product_id),
+    ## then patched into its grid row and its card (a deleted product reads no rows)
+    async def reinitialize(product_id: int | None):
         # Reinitialize input dialog
         input_dialog.refresh()
-        existed_products = [
-            i["product_name"]
-            for i in DAO_RECIPE.query_data(queries.existed["product_name"])
-        ]
-        input_dialog.existed_products = existed_products
+        input_dialog.existed_products = await ASYNC_DAO_RECIPE.get_existed_names(
+            "product_name"
+        )
         update_dialog.refresh()
-        # Reinitialize aggrid and cards
-        new_product_overview, new_recipes_data = DAO_RECIPE.fetch_recipe_data()
-        notify_null.notify_if_null_data(new_product_overview)
-        overview_grid.refresh(new_product_overview)
-        recipe_cards.recreate(new_recipes_data)
+        if product_id is None:
+            return
+        new_product_overview, new_recipes_data = (
+            await ASYNC_DAO_RECIPE.fetch_recipe_data([product_id])
+        )
+        overview_grid.patch_rows([product_id], new_product_overview)
+        recipe_cards.apply_delta(product_id, new_recipes_data or [])
+        notify_null.notify_if_null_data(overview_grid.row_data)
 
-    def commit_input():
+    async def commit_input():
         product_basic, recipe_details = input_dialog.get_grid_values()
         input_uoms = [i["uom_name"] for i in product_basic]
         input_materials = [i["material_name"] for i in recipe_details]
 
         # Insert new uom and product basics
-        DAO_RECIPE.insert_new_names("uom_name", input_uoms)
-        DAO_RECIPE.insert_new_names("material_name", input_materials)
+        await ASYNC_DAO_RECIPE.insert_new_names("uom_name", input_uoms)
+        await ASYNC_DAO_RECIPE.insert_new_names("material_name", input_materials)
         # Insert product first so product_id can be reference by recipe
 
-        DAO_RECIPE.insert_product_records(product_basic[0])
+        product_id = await ASYNC_DAO_RECIPE.insert_product_records(product_basic[0])
         # Insert recipe details
-        DAO_RECIPE.insert_recipe_records(
+        await ASYNC_DAO_RECIPE.insert_recipe_records(
             product_basic[0]["product_name"], recipe_details
         )
-        update_costs(DAO_RECIPE)
-        reinitialize()
+        await reinitialize(product_id)
 
-    def commit_update(product_id: int):
+    async def commit_update(product_id: int):
         update_basic, update_detail = update_dialog.get_grid_values()
         update_uoms = [i["uom_name"] for i in update_basic]
         update_materials = [i["material_name"] for i in update_detail]
 
         # Insert new uom and product basics
 
-        DAO_RECIPE.insert_new_names("uom_name", update_uoms)
-        DAO_RECIPE.insert_new_names("material_name", update_materials)
+        await ASYNC_DAO_RECIPE.insert_new_names("uom_name", update_uoms)
+        await ASYNC_DAO_RECIPE.insert_new_names("material_name", update_materials)
         # Insert product first so product_id can be reference by recipe
-        DAO_RECIPE.update_product_records(
+        await ASYNC_DAO_RECIPE.update_product_records(
             product_id, update_dialog.original_basic, update_basic[0]
         )
         # Insert recipe details
-        DAO_RECIPE.update_recipe_records(
+        await ASYNC_DAO_RECIPE.update_recipe_records(
             product_id, update_dialog.original_detail, update_detail
         )
-        update_costs(DAO_RECIPE)
-        reinitialize()
-
-    # Recipes are to be deleted first, because the foreign key product_id in
-    # products table is referencing the recipes table
-    ### Product_id is also refercne by order_details! Be careful of this delete
-    def commit_delete(product_id: int):
-        uom_id = DAO_RECIPE.query_data(
-            "SELECT uom_id from orderapp.products where product_id = %s", (product_id,)
-        )[0]["uom_id"]
-        material_ids = DAO_RECIPE.query_data(
-            "SELECT material_id from orderapp.recipes WHERE product_id = %s",
-            (product_id,),
-        )
-        material_ids = [i["material_id"] for i in material_ids]
-
-        DAO_RECIPE.commit_delete(product_id, "recipes")
-        DAO_RECIPE.commit_delete(product_id, "product_prices")
-        DAO_RECIPE.commit_delete(product_id, "product_costs")
-        DAO_RECIPE.commit_delete(product_id, "products")
-        # Will check for existence and clean up none-referecing uom_id AFTER product deletions
-        DAO_RECIPE.clean_up_uom(uom_id)
-        DAO_RECIPE.clean_up_materials(material_ids)
-        update_costs(DAO_RECIPE)
-        reinitialize()
+        await reinitialize(product_id)
+
+    async def commit_delete(product_id: int):
+        if not await ASYNC_DAO_RECIPE.delete_product(product_id):
+            ui.notify("產品刪除失敗，請稍後再試", color="negative")
+        await reinitialize(product_id)
 
     # Fetch SQL data and construct input/display schema
     product_overview, recipes_data = DAO_RECIPE.fetch_recipe_data()
-    existed_products = DAO_RECIPE.query_data(queries.existed["product_name"])
-    existed_products = (
-        [i["product_name"] for i in existed_products] if existed_products else []
-    )
+    existed_products = DAO_RECIPE.get_existed_names("product_name")
     product_template = [
         s
         for s in DAO_RECIPE.get_value_options(constants.PRODUCTS_TEMPLATE, ["uom_name"])
@@ -155,7 +135,7 @@ def recipe_page(connection: MySQLConnection):
 
         # Display products overview
         overview_grid = SelectableAggrid(
-            constants.PRODUCTS_OVERVIEW_TEMPLATE, product_overview
+            constants.PRODUCTS_OVERVIEW_TEMPLATE, product_overview, row_key="product_id"
         )
         # Display selected (if not selected = all) recipes of products
         recipe_cards = RecipeCards(
@@ -164,6 +144,8 @@ def recipe_page(connection: MySQLConnection):
             "product",
             on_update=update_dialog.start_update,
             on_delete=confirm_delete.start,
+            lazy=True,
+            max_cards=constants.LAZY_CARDS_MAX,
         )
         recipe_cards.select(all=False)
 
@@ -1,8 +1,9 @@
 from copy import deepcopy
 
-from mysql.connector import MySQLConnection
 from nicegui import ui
 
+from database.AsyncDataAccessObjects import AsyncDao
+from database.ConnectionPool import ConnectionPool
 from database.DataAccessObjects import DaoVendorPage
 
 from . import constants, page_setup
@@ -26,7 +27,7 @@ def format_vendor_overview(vendor_data: list[dict]) -> list[dict]:
     return formatted
 
 
-def vendor_page(connection: MySQLConnection):
+def vendor_page(pool: ConnectionPool):
     page_setup.font_setup()
     page_setup.style_setup(
         responsive_ag=True,
@@ -34,37 +35,43 @@ def vendor_page(connection: MySQLConnection):
         dynamic_scroll_padding=True,
         dense_select=True,
     )
-    DAO_VENDORS = DaoVendorPage(connection=connection)
+    DAO_VENDORS = DaoVendorPage(pool=pool)
+    ASYNC_DAO_VENDORS = AsyncDao(DAO_VENDORS)
 
-    def reinitialize():
+    # Only the written vendor is read again, then patched into the grid row and its card
+    ## A deleted vendor reads no row, so its row and card are removed
+    async def reinitialize(vendor_id: int | None):
         # Reinitialize input dialogues
         input_dialog.refresh()
-        # Reinitialize aggrid and cards
-        new_vendor_data = DAO_VENDORS.fetch_vendor_data()
-        notify_null.notify_if_null_data(new_vendor_data)
-
-        new_vendor_overview = format_vendor_overview(new_vendor_data)
-        vendor_records.refresh(new_vendor_overview)
-        vendor_cards.recreate(new_vendor_data)
+        if vendor_id is None:
+            return
+        new_vendor_data = await ASYNC_DAO_VENDORS.fetch_vendor_data([vendor_id])
+        vendor_records.patch_rows([vendor_id], format_vendor_overview(new_vendor_data))
+        vendor_cards.apply_delta(vendor_id, new_vendor_data)
+        notify_null.notify_if_null_data(vendor_cards.data)
 
     # Commit inserting purchase records into database
-    def commit_input():
+    async def commit_input():
         vendor_details = input_dialog.get_grid_values()[0]
-        DAO_VENDORS.insert_vendor_records(vendor_details)
-        reinitialize()
+        vendor_name = vendor_details["vendor_name"]
+        await ASYNC_DAO_VENDORS.insert_vendor_records(vendor_details)
+        await reinitialize(
+            await ASYNC_DAO_VENDORS.get_id_by_name("vendor_name", vendor_name)
+        )
 
     # Commit updating purchase details
-    def commit_update(vendor_id: int):
+    async def commit_update(vendor_id: int):
         # Purchase basic (_) is diabled, no need to update
         update_detail = update_dialog.get_grid_values()[0]
-        DAO_VENDORS.update_vendor_records(
+        await ASYNC_DAO_VENDORS.update_vendor_records(
             vendor_id, update_dialog.original_detail, update_detail
         )
-        reinitialize()
+        await reinitialize(vendor_id)
 
-    def commit_delete(vendor_id: int):
-        DAO_VENDORS.commit_delete(vendor_id, "vendors")
-        reinitialize()
+    async def commit_delete(vendor_id: int):
+        if not await ASYNC_DAO_VENDORS.commit_delete(vendor_id, "vendors"):
+            ui.notify("廠商刪除失敗，請稍後再試", color="negative")
+        await reinitialize(vendor_id)
 
     # Fetch SQL data
     vendor_data = DAO_VENDORS.fetch_vendor_data()
@@ -106,7 +113,9 @@ def vendor_page(connection: MySQLConnection):
 
         # Display vendor_records overview
         vendor_overview = format_vendor_overview(vendor_data)
-        vendor_records = SelectableAggrid(constants.VENDORS_OVERVIEW, vendor_overview)
+        vendor_records = SelectableAggrid(
+            constants.VENDORS_OVERVIEW, vendor_overview, row_key="vendor_id"
+        )
 
         # Display selected vendor details
         vendor_cards = VendorCards(
@@ -0,0 +1,5 @@
+# The cost tests never connect to MySQL, database.config only needs the connection settings to exist
+import os
+
+for key in ("MYSQL_HOST", "MYSQL_USER", "MYSQL_PASSWORD", "MYSQL_DATABASE"):
+    os.environ.setdefault(key, "test")
@@ -0,0 +1,165 @@
+# Hand-made purchases, orders and recipes for the cost engine tests, an in-memory DAO answering
+# the CostLedger queries from them, and a day-by-day reference of the UPDATE_MATERIAL_COST rules
+from datetime import date, datetime, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+
+from benchmarks.cost_engines import InMemoryDao
+from database.CostLedger import CENT, COST_UNIT
+
+FIRST_DAY = date(2024, 3, 1)
+TODAY = date(2024, 3, 20)
+COMPLETED = "已完成"
+CANCELED = "已取消"
+# 1: flour, 2: sugar, 3: butter
+MATERIAL_IDS = [1, 2, 3]
+RECIPE_CHANGE = datetime(2024, 3, 8, 12)
+
+PURCHASES = [
+    {"material_id": m, "purchase_date": d, "quantity": Decimal(q), "price_total": p}
+    for m, d, q, p in (
+        # Several purchases of flour on one day
+        (1, date(2024, 3, 3), "100", 250),
+        (1, date(2024, 3, 3), "50", 140),
+        (1, date(2024, 3, 12), "70", 200),
+        (2, date(2024, 3, 1), "30.5", 90),
+        (2, date(2024, 3, 15), "40", 101),
+        # Butter is first bought after orders using it, its stock then runs out on 3/9
+        (3, date(2024, 3, 6), "12", 60),
+        (3, date(2024, 3, 10), "10", 55),
+    )
+]
+
+# Product 10 uses 2.5 flour until RECIPE_CHANGE, then 3 flour, product 11 uses butter and sugar
+RECIPES = [
+    {
+        "product_id": p,
+        "material_id": m,
+        "quantity": Decimal(q),
+        "start_timestamp": start,
+        "end_timestamp": end,
+    }
+    for p, m, q, start, end in (
+        (10, 1, "2.5", datetime(1970, 1, 2), RECIPE_CHANGE),
+        (10, 1, "3", RECIPE_CHANGE, None),
+        (10, 2, "1", datetime(1970, 1, 2), None),
+        (11, 3, "0.75", datetime(1970, 1, 2), None),
+        (11, 2, "0.5", datetime(1970, 1, 2), None),
+    )
+]
+
+# (order_timestamp, order_status, [(product_id, quantity)])
+ORDERS = [
+    # Before the first purchase of flour and of butter
+    (datetime(2024, 3, 2, 10), COMPLETED, [(10, Decimal("1")), (11, Decimal("4"))]),
+    (datetime(2024, 3, 4, 9), COMPLETED, [(11, Decimal("4"))]),
+    (datetime(2024, 3, 4, 15), COMPLETED, [(10, Decimal("2"))]),
+    (datetime(2024, 3, 5, 11), COMPLETED, [(10, Decimal("3"))]),
+    # Same day on both sides of the recipe change, and the order emptying the butter
+    (datetime(2024, 3, 8, 11), COMPLETED, [(10, Decimal("2")), (11, Decimal("8"))]),
+    (datetime(2024, 3, 8, 13), COMPLETED, [(10, Decimal("2"))]),
+    (datetime(2024, 3, 9, 10), CANCELED, [(10, Decimal("5"))]),
+    (datetime(2024, 3, 12, 16), COMPLETED, [(10, Decimal("4")), (11, Decimal("2"))]),
+    (datetime(2024, 3, 19, 9), COMPLETED, [(10, Decimal("1.5"))]),
+    # Orders of today are not used yet
+    (datetime(2024, 3, 20, 9), COMPLETED, [(10, Decimal("10"))]),
+]
+
+
+def recipe_at(product_id: int, material_id: int, timestamp: datetime) -> Decimal | None:
+    for r in RECIPES:
+        if (
+            r["product_id"] == product_id
+            and r["material_id"] == material_id
+            and timestamp >= r["start_timestamp"]
+            and (r["end_timestamp"] is None or timestamp < r["end_timestamp"])
+        ):
+            return r["quantity"]
+    return None
+
+
+def usage_lines(material_id: int, before: date):
+    # (order_date, used quantity) of completed orders before a date
+    for timestamp, status, details in ORDERS:
+        if status != COMPLETED or timestamp.date() >= before:
+            continue
+        for product_id, quantity in details:
+            recipe_quantity = recipe_at(product_id, material_id, timestamp)
+            if recipe_quantity is not None:
+                yield timestamp.date(), quantity * recipe_quantity
+
+
+def numpy_inputs(today: date = TODAY):
+    # The rows numpy_rebuild_costs loads (NUMPY_PURCHASES, NUMPY_ORDER_DETAILS, NUMPY_RECIPES)
+    purchases = [i for i in PURCHASES if i["purchase_date"] <= today]
+    order_details = [
+        {"product_id": p, "order_timestamp": timestamp, "quantity": q}
+        for timestamp, status, details in ORDERS
+        if status == COMPLETED and timestamp.date() < today
+        for p, q in details
+    ]
+    return purchases, order_details, RECIPES
+
+
+# The benchmark's in-memory DAO over the fixture rows, with the stored material_costs rows
+def fixture_dao(material_costs: list[dict] | None = None) -> InMemoryDao:
+    return InMemoryDao(*numpy_inputs(), material_costs)
+
+
+def ledger_rows(operations: list[tuple]) -> list[tuple]:
+    rows = []
+    for query, params in operations:
+        if query.lstrip().startswith("INSERT"):
+            rows += [tuple(params[i : i + 5]) for i in range(0, len(params), 5)]
+    return rows
+
+
+# One run of UPDATE_MATERIAL_COST per day, each aggregating the whole history again:
+## - every purchase up to the day, no row before the first one
+## - completed orders before the day, through the recipe that existed at o.order_timestamp,
+##   costed with the latest cost before the order date, else the earliest cost, else left out
+## - a row only when the stored values differ from the latest row
+## Values are compared as stored (DECIMAL(10, 2) and DECIMAL(10, 5)), and an empty stock
+## gets no row (its cost_per_unit would be NULL, which material_costs does not allow)
+def day_by_day_costs(
+    first_day: date = FIRST_DAY, today: date = TODAY, stored: dict | None = None
+) -> dict[tuple[int, date], tuple]:
+    stored = dict(stored or {})
+    target_date = first_day
+    while target_date <= today:
+        for m in MATERIAL_IDS:
+            purchased = [
+                i
+                for i in PURCHASES
+                if i["material_id"] == m and i["purchase_date"] <= target_date
+            ]
+            if not purchased:
+                continue
+            quantity = sum(i["quantity"] for i in purchased)
+            cost = sum(Decimal(i["price_total"]) for i in purchased)
+            costs = sorted((d, row[2]) for (mm, d), row in stored.items() if mm == m)
+            for order_date, used in usage_lines(m, target_date):
+                earlier = [c for d, c in costs if d < order_date]
+                if earlier:
+                    cost_per_unit = earlier[-1]
+                elif costs:
+                    cost_per_unit = costs[0][1]
+                else:
+                    continue
+                quantity -= used
+                cost -= used * cost_per_unit
+            if quantity == 0:
+                continue
+            row = (
+                quantity.quantize(CENT, ROUND_HALF_UP),
+                cost.quantize(CENT, ROUND_HALF_UP),
+                (cost / quantity).quantize(COST_UNIT, ROUND_HALF_UP),
+            )
+            latest = [
+                v
+                for (mm, d), v in sorted(stored.items())
+                if mm == m and d <= target_date
+            ]
+            if not latest or latest[-1] != row:
+                stored[(m, target_date)] = row
+        target_date += timedelta(days=1)
+    return stored
@@ -0,0 +1,11 @@
+from cost_fixture import TODAY, day_by_day_costs, numpy_inputs
+
+from database.update_cost import compute_costs_numpy
+
+
+# The NumPy engine works in scaled integers, so it must agree to the last digit
+def test_numpy_engine_matches_day_by_day_update():
+    expected = [
+        (m, d, *values) for (m, d), values in sorted(day_by_day_costs().items())
+    ]
+    assert compute_costs_numpy(*numpy_inputs(), TODAY) == expected
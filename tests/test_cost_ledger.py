@@ -0,0 +1,98 @@
+from datetime import date, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+
+from cost_fixture import (
+    FIRST_DAY,
+    MATERIAL_IDS,
+    TODAY,
+    day_by_day_costs,
+    fixture_dao,
+    ledger_rows,
+    usage_lines,
+)
+
+from database.CostLedger import CENT, CostLedger
+
+
+def as_rows(stored: dict) -> list[tuple]:
+    return [(m, d, *values) for (m, d), values in sorted(stored.items())]
+
+
+# The stored rows as LEDGER_MATERIAL_COSTS returns them
+def as_material_costs(stored: dict) -> list[dict]:
+    return [
+        {
+            "material_id": m,
+            "cost_date": d,
+            "stocked_quantity": q,
+            "stocked_cost": c,
+            "cost_per_unit": cpu,
+        }
+        for (m, d), (q, c, cpu) in stored.items()
+    ]
+
+
+def test_backfill_matches_day_by_day_update():
+    expected = as_rows(day_by_day_costs())
+    operations = CostLedger(fixture_dao(), TODAY).roll_forward(
+        {m: FIRST_DAY for m in MATERIAL_IDS}
+    )
+    assert sorted(ledger_rows(operations)) == expected
+
+
+def stock_on(stored: dict, material_id: int, on: date) -> Decimal:
+    rows = [(d, v[0]) for (m, d), v in stored.items() if m == material_id and d <= on]
+    return max(rows)[1]
+
+
+def test_fixture_covers_the_edge_cases():
+    expected = day_by_day_costs()
+    # Butter runs out on 3/9 and has no row until it is bought again on 3/10
+    assert (3, date(2024, 3, 9)) not in expected
+    assert (3, date(2024, 3, 10)) in expected
+    # Flour used on 3/2, before its first purchase on 3/3, is taken out once that cost exists
+    assert stock_on(expected, 1, date(2024, 3, 4)) == Decimal("150") - Decimal("2.5")
+    # Flour of the 3/8 orders on both sides of the recipe change
+    used_3_8 = stock_on(expected, 1, date(2024, 3, 8)) - stock_on(
+        expected, 1, date(2024, 3, 9)
+    )
+    assert used_3_8 == Decimal("2.5") * 2 + 3 * 2
+
+
+# Rows before dirty_from are the starting point, stale rows from dirty_from onwards are replaced
+def test_roll_from_dirty_date_matches_day_by_day_update():
+    full = day_by_day_costs()
+    for dirty_from in (date(2024, 3, 5), date(2024, 3, 9), date(2024, 3, 13)):
+        kept = {k: v for k, v in full.items() if k[1] < dirty_from}
+        stale = [
+            {
+                "material_id": m,
+                "cost_date": dirty_from + timedelta(days=1),
+                "stocked_quantity": Decimal(1),
+                "stocked_cost": Decimal(1),
+                "cost_per_unit": Decimal(1),
+            }
+            for m in MATERIAL_IDS
+        ]
+        material_costs = as_material_costs(kept) + stale
+        operations = CostLedger(fixture_dao(material_costs), TODAY).roll_forward(
+            {m: dirty_from for m in MATERIAL_IDS}
+        )
+        expected = [row for row in as_rows(full) if row[1] >= dirty_from]
+        assert sorted(ledger_rows(operations)) == expected, dirty_from
+
+
+# Why the roll sums the stock before dirty_from again instead of starting from the stored row:
+## sugar is stored as 81.15 on 3/3 (exactly 81.14754), taking out the 3/4 usage from the stored
+## cost gives 69.35 on 3/5 where the day-by-day update writes 69.34
+def test_stored_stock_is_not_an_exact_seed():
+    full = day_by_day_costs()
+    _, stored_cost, cost_per_unit = full[(2, date(2024, 3, 3))]
+    used = sum(q for d, q in usage_lines(2, date(2024, 3, 5)) if d == date(2024, 3, 4))
+    seeded = (stored_cost - used * cost_per_unit).quantize(CENT, ROUND_HALF_UP)
+    assert seeded == Decimal("69.35")
+    assert full[(2, date(2024, 3, 5))][1] == Decimal("69.34")
+    operations = CostLedger(fixture_dao(as_material_costs(full)), TODAY).roll_forward(
+        {2: date(2024, 3, 5)}
+    )
+    assert ledger_rows(operations)[0] == (2, date(2024, 3, 5), *full[(2, date(2024, 3, 5))])
@@ -0,0 +1,71 @@
+from datetime import date
+
+from database.DataAccessObjects import DaoOrderPage
+from database.WriteEvents import ORDER_CHANGES
+
+ORDER_ID = 7
+
+
+# Order 7 of 2024-03-08, every transaction either succeeds or rolls back
+class StubDaoOrderPage(DaoOrderPage):
+    def __init__(self, succeed: bool):
+        super().__init__()
+        self.succeed = succeed
+        self.refreshed = []
+
+    def query_data(self, query: str, params=None):
+        return [{"order_date": date(2024, 3, 8)}]
+
+    def perform_transaction(self, operations: list[tuple]) -> str:
+        if self.succeed:
+            return "Transaction successful"
+        return "Transaction failed (Rollback). Error: lock wait timeout"
+
+    def refresh_order_summary(self, order_dates: list[date]):
+        self.refreshed += order_dates
+
+
+def recorded_changes(write) -> list[tuple]:
+    events = []
+
+    def record(table: str, ids: list[int], op: str):
+        events.append((table, ids, op))
+
+    ORDER_CHANGES.subscribe(record)
+    try:
+        write()
+    finally:
+        ORDER_CHANGES.unsubscribe(record)
+    return events
+
+
+def test_delete_publishes_only_when_committed():
+    dao = StubDaoOrderPage(succeed=True)
+    events = recorded_changes(lambda: dao.commit_delete(ORDER_ID, "orders"))
+    assert events == [("orders", [ORDER_ID], "delete")]
+    assert dao.refreshed == [date(2024, 3, 8)]
+
+    dao = StubDaoOrderPage(succeed=False)
+    events = recorded_changes(
+        lambda: (
+            dao.commit_delete(ORDER_ID, "order_details"),
+            dao.commit_delete(ORDER_ID, "orders"),
+        )
+    )
+    assert events == []
+    assert dao.refreshed == []
+    assert dao.commit_delete(ORDER_ID, "orders") is False
+
+
+def test_failed_updates_are_not_published():
+    dao = StubDaoOrderPage(succeed=False)
+    rows = [{"product_name": "a", "quantity": 1}]
+    dao.get_ids_by_names = lambda col, names: {"a": 1}
+    events = recorded_changes(
+        lambda: (
+            dao.update_order_basic(ORDER_ID, (1, "x"), (2, "x")),
+            dao.update_order_detail(ORDER_ID, rows, [{**rows[0], "quantity": 2}]),
+        )
+    )
+    assert events == []
+    assert dao.refreshed == []
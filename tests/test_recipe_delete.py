@@ -0,0 +1,51 @@
+import asyncio
+
+from database import queries
+from database.AsyncDataAccessObjects import AsyncDao
+from database.DataAccessObjects import DaoRecipePage
+
+# Product 10 (uom 4) uses materials 1 and 2, material 2 is still used by another recipe
+PRODUCT_ID = 10
+
+
+# Answers the reads of the delete path and records the statements it commits
+class RecordingDaoRecipePage(DaoRecipePage):
+    def __init__(self):
+        super().__init__(pool=object())
+        self.committed = []
+
+    def query_data(self, query: str, params=None):
+        if query == queries.PRODUCT_UOM:
+            return [{"uom_id": 4}] if params == (PRODUCT_ID,) else None
+        if query == queries.PRODUCT_MATERIALS:
+            return [{"material_id": 1}, {"material_id": 2}]
+        raise AssertionError(f"Unexpected query {query}")
+
+    def check_existence(self, table: str, col: str, val: str) -> bool:
+        return table == "recipes" and val == 2
+
+    def perform_transaction(self, operations: list[tuple]) -> str:
+        self.committed += operations
+        return "Transaction successful"
+
+
+def test_delete_product_through_async_dao():
+    dao = RecordingDaoRecipePage()
+    asyncio.run(AsyncDao(dao).delete_product(PRODUCT_ID))
+    deletes = [(q, p) for q, p in dao.committed if q in queries.delete.values()]
+    assert deletes == [
+        (queries.delete["recipes"], (PRODUCT_ID,)),
+        (queries.delete["product_prices"], (PRODUCT_ID,)),
+        (queries.delete["product_costs"], (PRODUCT_ID,)),
+        (queries.delete["products"], (PRODUCT_ID,)),
+        (queries.delete["uom"], (4,)),
+        (queries.delete["materials"], (1,)),
+    ]
+    # The recipes are marked dirty before they are deleted
+    assert dao.committed[0] == (queries.mark_cost_dirty["recipes"], (PRODUCT_ID,))
+
+
+def test_delete_unknown_product_commits_nothing():
+    dao = RecordingDaoRecipePage()
+    asyncio.run(AsyncDao(dao).delete_product(PRODUCT_ID + 1))
+    assert dao.committed == []